@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a pattern-only representation of the thesaurus graph
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+Adjacency(indptr, indices)
+    the structure of an unweighted graph in CSR format, without values
+    (Adjacency.from_scipy, Adjacency.load and Adjacency.from_bundle build it
+    from a scipy matrix, the raw CSR files or a bundle)
+
+Functions
+---------
+
+as_adjacency(graph)
+    converts a scipy sparse matrix (any format) to an Adjacency
+
+as_scipy(graph)
+    converts an Adjacency to a scipy CSR matrix (other graphs are returned
+    unchanged)
+
+
+Representation
+--------------
+
+For an unweighted thesaurus only the structure of the adjacency matrix
+matters : a scipy boolean matrix carries a data array of True values and,
+for the COO format, row and column arrays of the platform int size.
+Adjacency only holds two int32 arrays :
+    indptr[i]:indptr[i+1] is the range of the neighbours of node i
+    indices[indptr[i]:indptr[i+1]] are these neighbours (sorted)
+Both can be memory-mapped views of the bundle. A scipy matrix is only built
+(by to_scipy) for the functions that really need scipy.
+
+"""
+
+import numpy as np
+from scipy import sparse
+
+import storage
+
+
+class Adjacency:
+    '''
+    This class is the pattern (structure only) of a square sparse matrix
+    in CSR format
+
+    Parameters
+    ----------
+    indptr : int32 ndarray
+        the row pointers (length = number of nodes + 1)
+    indices : int32 ndarray
+        the column indices (length = number of edges)
+
+    '''
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+        self._scipy = None
+
+    @classmethod
+    def from_scipy(cls, graph):
+        '''
+        This function returns the pattern of a scipy sparse matrix
+        (the explicit values, zeros included, are all considered as edges)
+
+        '''
+        M = sparse.csr_matrix(graph)
+        M.sum_duplicates()
+        M.sort_indices()
+        return cls(M.indptr.astype(np.int32), M.indices.astype(np.int32))
+
+    @classmethod
+    def load(cls, basename, mmap_mode='r'):
+        '''
+        This function loads the arrays saved by storage.save_csr()
+        (see storage.load_csr() for the parameters)
+
+        '''
+        return cls(*storage.load_csr_arrays(basename, mmap_mode))
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        '''
+        This function returns the 'indptr' and 'indices' sections of a
+        bundle (zero-copy view of the bundle, see storage.py)
+
+        '''
+        return cls(bundle['indptr'], bundle['indices'])
+
+    def __repr__(self):
+        return 'Adjacency(%d nodes, %d edges)' % (self.shape[0], self.nnz)
+
+    @property
+    def shape(self):
+        N = len(self.indptr) - 1
+        return (N, N)
+
+    @property
+    def nnz(self):
+        '''the number of edges'''
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the index arrays'''
+        return self.indptr.nbytes + self.indices.nbytes
+
+    def degrees(self):
+        '''
+        This function returns the number of neighbours of each node
+
+        '''
+        return np.diff(self.indptr)
+
+    def neighbors(self, node):
+        '''
+        This function returns the neighbours of a node (view, no copy)
+
+        '''
+        return self.indices[self.indptr[node]:self.indptr[node+1]]
+
+    def edges_of(self, nodes):
+        '''
+        This function returns the positions (in indices) of the edges of
+        many nodes, in the same order as neighbors_of(), so that the arrays
+        aligned with the edges (see senses.py) can be read for a frontier
+
+        '''
+        nodes = np.asarray(nodes)
+        starts = self.indptr[nodes].astype(np.int64)
+        lengths = self.indptr[nodes + 1] - starts
+        total = int(lengths.sum())
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return shift + np.arange(total)
+
+    def neighbors_of(self, nodes):
+        '''
+        This function returns the concatenated neighbours of many nodes
+        with a single vectorized gather (duplicates are kept)
+
+        Parameters
+        ----------
+        nodes : int ndarray
+            the nodes to be expanded (e.g. the frontier of a traversal)
+
+        Returns
+        -------
+        int32 ndarray
+            the neighbours of nodes[0], then of nodes[1], etc...
+
+        '''
+        edges = self.edges_of(nodes)
+        if len(edges) == 0:
+            return np.zeros(0, dtype=np.int32)
+        return self.indices[edges]
+
+    def to_scipy(self):
+        '''
+        This function returns the graph as a scipy CSR boolean matrix.
+        The index arrays are shared (no copy), only the data array of ones
+        is allocated, on the first call.
+
+        '''
+        if self._scipy is None:
+            N = self.shape[0]
+            data = np.ones(len(self.indices), dtype=bool)
+            self._scipy = sparse.csr_matrix((data, self.indices, self.indptr),
+                                            shape=(N, N), copy=False)
+        return self._scipy
+
+
+def as_adjacency(graph):
+    '''
+    This function returns graph as an Adjacency (unchanged if it already is)
+
+    '''
+    if isinstance(graph, Adjacency):
+        return graph
+    return Adjacency.from_scipy(graph)
+
+
+def as_scipy(graph):
+    '''
+    This function returns graph as a scipy sparse matrix : an Adjacency is
+    converted to CSR format, any other graph is returned unchanged
+
+    '''
+    if isinstance(graph, Adjacency):
+        return graph.to_scipy()
+    return graph
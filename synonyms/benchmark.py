@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This Python script measures the traversal time of the thesaurus graph for
+the different node orderings provided by reorder.py, with the engines that
+the synonyms module actually runs
+
+This SHOULD NOT be used as a module
+
+Usage
+-----
+
+$ python ./synonyms/benchmark.py --data-dir ./data/step1 --sources 200
+
+The graph of the bundle is numbered back in the alphabetical order, then
+renumbered with each ordering, and the same source and target words are
+used for all the orderings :
+    bfs        : full level-synchronous traversal from a source word
+                 (traversal.BFS, the engine of within())
+    path       : shortest path between two words (traversal.BidirectionalBFS,
+                 the engine of shortest_path())
+    compressed : same as path over the gap/varint compressed neighbour lists
+                 (see compressed.py, build.py --compress)
+    scipy      : full breadth first traversal with scipy.sparse.csgraph, for
+                 reference
+
+"""
+
+import os
+import argparse
+from timeit import timeit
+
+import numpy as np
+from scipy.sparse import csgraph
+
+import storage
+import reorder
+import compressed
+import traversal
+import views
+from adjacency import Adjacency
+from compressed import compress
+
+
+def orderings(bundle):
+    '''
+    This function yields (method, graph, perm) for the alphabetical order
+    and each method of reorder.METHODS, perm[rank] being the node of the
+    name of a given alphabetical rank
+
+    '''
+    graph = compressed.from_bundle(bundle).to_scipy()
+    graph = storage.csr_from_arrays(*reorder.alphabetical(graph.indptr, graph.indices,
+                                                          bundle.get('iperm')))
+    N = graph.shape[0]
+    yield ('alphabetical', graph, np.arange(N))
+
+    for method in reorder.METHODS:
+        iperm = reorder.node_order(graph.indptr, graph.indices, method)
+        perm = np.empty_like(iperm)
+        perm[iperm] = np.arange(N, dtype=np.int32)
+        (indptr, indices) = reorder.permute_csr(graph.indptr, graph.indices, perm)
+        yield (method, storage.csr_from_arrays(indptr, indices), perm)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Traversal time for the different node orderings')
+    parser.add_argument('--data-dir', default='./data/step1',
+                        help='directory of thesaurus.bundle')
+    parser.add_argument('--sources', type=int, default=200,
+                        help='number of source words')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of repetitions (the best time is kept)')
+    args = parser.parse_args()
+
+    bundle = storage.Bundle(os.path.join(args.data_dir, 'thesaurus.bundle'))
+    print('Graph : %d nodes, %d edges' % (bundle.nodes, bundle.edges))
+
+    np.random.seed(0)
+    ranks = np.random.randint(0, bundle.nodes, args.sources)
+    target_ranks = np.random.randint(0, bundle.nodes, args.sources)
+
+    def best(func):
+        return 1e3*min(timeit(func, number=1) for _ in range(args.repeat))/args.sources
+
+    print('%-14s %10s %10s %15s %10s' % ('ordering', 'bfs (ms)', 'path (ms)',
+                                         'compressed (ms)', 'scipy (ms)'))
+    for (method, graph, perm) in orderings(bundle):
+        (sources, targets) = (perm[ranks], perm[target_ranks])
+        forward = Adjacency.from_scipy(graph)
+        backward = views.transpose(forward)
+        bfs = traversal.BFS(forward)
+        bidirectional = traversal.BidirectionalBFS(forward, backward)
+        packed = traversal.BidirectionalBFS(compress(forward), compress(backward))
+
+        def run_bfs():
+            for s in sources:
+                bfs.search(s)
+
+        def run_path():
+            for (s, t) in zip(sources, targets):
+                bidirectional.path(s, t)
+
+        def run_compressed():
+            for (s, t) in zip(sources, targets):
+                packed.path(s, t)
+
+        def run_scipy():
+            for s in sources:
+                csgraph.breadth_first_order(graph, s, directed=True,
+                                            return_predecessors=False)
+
+        print('%-14s %10.3f %10.3f %15.3f %10.3f' % (method, best(run_bfs),
+                                                     best(run_path),
+                                                     best(run_compressed),
+                                                     best(run_scipy)))
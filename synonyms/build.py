@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This Python script is the build driver of the thesaurus data : it turns a
+local thesaurus archive (.zip) or thesaurus file (.dat) into the files of the
+./data/step1/ directory, and only rebuilds what is stale
+The archive is read directly (see create_matrix.open_thesaurus) : nothing is
+extracted, so that several versions of the thesaurus can be kept archived
+side by side
+
+This SHOULD NOT be used as a module
+
+Usage
+-----
+
+$ python ./synonyms/build.py --source ./data/step0/thesaurus.zip
+$ python ./synonyms/build.py --source /path/to/thes_fr.dat --packed-names
+
+Nothing is downloaded : the build works offline as long as the source is
+available (the Makefile downloads the archive only if it is missing)
+
+
+Stages
+------
+
+bundle       : the thesaurus is parsed into ./data/step1/thesaurus.bundle
+               (see create_matrix.py), with the landmark tables of
+               --landmarks (see landmarks.py), the edge weights of
+               --weights (see weights.py) and the contraction hierarchy of
+               --contract (see contraction.py)
+csr          : raw CSR arrays thesaurus_csr_*.npy
+legacy       : thesaurus_matrix.npz and thesaurus_entries.npz
+               (these two are always in the alphabetical order and
+               uncompressed, even when the bundle is reordered with --reorder
+               or compressed with --compress)
+packed_names : thesaurus_names_*.npy (only with --packed-names)
+offsets      : thesaurus_offsets.npy, the position of each entry in the
+               thesaurus file (see raw_entries.py)
+views        : thesaurus_view_<view>_*.npy, the views of the graph given
+               with --views (see views.py), numbered like the bundle and
+               stamped with its graph hash (the views of an earlier build
+               that are not given any more are deleted)
+labels       : thesaurus_labels_*.npy, the distance labels of the graph
+               (only with --labels, see labeling.py), numbered like the
+               bundle and stamped with its graph hash
+distances    : thesaurus_distances.npy, the all-pairs distance matrix
+               (only with --distances, computed with --jobs processes and
+               resumed if interrupted, see distance_matrix.py)
+
+Each stage has a key : the sha256 of the source (plus the format and
+parser versions and the options) for the bundle stage, and the graph hash
+of the bundle (the hash of its graph and names sections, see storage.py)
+for the derived artifacts (plus the source hash for the offsets).
+The key and the outputs (size, mtime and sha256) of every stage are stored
+in ./data/step1/build_manifest.json. A stage is skipped when its key did not
+change and its outputs are still there and unchanged, so that a routine
+rebuild is a no-op.
+
+"""
+
+import os
+import json
+import argparse
+
+import numpy as np
+from scipy import sparse
+from numpy import savez
+
+import storage
+import packed_names
+import create_matrix
+import raw_entries
+import reorder
+import compressed
+import views
+import landmarks
+import labeling
+import distance_matrix
+import weights
+
+
+MANIFEST = 'build_manifest.json'
+
+
+def load_manifest(filename):
+    """this function loads the build manifest (empty if it does not exist)"""
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, mode='rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(filename, manifest):
+    """this function saves the build manifest"""
+    with open(filename, mode='wt', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _output_record(path):
+    st = os.stat(path)
+    return {'size' : st.st_size, 'mtime_ns' : st.st_mtime_ns,
+            'sha256' : create_matrix.file_hash(path)}
+
+
+def _output_unchanged(path, record):
+    '''
+    This *internal* function checks that an output is still the one recorded
+    in the manifest. The file is only hashed again if its size or
+    modification time changed.
+
+    '''
+    if not os.path.exists(path):
+        return False
+    st = os.stat(path)
+    if st.st_size != record['size']:
+        return False
+    if st.st_mtime_ns == record['mtime_ns']:
+        return True
+    return create_matrix.file_hash(path) == record['sha256']
+
+
+def is_up_to_date(manifest, stage, key):
+    '''
+    This function checks if a stage has already been run with the same key
+    and if its outputs are unchanged
+
+    Parameters
+    ----------
+    manifest : dictionary
+        the build manifest
+    stage : str
+        the name of the stage
+    key : dictionary
+        everything the outputs of the stage depend on (hashes, options)
+
+    Returns
+    -------
+    bool
+        True if the stage can be skipped
+
+    '''
+    record = manifest.get(stage)
+    if record is None or record['key'] != key:
+        return False
+    return all(_output_unchanged(path, r) for (path, r) in record['outputs'].items())
+
+
+def run_stage(manifest, stage, key, outputs, func, force=False):
+    '''
+    This function runs a stage if it is stale and records it in the manifest
+
+    Parameters
+    ----------
+    manifest : dictionary
+        the build manifest (updated in place)
+    stage : str
+        the name of the stage
+    key : dictionary
+        everything the outputs of the stage depend on (hashes, options)
+    outputs : str list
+        the files written by the stage
+    func : callable
+        the function (without arguments) that runs the stage
+    force : bool, optional
+        run the stage even if it is up to date. The default is False.
+
+    Returns
+    -------
+    bool
+        True if the stage has been run, False if it was skipped
+
+    '''
+    if not force and is_up_to_date(manifest, stage, key):
+        print('- %s : up to date' % stage)
+        return False
+
+    print('- %s : building...' % stage)
+    func()
+    manifest[stage] = {'key' : key,
+                       'outputs' : {path:_output_record(path) for path in outputs}}
+    return True
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Incremental build of the thesaurus data')
+    parser.add_argument('--source', default='./data/step0/thesaurus.zip',
+                        help='thesaurus archive (.zip) or thesaurus file (.dat)')
+    parser.add_argument('--output-dir', default='./data/step1',
+                        help='where the built files are written')
+    parser.add_argument('--packed-names', action='store_true',
+                        help='also save the entries in the packed UTF-8 format')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of processes used to parse the thesaurus '
+                        'and to compute the distances')
+    parser.add_argument('--reorder', choices=reorder.METHODS,
+                        help='node ordering of the graph of the bundle')
+    parser.add_argument('--compress', action='store_true',
+                        help='compress the neighbour lists of the bundle')
+    parser.add_argument('--landmarks', type=int, default=0,
+                        help='number of landmarks of the ALT engine')
+    parser.add_argument('--landmark-method', choices=landmarks.METHODS,
+                        default='farthest', help='landmark selection method')
+    parser.add_argument('--weights', metavar='SOURCE[:OPTION]',
+                        help='edge weights : %s (see weights.py)'
+                        % ', '.join(weights.SOURCES))
+    parser.add_argument('--contract', action='store_true',
+                        help='build the contraction hierarchy of the weighted '
+                        'graph (see contraction.py)')
+    parser.add_argument('--views', nargs='*', default=[],
+                        choices=[v for v in views.VIEWS if v != 'csr'],
+                        help='views of the graph to be saved (see views.py)')
+    parser.add_argument('--labels', action='store_true',
+                        help='build the distance labels (see labeling.py)')
+    parser.add_argument('--distances', action='store_true',
+                        help='compute the all-pairs distance matrix')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every stage')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_file = os.path.join(args.output_dir, MANIFEST)
+    manifest = load_manifest(manifest_file)
+
+    def output(filename):
+        return os.path.join(args.output_dir, filename)
+
+    try:
+        # STAGE bundle
+        fileout = output('thesaurus.bundle')
+
+        def make_bundle():
+            parsed = create_matrix.read_thesaurus(args.source, args.jobs)
+            (keys, indptr, indices, sense_info) = create_matrix.build_csr(*parsed)
+            edge_weights = None
+            if args.weights is not None:
+                edge_weights = weights.edge_weights(args.weights, keys, indptr,
+                                                    indices, sense_info)
+            create_matrix.write_bundle(fileout, keys, indptr, indices,
+                                       create_matrix.source_hash(args.source),
+                                       {'reorder' : args.reorder,
+                                        'compress' : args.compress,
+                                        'landmarks' : args.landmarks,
+                                        'landmark_method' : args.landmark_method,
+                                        'weights' : args.weights,
+                                        'contract' : args.contract},
+                                       args.reorder, args.compress, sense_info,
+                                       args.landmarks, args.landmark_method,
+                                       edge_weights, args.contract)
+
+        # A weights file is part of the key of the bundle
+        weights_hash = None
+        if args.weights is not None:
+            (weight_source, option) = weights.parse_spec(args.weights)
+            if weight_source == 'file':
+                weights_hash = create_matrix.file_hash(option)
+
+        run_stage(manifest, 'bundle',
+                  {'source' : create_matrix.file_hash(args.source),
+                   'format_version' : storage.BUNDLE_VERSION,
+                   'parser_version' : create_matrix.PARSER_VERSION,
+                   'reorder' : args.reorder,
+                   'compress' : args.compress,
+                   'landmarks' : args.landmarks,
+                   'landmark_method' : args.landmark_method,
+                   'weights' : args.weights,
+                   'weights_hash' : weights_hash,
+                   'contract' : args.contract},
+                  [fileout], make_bundle, args.force)
+
+        # Derived artifacts : they only depend on the graph and the names
+        bundle = storage.Bundle(fileout)
+        # The files other than the bundle are in the alphabetical order
+        graph = compressed.from_bundle(bundle).to_scipy()
+        graph = storage.csr_from_arrays(*reorder.alphabetical(graph.indptr, graph.indices,
+                                                              bundle.get('iperm')))
+        names = packed_names.from_bundle(bundle)
+        key = {'graph' : bundle.graph_hash}
+
+        run_stage(manifest, 'csr', key,
+                  [output('thesaurus_csr_indptr.npy'),
+                   output('thesaurus_csr_indices.npy')],
+                  lambda: storage.save_csr(output('thesaurus_csr'), graph),
+                  args.force)
+
+        def make_legacy():
+            sparse.save_npz(output('thesaurus_matrix'), graph.tocoo())
+            savez(output('thesaurus_entries'), names=names.tolist())
+
+        run_stage(manifest, 'legacy', key,
+                  [output('thesaurus_matrix.npz'),
+                   output('thesaurus_entries.npz')],
+                  make_legacy, args.force)
+
+        if args.packed_names:
+            run_stage(manifest, 'packed_names', key,
+                      [output('thesaurus_names_blob.npy'),
+                       output('thesaurus_names_offsets.npy')],
+                      lambda: packed_names.save_names(output('thesaurus_names'),
+                                                      names),
+                      args.force)
+
+        run_stage(manifest, 'offsets',
+                  {'graph' : bundle.graph_hash,
+                   'source' : bundle.header['source_hash']},
+                  [output('thesaurus_offsets.npy')],
+                  lambda: np.save(output('thesaurus_offsets.npy'),
+                                  raw_entries.entry_offsets(args.source,
+                                                            names)),
+                  args.force)
+
+        if args.views:
+            # The views are computed from the bundle (not loaded)
+            registry = views.GraphViews(compressed.from_bundle(bundle))
+
+            def make_views():
+                for view in args.views:
+                    storage.save_csr(output('thesaurus_view_%s' % view),
+                                     registry[view].to_scipy())
+                    storage.save_stamp(output('thesaurus_view_%s' % view),
+                                       bundle.graph_hash)
+
+            run_stage(manifest, 'views', dict(key, views=sorted(args.views)),
+                      [output('thesaurus_view_%s_%s' % (view, suffix))
+                       for view in sorted(args.views)
+                       for suffix in ('indptr.npy', 'indices.npy', 'hash.json')],
+                      make_views, args.force)
+        else:
+            manifest.pop('views', None)
+
+        # The views of an earlier build that are not asked for any more
+        for view in views.VIEWS:
+            if view != 'csr' and not view in args.views:
+                for suffix in ('indptr.npy', 'indices.npy', 'hash.json'):
+                    filename = output('thesaurus_view_%s_%s' % (view, suffix))
+                    if os.path.exists(filename):
+                        os.remove(filename)
+
+        if args.labels:
+            def make_labels():
+                forward = compressed.from_bundle(bundle)
+                labels = labeling.build_labels(forward, views.transpose(forward))
+                print('  %r' % labels)
+                labeling.save_labels(output('thesaurus_labels'), labels,
+                                     bundle.graph_hash)
+
+            run_stage(manifest, 'labels', key,
+                      [output('thesaurus_labels_%s.npy' % array)
+                       for array in labeling.ARRAYS]
+                      + [output('thesaurus_labels_hash.json')],
+                      make_labels, args.force)
+
+        if args.distances:
+            run_stage(manifest, 'distances', key,
+                      [output('thesaurus_distances.npy'),
+                       output('thesaurus_distances_progress.json')],
+                      lambda: distance_matrix.compute(output('thesaurus_distances'),
+                                                      compressed.from_bundle(bundle),
+                                                      bundle.graph_hash,
+                                                      args.jobs,
+                                                      resume=not args.force),
+                      args.force)
+    finally:
+        save_manifest(manifest_file, manifest)
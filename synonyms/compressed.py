@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a compressed representation of the thesaurus graph,
+for graphs that are too big to be held as plain CSR arrays
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+CompressedAdjacency(indptr, offsets, data)
+    an Adjacency whose neighbour lists are gap and varint encoded
+
+Functions
+---------
+
+compress(adjacency)
+    compresses an Adjacency
+
+from_bundle(bundle)
+    returns the graph of a bundle, compressed or not
+
+encode_varints(values), decode_varints(data)
+    vectorized LEB128 encoding and decoding of non negative integers
+
+
+Representation
+--------------
+
+The neighbours of each node are sorted, so they are stored as gaps : the
+first neighbour itself, then the difference with the previous neighbour.
+Each gap is written as a varint (7 bits per byte, the high bit is set on
+every byte but the last one of a value), which takes one byte for most of
+the gaps of a reordered graph (see reorder.py) instead of four.
+    indptr[i]:indptr[i+1]  is the range of the neighbours of node i
+                           (same as Adjacency, it gives the degrees)
+    offsets[i]:offsets[i+1] is the range of the bytes of node i in data
+    data                   the varints of all the rows (uint8)
+
+In the bundle (see storage.py), the 'indices' section is then replaced by
+the 'cadj_offsets' and 'cadj_data' sections.
+
+The rows are decoded on demand with numpy only, so the traversals that use
+neighbors()/neighbors_of() (e.g. compute_syno_set) run directly over the
+compressed graph.
+
+"""
+
+import numpy as np
+
+from adjacency import Adjacency
+
+# The number of bytes of a varint grows at each of these values
+_VARINT_LIMITS = (1 << 7, 1 << 14, 1 << 21, 1 << 28)
+
+
+def encode_varints(values):
+    '''
+    This function encodes non negative integers (less than 2**35) as varints
+
+    Parameters
+    ----------
+    values : int ndarray
+        the values to be encoded
+
+    Returns
+    -------
+    data : uint8 ndarray
+        the concatenated varints
+    nbytes : int64 ndarray
+        the number of bytes of each varint
+
+    '''
+    values = np.asarray(values, dtype=np.int64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for limit in _VARINT_LIMITS:
+        nbytes += values >= limit
+
+    starts = np.cumsum(nbytes) - nbytes
+    data = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for b in range(len(_VARINT_LIMITS) + 1):
+        has = nbytes > b
+        byte = (values[has] >> (7*b)) & 0x7f
+        byte |= np.where(nbytes[has] > b + 1, 0x80, 0)
+        data[starts[has] + b] = byte
+
+    return (data, nbytes)
+
+
+def decode_varints(data):
+    '''
+    This function decodes concatenated varints (see encode_varints)
+
+    Parameters
+    ----------
+    data : uint8 ndarray
+        the varints
+
+    Returns
+    -------
+    int64 ndarray
+        the decoded values
+
+    '''
+    data = np.asarray(data, dtype=np.uint8)
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    last = data < 0x80
+    starts = np.flatnonzero(np.r_[True, last[:-1]])
+    value_id = np.cumsum(last) - last
+    shift = 7*(np.arange(len(data)) - starts[value_id])
+    parts = (data & 0x7f).astype(np.int64) << shift
+    return np.add.reduceat(parts, starts)
+
+
+def _gather(array, starts, lengths):
+    '''
+    This *internal* function concatenates array[starts[k]:starts[k]+lengths[k]]
+    for every k with a single vectorized gather
+
+    '''
+    total = int(lengths.sum())
+    if total == 0:
+        return array[:0]
+    shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return array[shift + np.arange(total)]
+
+
+def compress(adjacency):
+    '''
+    This function compresses an Adjacency (see the representation above)
+
+    Parameters
+    ----------
+    adjacency : Adjacency
+        a graph whose rows are sorted without duplicates
+
+    Returns
+    -------
+    CompressedAdjacency
+        the same graph
+
+    '''
+    indptr = np.asarray(adjacency.indptr)
+    indices = np.asarray(adjacency.indices, dtype=np.int64)
+
+    gaps = np.diff(indices, prepend=0)
+    row_starts = indptr[:-1][np.diff(indptr) > 0]
+    gaps[row_starts] = indices[row_starts]
+
+    (data, nbytes) = encode_varints(gaps)
+
+    # The byte offset of a row is the total size of the varints before it
+    cumulated = np.zeros(len(nbytes) + 1, dtype=np.int64)
+    np.cumsum(nbytes, out=cumulated[1:])
+    offsets = cumulated[indptr]
+
+    return CompressedAdjacency(indptr.astype(np.int32), offsets, data)
+
+
+class CompressedAdjacency(Adjacency):
+    '''
+    This class is an Adjacency whose neighbour lists are gap and varint
+    encoded (see the representation above). The indices array does not
+    exist : the rows are decoded by neighbors() and neighbors_of().
+
+    Parameters
+    ----------
+    indptr : int32 ndarray
+        the row pointers (length = number of nodes + 1)
+    offsets : int64 ndarray
+        the byte offset of each row in data (length = number of nodes + 1)
+    data : uint8 ndarray
+        the varints of all the rows
+
+    '''
+
+    def __init__(self, indptr, offsets, data):
+        Adjacency.__init__(self, indptr, None)
+        self.offsets = offsets
+        self.data = data
+
+    def __repr__(self):
+        return 'CompressedAdjacency(%d nodes, %d edges, %d bytes)' % \
+            (self.shape[0], self.nnz, self.nbytes)
+
+    @property
+    def nnz(self):
+        '''the number of edges'''
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the arrays'''
+        return self.indptr.nbytes + self.offsets.nbytes + self.data.nbytes
+
+    def neighbors(self, node):
+        '''
+        This function decodes the neighbours of a node
+
+        '''
+        values = decode_varints(self.data[self.offsets[node]:self.offsets[node+1]])
+        return np.cumsum(values).astype(np.int32)
+
+    def neighbors_of(self, nodes):
+        '''
+        This function decodes and concatenates the neighbours of many nodes
+        (same output as Adjacency.neighbors_of)
+
+        '''
+        nodes = np.asarray(nodes)
+        starts = self.offsets[nodes].astype(np.int64)
+        values = decode_varints(_gather(self.data, starts,
+                                        self.offsets[nodes + 1] - starts))
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int32)
+
+        # The gaps are summed row by row : global cumulative sum minus
+        # the cumulative sum before the first value of each row
+        counts = (self.indptr[nodes + 1] - self.indptr[nodes]).astype(np.int64)
+        nonempty = counts > 0
+        first = (np.cumsum(counts) - counts)[nonempty]
+        total = np.cumsum(values)
+        base = np.repeat(total[first] - values[first], counts[nonempty])
+        return (total - base).astype(np.int32)
+
+    def decompress(self):
+        '''
+        This function decodes the whole graph as a plain Adjacency
+
+        '''
+        N = self.shape[0]
+        return Adjacency(np.asarray(self.indptr, dtype=np.int32),
+                         self.neighbors_of(np.arange(N)))
+
+    def to_scipy(self):
+        '''
+        This function returns the whole graph as a scipy CSR boolean matrix
+        (the graph is decoded on the first call)
+
+        '''
+        if self._scipy is None:
+            self._scipy = self.decompress().to_scipy()
+        return self._scipy
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the graph of a bundle (zero-copy view of the
+    bundle) : a CompressedAdjacency if the bundle has been built with
+    --compress, a plain Adjacency otherwise
+
+    '''
+    if 'cadj_data' in bundle:
+        return CompressedAdjacency(bundle['indptr'], bundle['cadj_offsets'],
+                                   bundle['cadj_data'])
+    return Adjacency.from_bundle(bundle)
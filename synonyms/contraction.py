@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a contraction hierarchy of the weighted thesaurus
+graph : a preprocessing that adds shortcut edges, so that the weighted
+shortest paths are found by two small upward searches
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+ContractionHierarchy(rank, up_indptr, up_indices, up_weights, down_indptr,
+                     down_indices, down_weights, unpack_keys, unpack_middles)
+    weighted shortest paths by a bidirectional upward search
+
+Functions
+---------
+
+contract(indptr, indices, weights, max_settled=DEFAULT_MAX_SETTLED,
+         core_degree=DEFAULT_CORE_DEGREE)
+    contracts the graph and returns the arrays of the hierarchy
+
+from_bundle(bundle)
+    returns the ContractionHierarchy stored in a bundle (None if not built)
+
+
+Algorithm
+---------
+
+The nodes are contracted one by one, the least important first. Contracting
+a node v removes it from the graph; for each pair of edges u -> v -> w, a
+shortcut u -> w of weight c(u, v) + c(v, w) is added unless a witness path
+from u to w that avoids v is at most as heavy (a local Dijkstra search from
+u, bounded by the weight of the shortcut and by max_settled nodes : a
+witness that is not found only adds a useless shortcut).
+The next node is the one of smallest edge difference (the number of
+shortcuts its contraction would add minus the number of its edges), plus
+the number of its neighbours already contracted, which spreads the
+contraction over the graph. The priorities are updated lazily : the node
+on top of the queue is evaluated again and put back if it is no longer the
+smallest.
+The last nodes are the most connected ones, and their contraction adds
+more and more shortcuts. When the mean out-degree of the remaining graph
+goes above core_degree, the contraction stops : the remaining nodes are the
+core of the hierarchy.
+
+The rank of a node is its contraction order (the nodes of the core share
+the top rank). Every edge (original or shortcut) goes up from its lower
+ranked end :
+    up graph    the edges u -> w with rank[w] > rank[u], stored at u
+    down graph  the edges u -> w with rank[u] > rank[w], stored at w
+and the edges between two nodes of the core are in both graphs.
+A shortest path from s to t goes up then down the ranks (through the core),
+so that a Dijkstra search from s in the up graph and one from t in the
+down graph meet on it. The searches alternate and stop when both queues are
+above the best meeting weight. A node that is reached with a smaller weight
+through one of its higher ranked neighbours is not on a shortest up-down
+path : its edges are not relaxed (stall-on-demand). The search spaces are
+small, so the queues are plain heapq lists (a node is queued again when its
+weight decreases, and the outdated entries are skipped).
+A shortcut u -> w is unpacked into u -> v and v -> w, where v is read from
+the unpacking table (the sorted keys u*nodes + w of the shortcuts and their
+middle nodes), until no shortcut is left.
+
+The arrays are stored in the bundle (the ch_* sections of SECTIONS, see
+create_matrix.py --contract).
+
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+# The bundle sections of the hierarchy (in the order of the arguments of
+# ContractionHierarchy)
+SECTIONS = ('ch_rank', 'ch_up_indptr', 'ch_up_indices', 'ch_up_weights',
+            'ch_down_indptr', 'ch_down_indices', 'ch_down_weights',
+            'ch_unpack_keys', 'ch_unpack_middles')
+
+# The default bound on the number of nodes settled by a witness search
+DEFAULT_MAX_SETTLED = 64
+
+# The default mean out-degree of the remaining graph that stops the
+# contraction (see the core)
+DEFAULT_CORE_DEGREE = 64
+
+
+def _witness_distances(out, source, avoid, targets, limit, max_settled):
+    '''
+    This *internal* function runs a local Dijkstra search from source that
+    does not go through avoid, and returns the weights found so far (every
+    one of them is the weight of a real path)
+
+    '''
+    distance = {source : 0.0}
+    queue = [(0.0, source)]
+    (settled, remaining) = (0, len(targets))
+    while queue and settled < max_settled and remaining > 0:
+        (cost, node) = heapq.heappop(queue)
+        if cost > distance[node]:
+            continue
+        settled += 1
+        if node in targets:
+            remaining -= 1
+        for (neighbor, weight) in out[node].items():
+            # The paths heavier than limit are not witnesses
+            new_cost = cost + weight
+            if new_cost <= limit and neighbor != avoid and \
+                    new_cost < distance.get(neighbor, math.inf):
+                distance[neighbor] = new_cost
+                heapq.heappush(queue, (new_cost, neighbor))
+    return distance
+
+
+def _shortcuts(out, inn, node, max_settled):
+    '''
+    This *internal* function returns the shortcuts (u, w, weight) that the
+    contraction of node needs
+
+    '''
+    shortcuts = []
+    targets = out[node]
+    if not targets:
+        return shortcuts
+    max_out = max(targets.values())
+    for (u, c_uv) in inn[node].items():
+        distance = _witness_distances(out, u, node, targets, c_uv + max_out,
+                                      max_settled)
+        for (w, c_vw) in targets.items():
+            if w != u and distance.get(w, math.inf) > c_uv + c_vw:
+                shortcuts.append((u, w, c_uv + c_vw))
+    return shortcuts
+
+
+def contract(indptr, indices, weights, max_settled=DEFAULT_MAX_SETTLED,
+             core_degree=DEFAULT_CORE_DEGREE):
+    '''
+    This function builds the contraction hierarchy of a weighted graph
+    (see the algorithm above)
+
+    Parameters
+    ----------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the graph
+    weights : float32 ndarray
+        the weight of each edge (aligned with indices)
+    max_settled : int, optional
+        the bound on the nodes settled by a witness search.
+        The default is DEFAULT_MAX_SETTLED.
+    core_degree : float, optional
+        the contraction stops when the mean out-degree of the remaining
+        graph is above core_degree. The default is DEFAULT_CORE_DEGREE.
+
+    Returns
+    -------
+    tuple of ndarray
+        the arrays of the hierarchy, in the order of SECTIONS
+
+    '''
+    N = len(indptr) - 1
+    out = [{} for _ in range(N)]
+    inn = [{} for _ in range(N)]
+    rows = np.repeat(np.arange(N), np.diff(indptr)).tolist()
+    for (u, w, c) in zip(rows, np.asarray(indices).tolist(),
+                         np.asarray(weights, dtype=np.float64).tolist()):
+        if u != w and c < out[u].get(w, math.inf):
+            out[u][w] = c
+            inn[w][u] = c
+
+    # middle[(u, w)] is the contracted node of the shortcut u -> w
+    middle = {}
+    contracted_neighbors = [0]*N
+    rank = np.full(N, -1, dtype=np.int32)
+    (up, down) = ([], [])
+
+    def priority(node):
+        shortcuts = _shortcuts(out, inn, node, max_settled)
+        return (len(shortcuts) - len(out[node]) - len(inn[node])
+                + contracted_neighbors[node], shortcuts)
+
+    queue = [(priority(node)[0], node) for node in range(N)]
+    heapq.heapify(queue)
+    next_rank = 0
+    edges = sum(len(neighbors) for neighbors in out)
+    # The contraction stops when the remaining graph is too dense
+    while queue and edges <= core_degree*(N - next_rank):
+        (_, node) = heapq.heappop(queue)
+        (value, shortcuts) = priority(node)
+        if queue and value > queue[0][0]:
+            heapq.heappush(queue, (value, node))
+            continue
+
+        rank[node] = next_rank
+        next_rank += 1
+        for (u, w, c) in shortcuts:
+            if c < out[u].get(w, math.inf):
+                edges += not w in out[u]
+                out[u][w] = c
+                inn[w][u] = c
+                middle[(u, w)] = node
+        # The remaining edges of node go up the ranks
+        for (w, c) in out[node].items():
+            up.append((node, w, c))
+            del inn[w][node]
+            contracted_neighbors[w] += 1
+        for (u, c) in inn[node].items():
+            down.append((node, u, c))
+            del out[u][node]
+            contracted_neighbors[u] += 1
+        edges -= len(out[node]) + len(inn[node])
+        out[node] = {}
+        inn[node] = {}
+
+    # The remaining nodes are the core : they share the top rank, and the
+    # edges between them are in both graphs
+    for node in np.flatnonzero(rank < 0).tolist():
+        rank[node] = next_rank
+        for (w, c) in out[node].items():
+            up.append((node, w, c))
+            down.append((w, node, c))
+
+    arrays = [rank]
+    for edges in (up, down):
+        edges.sort()
+        table = np.array([e[:2] for e in edges], dtype=np.int32).reshape(-1, 2)
+        arrays.append(np.searchsorted(table[:, 0], np.arange(N + 1)).astype(np.int32))
+        arrays.append(table[:, 1].copy())
+        arrays.append(np.array([e[2] for e in edges], dtype=np.float32))
+    keys = np.array([u*N + w for (u, w) in middle], dtype=np.int64)
+    middles = np.array(list(middle.values()), dtype=np.int32)
+    order = np.argsort(keys)
+    arrays.append(keys[order])
+    arrays.append(middles[order])
+    return tuple(arrays)
+
+
+class ContractionHierarchy:
+    '''
+    This class computes weighted shortest paths with the arrays built by
+    contract (see the algorithm above)
+
+    Parameters
+    ----------
+    rank : int32 ndarray
+        the contraction order of each node
+    up_indptr, up_indices, up_weights : ndarray
+        the edges to higher ranked nodes, in CSR format
+    down_indptr, down_indices, down_weights : ndarray
+        the edges from higher ranked nodes, stored at their target
+    unpack_keys, unpack_middles : ndarray
+        the shortcuts u*nodes + w (sorted) and their middle nodes
+
+    '''
+
+    def __init__(self, rank, up_indptr, up_indices, up_weights, down_indptr,
+                 down_indices, down_weights, unpack_keys, unpack_middles):
+        N = len(rank)
+        # Plain views of the memory-mapped arrays are much faster to slice
+        self.rank = np.asarray(rank)
+        self.up = tuple(np.asarray(a) for a in (up_indptr, up_indices, up_weights))
+        self.down = tuple(np.asarray(a) for a in (down_indptr, down_indices,
+                                                  down_weights))
+        self.unpack_keys = np.asarray(unpack_keys)
+        self.unpack_middles = np.asarray(unpack_middles)
+        self._distances = ([math.inf]*N, [math.inf]*N)
+        self._parents = ([-1]*N, [-1]*N)
+        # The (neighbour, weight) pairs of the nodes already searched, in
+        # the up and down graphs
+        self._pairs = ({}, {})
+
+    def __repr__(self):
+        return 'ContractionHierarchy(%d nodes, %d shortcuts)' % (len(self.rank),
+                                                                len(self.unpack_keys))
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the arrays'''
+        return sum(a.nbytes for a in (self.rank, *self.up, *self.down,
+                                      self.unpack_keys, self.unpack_middles))
+
+    def shortest(self, source, target, max_cost=None):
+        '''
+        This function computes a shortest path from source to target
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        max_cost : float, optional
+            the paths heavier than max_cost are not searched.
+            The default is None (no limit).
+
+        Returns
+        -------
+        cost : float
+            the total weight of the path (inf if there is no path)
+        path : int32 ndarray
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        (distances, parents) = (self._distances, self._parents)
+        limit = math.inf if max_cost is None else max_cost
+        touched = ([source], [target])
+        queues = ([(0.0, source)], [(0.0, target)])
+        for (side, node) in ((0, source), (1, target)):
+            distances[side][node] = 0.0
+            parents[side][node] = -1
+
+        (best, meeting) = (math.inf, -1)
+        try:
+            while True:
+                # The side of smallest queue minimum is expanded
+                tops = [queue[0][0] if queue else math.inf for queue in queues]
+                side = 0 if tops[0] <= tops[1] else 1
+                if tops[side] >= best or tops[side] > limit:
+                    break
+                (cost, node) = heapq.heappop(queues[side])
+                (distance, parent) = (distances[side], parents[side])
+                if cost > distance[node]:
+                    # An outdated entry (the node has been queued again
+                    # with a smaller weight)
+                    continue
+                other = distances[1 - side][node]
+                if cost + other < best:
+                    (best, meeting) = (cost + other, node)
+
+                # Stall-on-demand : a node that is reached by a shorter path
+                # through a higher ranked node is not on a shortest up-down
+                # path, its edges are not relaxed
+                if any(distance[u] + c < cost for (u, c) in self._edges(1 - side, node)):
+                    continue
+
+                for (neighbor, weight) in self._edges(side, node):
+                    new_cost = cost + weight
+                    if new_cost < distance[neighbor]:
+                        if distance[neighbor] == math.inf:
+                            touched[side].append(neighbor)
+                        distance[neighbor] = new_cost
+                        parent[neighbor] = node
+                        heapq.heappush(queues[side], (new_cost, neighbor))
+
+            if meeting < 0 or best > limit:
+                return (math.inf, None)
+            return (best, self._walk(meeting))
+        finally:
+            # Only the touched nodes are reset
+            for side in (0, 1):
+                for node in touched[side]:
+                    distances[side][node] = math.inf
+
+    def _edges(self, side, node):
+        '''
+        This *internal* function returns the (neighbour, weight) pairs of a
+        node in the up (side 0) or down (side 1) graph, decoded once
+
+        '''
+        pairs = self._pairs[side].get(node)
+        if pairs is None:
+            (indptr, indices, costs) = (self.up, self.down)[side]
+            (a, b) = (int(indptr[node]), int(indptr[node + 1]))
+            pairs = list(zip(indices[a:b].tolist(), costs[a:b].tolist()))
+            self._pairs[side][node] = pairs
+        return pairs
+
+    def path(self, source, target, max_cost=None):
+        '''
+        This function returns the nodes of a shortest path from source to
+        target (None if there is no path, see shortest)
+
+        '''
+        return self.shortest(source, target, max_cost)[1]
+
+    def _walk(self, meeting):
+        '''
+        This *internal* function returns the path of the hierarchy through
+        the meeting node, with its shortcuts unpacked
+
+        '''
+        (forward, backward) = self._parents
+        nodes = [meeting]
+        while forward[nodes[-1]] >= 0:
+            nodes.append(forward[nodes[-1]])
+        nodes.reverse()
+        while backward[nodes[-1]] >= 0:
+            nodes.append(backward[nodes[-1]])
+        return self._unpack(nodes)
+
+    def _unpack(self, nodes):
+        '''
+        This *internal* function replaces the shortcuts of a path by their
+        two halves, one level of shortcuts at a time
+
+        '''
+        N = len(self.rank)
+        keys = self.unpack_keys
+        path = np.array(nodes, dtype=np.int64)
+        while len(path) > 1 and len(keys) > 0:
+            wanted = path[:-1]*N + path[1:]
+            k = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+            found = keys[k] == wanted
+            if not found.any():
+                break
+            path = np.insert(path, np.flatnonzero(found) + 1,
+                             self.unpack_middles[k[found]])
+        return path.astype(np.int32)
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the ContractionHierarchy stored in the SECTIONS of
+    a bundle (zero-copy view of the bundle), or None if it has not been built
+
+    '''
+    if not all(name in bundle for name in SECTIONS):
+        return None
+    return ContractionHierarchy(*(bundle[name] for name in SECTIONS))
@@ -9,32 +9,85 @@ This Python script will read the grammalecte french thesaurus stored in
 the ./data/step0/ directory, process it a little bit (see below)
 and save it in a sparse matrix format under the ./data/step1/ directory
 
-This SHOULD NOT be used as a module
+This SHOULD NOT be used as a module (the read_thesaurus(), build_csr() and
+write_bundle() functions are only exposed for the build driver, see build.py)
 
 Assumption
 ----------
 The thesaurus is stored in the following filename :
     ./data/step0/thes_fr.dat
 
+Another file can be given with the --source option. It can also be the
+thesaurus archive (.zip) itself : the thes_fr.dat member is then streamed out
+of the archive and decoded on the fly, without any intermediate file
+
 Please use 'make matrix' to automatically download and extract the thesaurus
 
 
 Steps of the algorithm
 ----------------------
 
-Step 1 : we read the input file and parse the data in a dictionnary structure
-Step 2 : we go through the dictionnary and delete synonyms that are NOT
-an entry of the dictionnary itself (self consistency check)
+Step 1 : we stream the input file : every word (entry or synonym) is given
+an integer id on the fly and the (entry, synonym) pairs are appended to
+compact integer arrays (no intermediate dictionnary of lists), together
+with the sense group (rank of the sense line in its entry) and the part of
+speech tag (first field of the sense line) of each pair
+Step 2 : in a vectorized second pass, we delete synonyms that are NOT
+an entry of the dictionnary itself (self consistency check), number the
+entries alphabetically and build the CSR matrix directly
+With the --jobs option, the file is split in byte ranges at entry boundaries
+which are parsed by a pool of processes, and the vocabularies and the edges
+of the chunks are merged in the file order (the result does not depend on
+the number of jobs)
 Step 3 : conversion to numpy sparse matrix in COO format (fileout1)
 as well as a list of the thesaurus keys (fileout2)
+The matrix is also saved as raw CSR arrays (fileout3) that can be
+memory-mapped by the synonyms module (see storage.py)
+With the --packed-names option, the thesaurus keys are also saved in a
+compact UTF-8 format (fileout4, see packed_names.py)
+Step 4 : the matrix and the keys are gathered in a single versioned bundle
+(fileout5, see storage.py) together with the hash of the input file and
+the sense group and part of speech of each edge (see senses.py)
+With the --reorder option, the nodes of the graph of the bundle are renumbered
+for memory locality (see reorder.py), the keys staying sorted alphabetically
+With the --compress option, the neighbour lists of the bundle are gap and
+varint encoded (see compressed.py)
+With the --landmarks option, the distances to and from a few landmark words
+are stored in the bundle for the ALT shortest path engine (see landmarks.py)
+With the --weights option, a float32 weight is computed for each edge by a
+weight source (a weights file, the sense groups or the reciprocity of the
+edges, see weights.py) and stored in the bundle for weighted shortest paths
+With the --contract option (and --weights), the contraction hierarchy of the
+weighted graph is stored in the bundle (see contraction.py)
 
 Link : https://grammalecte.net/home.php?prj=fr
 
 """
 
+import io
+import os
+import zipfile
+import argparse
+import hashlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from scipy import sparse
 from numpy import savez
 
+import storage
+import packed_names
+import reorder
+import compressed
+import landmarks
+import views
+import senses
+import weights
+import contraction
+from adjacency import Adjacency
+
 def print_entry(name, syno_list):
     """this function prints out an entry of the thesaurus"""
     print("- %s : %s" %  (name, ' - '.join(syno_list) ) )
@@ -43,79 +96,478 @@ def print_entry(name, syno_list):
 filein = './data/step0/thes_fr.dat'
 fileout1 = './data/step1/thesaurus_matrix'
 fileout2 = './data/step1/thesaurus_entries'
+fileout3 = './data/step1/thesaurus_csr'
+fileout4 = './data/step1/thesaurus_names'
+fileout5 = './data/step1/thesaurus.bundle'
 
+# The name of the thesaurus file in the grammalecte archive
+member = 'thes_fr.dat'
 
-if __name__ == '__main__':
+# Version of the parser output (to be increased when the bundle gets new
+# sections for the same thesaurus, so that build.py rebuilds it)
+PARSER_VERSION = 2
+
+
+def file_hash(filename):
+    """this function returns the sha256 (hex digest) of a file"""
+    h = hashlib.sha256()
+    with open(filename, mode='rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def is_archive(filename):
+    """this function returns True if filename is a thesaurus archive (.zip)"""
+    return filename.lower().endswith('.zip')
+
+
+def open_thesaurus(filename, name=member):
+    """
+    This function returns a binary stream on the thesaurus : either the file
+    itself or, for an archive, its thes_fr.dat member (or any other member
+    given by name) which is decompressed on the fly (nothing is extracted on
+    the disk)
+    """
+    if not is_archive(filename):
+        return open(filename, mode='rb')
+    
+    with zipfile.ZipFile(filename) as z:
+        # The member may be stored in a sub-directory of the archive
+        names = [n for n in z.namelist() if os.path.basename(n) == name]
+        if len(names) == 0:
+            raise ValueError('%s does not contain %s' % (filename, name))
+        # The stream remains valid once the archive object is closed
+        return z.open(names[0])
+
+
+def source_hash(filename):
+    """
+    This function returns the sha256 (hex digest) of the thesaurus content,
+    so that a thes_fr.dat file and the archive that contains it have the
+    same hash
+    """
+    h = hashlib.sha256()
+    with open_thesaurus(filename) as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_thesaurus(lines):
+    """
+    This function parses the lines of the thesaurus (without the first line)
+    in a single streaming pass
+
+    Every word (entry or synonym) is interned to an integer id the first
+    time it is seen. The k-th entry line of the file is called occurrence k :
+    an entry appearing twice has two occurrences (only the last one is kept
+    later on, as the former dictionnary did).
+
+    Parameters
+    ----------
+    lines : iterable of str
+        the lines of the thesaurus
+
+    Returns
+    -------
+    words : str list
+        words[i] is the word of id i
+    entries : array('i')
+        entries[k] is the word id of occurrence k
+    occurrences : array('i')
+        occurrences[e] is the occurrence that edge e comes from
+    synonyms : array('i')
+        synonyms[e] is the word id of the synonym of edge e
+    tags : str list
+        tags[t] is the part of speech/sense tag of id t (e.g. '(nom)')
+    groups : array('i')
+        groups[e] is the sense group of edge e (the rank of its sense line
+        in its entry)
+    codes : array('i')
+        codes[e] is the tag id of the sense line of edge e
+    """
+    ids = {}
+    entries = array('i')
+    occurrences = array('i')
+    synonyms = array('i')
+    tag_ids = {}
+    groups = array('i')
+    codes = array('i')
     
-    d = {} # empty dictionnary
-    name = ""
-    syno_list = []
+    occurrence = -1
+    group = 0
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.startswith('('): # we read a new entry !
+            (name, _) = line.split('|')
+            occurrence = len(entries)
+            entries.append(ids.setdefault(name, len(ids)))
+            group = 0
+        else:
+            syno_list = line.split('|')
+            tag = syno_list.pop(0)
+            occurrences.extend([occurrence]*len(syno_list))
+            synonyms.extend([ids.setdefault(syno, len(ids)) for syno in syno_list])
+            groups.extend([group]*len(syno_list))
+            codes.extend([tag_ids.setdefault(tag, len(tag_ids))]*len(syno_list))
+            group += 1
     
+    return (list(ids), entries, occurrences, synonyms, list(tag_ids), groups, codes)
+
+
+def find_chunks(filename, nchunks):
+    """
+    This function splits the thesaurus file in (at most) nchunks byte ranges
+    Each range starts on an entry line (a line that does not start with '(')
+    so that no entry is split between two chunks. The first line of the
+    file is skipped.
+
+    Returns
+    -------
+    chunks : (int, int) list
+        the (start, end) byte positions of each chunk
+    """
+    size = os.path.getsize(filename)
     
-    # STEP 1 : we read the input file and parse the data in a dictionnary structure
-       
-    with open(filein, mode='rt', encoding='utf-8') as f:
-        next(f) # we skip first line
-        for line in f:
-            line = line.rstrip('\n')
-            if not line.startswith('('): # we read a new entry !
-                # First, we need to add the previous entry into our dictionnary
-                # But only if name is not empty !
-                if not name=="":
-                    #print_entry(name, syno_list)
-                    d[name] = syno_list
-                    syno_list = []
-                    
-                (name, _) = line.split('|')
-            else:
-                syno_list_tmp = line.split('|')
-                del syno_list_tmp[0]
-                syno_list = syno_list + syno_list_tmp
-    
-    # Now that we read all the entries we need to add the last entry
-    d[name] = syno_list
-    
-    
-    
-    # STEP 2 : we go through the dictionnary and delete synonyms that are NOT
-    # an entry of the dictionnary itself (self consistency check)
-         
-    d2 = {} # empty dictionnary
-    
-    for (name, syno_list) in d.items():
-        syno_list_2 = [syno for syno in syno_list if syno in d.keys()]
-        deleted_words = set(syno_list).symmetric_difference(set(syno_list_2))
+    with open(filename, mode='rb') as f:
+        f.readline() # we skip first line
+        bounds = [f.tell()]
+        for k in range(1, nchunks):
+            target = max(bounds[-1], size*k // nchunks)
+            f.seek(target)
+            if target > bounds[-1]:
+                f.readline() # we skip the partial line
+            while True:
+                pos = f.tell()
+                line = f.readline()
+                if not line or not line.startswith(b'('):
+                    break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    
+    return [(start, end) for (start, end) in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def parse_block(data):
+    """
+    This function parses a block of bytes made of whole entries
+    (see parse_thesaurus() for the output)
+    """
+    return parse_thesaurus(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'))
+
+
+def parse_chunk(filename, start, end):
+    """
+    This function parses the byte range [start, end) of the thesaurus file
+    (see parse_thesaurus() for the output)
+    """
+    with open(filename, mode='rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return parse_block(data)
+
+
+def _last_entry_start(data):
+    """
+    This *internal* function returns the position of the last entry line
+    (a line that does not start with '(') of data, or 0 if there is none.
+    The first byte of the line must be in data for the line to be checked
+    """
+    pos = data.rfind(b'\n')
+    while pos >= 0:
+        if pos + 1 < len(data) and data[pos+1:pos+2] != b'(':
+            return pos + 1
+        pos = data.rfind(b'\n', 0, pos)
+    return 0
+
+
+def iter_blocks(stream, block_size=1 << 24):
+    """
+    This function reads a binary stream on the thesaurus (e.g. an archive
+    member, which cannot be split by seeking) and yields blocks of about
+    block_size bytes made of whole entries. The first line is skipped.
+    """
+    stream.readline() # we skip first line
+    rest = b''
+    for data in iter(lambda: stream.read(block_size), b''):
+        data = rest + data
+        pos = _last_entry_start(data)
+        if pos > 0:
+            yield data[:pos]
+        rest = data[pos:]
+    if len(rest) > 0:
+        yield rest
+
+
+def merge_chunks(results):
+    """
+    This function merges the outputs of parse_chunk() for consecutive chunks
+    into a single output, as if parse_thesaurus() had read the whole file :
+    the words of each chunk are given global ids and the occurrences are
+    shifted by the number of entries of the previous chunks
+    """
+    ids = {}
+    entries = array('i')
+    occurrences = array('i')
+    synonyms = array('i')
+    tag_ids = {}
+    groups = array('i')
+    codes = array('i')
+    
+    for (words_k, entries_k, occurrences_k, synonyms_k,
+         tags_k, groups_k, codes_k) in results:
+        mapping = np.array([ids.setdefault(w, len(ids)) for w in words_k],
+                           dtype=np.int32)
+        tag_mapping = np.array([tag_ids.setdefault(t, len(tag_ids)) for t in tags_k],
+                               dtype=np.int32)
+        shift = len(entries)
+        entries.frombytes(mapping[np.frombuffer(entries_k, dtype=np.int32)].tobytes())
+        occurrences.frombytes((np.frombuffer(occurrences_k, dtype=np.int32) + shift).tobytes())
+        synonyms.frombytes(mapping[np.frombuffer(synonyms_k, dtype=np.int32)].tobytes())
+        groups.extend(groups_k)
+        codes.frombytes(tag_mapping[np.frombuffer(codes_k, dtype=np.int32)].tobytes())
+    
+    return (list(ids), entries, occurrences, synonyms, list(tag_ids), groups, codes)
+
+
+def parse_parallel(filename, jobs):
+    """
+    This function parses the thesaurus file with a pool of jobs processes
+    (see parse_thesaurus() for the output)
+    A file is split in byte ranges that each process reads by itself,
+    whereas an archive is decompressed by the main process and sent block
+    by block (at most 2*jobs blocks are pending, to bound the memory)
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if not is_archive(filename):
+            chunks = find_chunks(filename, 4*jobs)
+            results = executor.map(parse_chunk, [filename]*len(chunks),
+                                   [start for (start, _) in chunks],
+                                   [end for (_, end) in chunks])
+            return merge_chunks(results)
         
-        if len(deleted_words)>0:
-            pass
-            # uncomment the following line to see which words are deleted
-            #print('- Deleted entries for "%s" : %s' % ( name, " - ".join(deleted_words) ))
-        d2[name] = syno_list_2
+        results = []
+        pending = deque()
+        with open_thesaurus(filename) as stream:
+            for data in iter_blocks(stream):
+                pending.append(executor.submit(parse_block, data))
+                if len(pending) >= 2*jobs:
+                    results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+        return merge_chunks(results)
+
+
+def read_thesaurus(filename, jobs=1):
+    """
+    This function parses the whole thesaurus file, with a pool of processes
+    if jobs > 1 (see parse_thesaurus() for the output)
+    """
+    if jobs > 1:
+        return parse_parallel(filename, jobs)
     
+    with open_thesaurus(filename) as stream:
+        f = io.TextIOWrapper(stream, encoding='utf-8')
+        next(f) # we skip first line
+        return parse_thesaurus(f)
+
+
+def build_csr(words, entries, occurrences, synonyms, tags, groups, codes):
+    """
+    This function turns the output of parse_thesaurus() into the sorted
+    entries and the CSR arrays of the adjacency matrix
+    Everything is done with vectorized numpy operations
+
+    Returns
+    -------
+    keys : str tuple
+        the entries of the thesaurus, sorted alphabetically
+    indptr, indices : int32 ndarray
+        the CSR arrays of the adjacency matrix (sorted, without duplicates)
+    senses : Senses
+        the sense group and part of speech of each edge (see senses.py)
+    """
+    entries = np.frombuffer(entries, dtype=np.int32)
+    occurrences = np.frombuffer(occurrences, dtype=np.int32)
+    synonyms = np.frombuffer(synonyms, dtype=np.int32)
+    groups = np.frombuffer(groups, dtype=np.int32)
+    codes = np.frombuffer(codes, dtype=np.int32)
     
-    # STEP 3 : Now we want to convert all that in a sparse matrix
+    # Only the last occurrence of an entry is kept
+    last = np.full(len(words), -1, dtype=np.int64)
+    np.maximum.at(last, entries, np.arange(len(entries)))
+    is_entry = last >= 0
     
-    keys = tuple(sorted(d2.keys()))
+    sources = entries[occurrences]
+    current = last[sources] == occurrences
+    keep = current & is_entry[synonyms]
+    
+    # The entries are numbered alphabetically
+    order = sorted(np.flatnonzero(is_entry), key=words.__getitem__)
+    keys = tuple(words[k] for k in order)
     Nentries = len(keys)
-    indices = range(Nentries)
     
-    # Construction of I,J,V vectors in COO format
+    rank = np.full(len(words), -1, dtype=np.int64)
+    rank[order] = np.arange(Nentries)
+    
+    # The tags are numbered alphabetically too
+    tag_order = sorted(range(len(tags)), key=tags.__getitem__)
+    tag_rank = np.zeros(max(len(tags), 1), dtype=np.int64)
+    tag_rank[tag_order] = np.arange(len(tags))
+    codes = tag_rank[codes]
+    
+    # The parts of speech of an entry are those of all its sense lines
+    node_pos = np.zeros(Nentries, dtype=np.uint64)
+    np.bitwise_or.at(node_pos, rank[sources[current]],
+                     senses.pos_bits(codes[current]))
+    
+    # Sorted and unique (row, column) pairs give the CSR arrays directly
+    # (a duplicated pair keeps its first sense group)
+    pairs = rank[sources[keep]]*Nentries + rank[synonyms[keep]]
+    sort = np.lexsort((groups[keep], pairs))
+    pairs = pairs[sort]
+    first = np.r_[True, pairs[1:] != pairs[:-1]] if len(pairs) else np.zeros(0, dtype=bool)
+    pairs = pairs[first]
+    rows = pairs // max(Nentries, 1)
+    
+    indptr = np.zeros(Nentries + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=Nentries), out=indptr[1:])
+    indices = (pairs - rows*Nentries).astype(np.int32)
+    
+    edge_sense = groups[keep][sort][first]
+    edge_pos = codes[keep][sort][first]
+    
+    return (keys, indptr, indices,
+            senses.Senses.from_arrays([tags[t] for t in tag_order],
+                                      edge_sense, edge_pos, node_pos))
+
+
+def write_bundle(fileout, keys, indptr, indices, source_hash, build_options,
+                 method=None, compress=False, sense_info=None, nlandmarks=0,
+                 landmark_method='farthest', edge_weights=None, contract=False):
+    """
+    This function gathers the CSR arrays, the packed keys and the sense
+    information (if given, see senses.py) in a single bundle (see
+    storage.py) and returns its content hash
+    If method is given (see reorder.METHODS), the nodes of the graph are
+    renumbered and the permutation is saved in the perm and iperm sections
+    If compress is True, the indices are replaced by the compressed
+    neighbour lists (see compressed.py)
+    If nlandmarks is not 0, the landmark distance tables are computed on the
+    (reordered) graph and saved in the alt_* sections (see landmarks.py)
+    If edge_weights is given (aligned with indices, see weights.py), it is
+    saved in the weights section
+    If contract is True, the contraction hierarchy of the weighted (and
+    reordered) graph is saved in the ch_* sections (see contraction.py)
+    The graph sections (see storage.save_bundle) are the names and the
+    adjacency, the sense, weight, landmark and hierarchy sections are not
+    """
+    if contract and edge_weights is None:
+        raise ValueError('The contraction hierarchy needs the edge weights')
+    names = packed_names.PackedNames.from_words(keys)
+    
+    sections = {'names_blob' : names.blob,
+                'names_offsets' : names.offsets}
     
-    I = []; J = []; V = [];
+    if method is not None:
+        iperm = reorder.node_order(indptr, indices, method)
+        perm = np.empty_like(iperm)
+        perm[iperm] = np.arange(len(iperm), dtype=np.int32)
+        (indptr, indices, order) = reorder.permute_csr(indptr, indices, perm,
+                                                       return_order=True)
+        if sense_info is not None:
+            sense_info = sense_info.permuted(order, perm)
+        if edge_weights is not None:
+            edge_weights = edge_weights[order]
+        sections['perm'] = perm
+        sections['iperm'] = iperm
     
-    t = {n:k for (k, n) in enumerate(keys)}
+    sections['indptr'] = indptr
+    if compress:
+        C = compressed.compress(Adjacency(indptr, indices))
+        sections['cadj_offsets'] = C.offsets
+        sections['cadj_data'] = C.data
+    else:
+        sections['indices'] = indices
+    # The senses, the weights, the hierarchy and the landmarks are not graph
+    # sections : the derived indexes do not depend on them
+    graph_sections = list(sections)
+    if sense_info is not None:
+        sections.update(sense_info.sections())
+    if edge_weights is not None:
+        sections['weights'] = np.asarray(edge_weights, dtype=np.float32)
+    if contract:
+        sections.update(zip(contraction.SECTIONS,
+                            contraction.contract(indptr, indices, edge_weights)))
+    if nlandmarks > 0:
+        forward = Adjacency(indptr, indices)
+        tables = landmarks.compute(forward, views.transpose(forward),
+                                   nlandmarks, landmark_method)
+        sections.update(zip(landmarks.SECTIONS, tables))
     
-    for (name, syno_list) in d2.items():
-        rank_key = t[name]
-        rank_values = [t[n] for n in syno_list]
-        if len(rank_values)>0: # This should always be the case, but we check
-            I.extend([rank_key]*len(rank_values))
-            J.extend(rank_values)
+    return storage.save_bundle(fileout, sections, source_hash=source_hash,
+                               build_options=build_options,
+                               graph_sections=graph_sections)
+
+
+if __name__ == '__main__':
     
+    parser = argparse.ArgumentParser(
+        description='Conversion of the thesaurus into a sparse matrix')
+    parser.add_argument('--source', default=filein,
+                        help='thesaurus file (.dat) or archive (.zip)')
+    parser.add_argument('--packed-names', action='store_true',
+                        help='also save the entries in the packed UTF-8 format')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of processes used to parse the thesaurus')
+    parser.add_argument('--reorder', choices=reorder.METHODS,
+                        help='node ordering of the graph of the bundle')
+    parser.add_argument('--compress', action='store_true',
+                        help='compress the neighbour lists of the bundle')
+    parser.add_argument('--landmarks', type=int, default=0,
+                        help='number of landmarks of the ALT engine')
+    parser.add_argument('--landmark-method', choices=landmarks.METHODS,
+                        default='farthest', help='landmark selection method')
+    parser.add_argument('--weights', metavar='SOURCE[:OPTION]',
+                        help='edge weights : %s (see weights.py)'
+                        % ', '.join(weights.SOURCES))
+    parser.add_argument('--contract', action='store_true',
+                        help='build the contraction hierarchy of the weighted '
+                        'graph (see contraction.py)')
+    args = parser.parse_args()
     
-    V = [1]*len(I)
-    M = sparse.coo_matrix((V, (I,J)), shape=(Nentries, Nentries), dtype=bool)
     
+    # STEP 1 : we stream the input file into integer arrays
     
-    sparse.save_npz(fileout1, M)
+    parsed = read_thesaurus(args.source, args.jobs)
+    
+    
+    # STEP 2 : self consistency check and CSR construction
+    
+    (keys, indptr, indices, sense_info) = build_csr(*parsed)
+    Nentries = len(keys)
+    
+    
+    # STEP 3 : the outputs
+    
+    M = storage.csr_from_arrays(indptr, indices)
+    
+    sparse.save_npz(fileout1, M.tocoo())
     savez(fileout2, names=keys)
+    storage.save_csr(fileout3, M)
+    
+    if args.packed_names:
+        packed_names.save_names(fileout4, keys)
+    
+    # STEP 4 : everything is gathered in a single bundle
+    
+    edge_weights = None
+    if args.weights is not None:
+        edge_weights = weights.edge_weights(args.weights, keys, indptr, indices,
+                                            sense_info)
+    
+    write_bundle(fileout5, keys, indptr, indices, source_hash(args.source),
+                 vars(args), args.reorder, args.compress, sense_info,
+                 args.landmarks, args.landmark_method, edge_weights,
+                 args.contract)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the all-pairs distance matrix of the thesaurus graph :
+the number of steps from every word to every word, precomputed once by a
+pool of processes and then read by plain array indexing
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+DistanceMatrix(basename, mmap_mode='r')
+    the saved matrix : distance(source, target), distances_from(source)
+
+Functions
+---------
+
+bfs_rows(graph, sources, max_depth=UNREACHABLE - 1)
+    the distances from a block of sources (uint8 rows)
+
+compute(basename, graph, content_hash, jobs=1, block_size=256, resume=True)
+    fills the matrix, block by block, with a pool of jobs processes
+
+progress(basename)
+    the progress record of a (possibly interrupted) computation
+
+is_complete(basename, content_hash=None)
+    returns True if the matrix has been fully computed
+
+
+Representation
+--------------
+
+The matrix is a uint8 array of shape (nodes, nodes) saved as a .npy file,
+numbered like the graph : matrix[s, t] is the distance from s to t, and
+UNREACHABLE (255) stands for "no path" (or a path longer than 254 steps).
+For 36k words, it takes 1.3 GB, which are memory-mapped : a distance is a
+single read, the distances from a word are a row.
+
+The rows are computed by blocks of block_size sources. All the sources of a
+block are searched together, level by level, with a sparse matrix product
+(the frontier of each source is a row of a sparse matrix, see get_next in
+synonyms.py), and the rows are written directly into the memory-mapped
+file by the process that computes them.
+The blocks that are done are recorded in <basename>_progress.json (with the
+content hash of the graph) only once their rows are flushed to the disk, so
+that an interrupted computation resumes with the missing blocks.
+
+"""
+
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy import sparse
+
+from adjacency import as_scipy
+
+# The distance of an unreachable word
+UNREACHABLE = 255
+
+# The graph and the matrix of a worker process (see _init_worker)
+_worker = {}
+
+
+def _filenames(basename):
+    return ('%s.npy' % basename, '%s_progress.json' % basename)
+
+
+def bfs_rows(graph, sources, max_depth=UNREACHABLE - 1):
+    '''
+    This function computes the distances from many sources at once : the
+    frontiers of all the sources are expanded together by a sparse matrix
+    product
+
+    Parameters
+    ----------
+    graph : sparse matrix in CSR format
+        the graph
+    sources : int ndarray
+        the sources
+    max_depth : int, optional
+        the search stops after this level. The default is UNREACHABLE - 1.
+
+    Returns
+    -------
+    uint8 ndarray of shape (len(sources), nodes)
+        the distance from each source to each node (UNREACHABLE if there is
+        no path)
+
+    '''
+    N = graph.shape[0]
+    B = len(sources)
+    rows = np.full((B, N), UNREACHABLE, dtype=np.uint8)
+    (r, c) = (np.arange(B), np.asarray(sources))
+    rows[r, c] = 0
+
+    level = 0
+    while len(r) > 0 and level < max_depth:
+        level += 1
+        frontier = sparse.csr_matrix((np.ones(len(r), dtype=np.int32), (r, c)),
+                                     shape=(B, N))
+        reached = (frontier @ graph).tocoo()
+        new = rows[reached.row, reached.col] == UNREACHABLE
+        (r, c) = (reached.row[new], reached.col[new])
+        rows[r, c] = level
+    return rows
+
+
+def progress(basename):
+    '''
+    This function returns the progress record of a computation, or None if
+    it has never been started
+
+    Returns
+    -------
+    dictionary
+        'content_hash' : the hash of the graph
+        'nodes'        : the number of nodes
+        'block_size'   : the number of rows of a block
+        'done'         : the first row of each block that is done
+
+    '''
+    filename = _filenames(basename)[1]
+    if not os.path.exists(filename):
+        return None
+    with open(filename, mode='rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_progress(basename, record):
+    '''
+    This *internal* function writes the progress record (atomically, so
+    that an interruption does not leave a broken record)
+
+    '''
+    filename = _filenames(basename)[1]
+    with open(filename + '.tmp', mode='wt', encoding='utf-8') as f:
+        json.dump(record, f)
+    os.replace(filename + '.tmp', filename)
+
+
+def is_complete(basename, content_hash=None):
+    '''
+    This function returns True if all the blocks of the matrix are done
+    (for the graph of the given content hash, if any)
+
+    '''
+    record = progress(basename)
+    if record is None or not os.path.exists(_filenames(basename)[0]):
+        return False
+    if content_hash is not None and record['content_hash'] != content_hash:
+        return False
+    blocks = -(-record['nodes'] // record['block_size'])
+    return len(record['done']) == blocks
+
+
+def _init_worker(indptr, indices, filename):
+    '''
+    This *internal* function loads the graph and opens the matrix in a
+    worker process
+
+    '''
+    _worker['graph'] = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32),
+                                          indices, indptr),
+                                         shape=(len(indptr) - 1, len(indptr) - 1))
+    _worker['matrix'] = np.load(filename, mmap_mode='r+')
+
+
+def _fill_block(start, stop):
+    '''
+    This *internal* function computes the rows start:stop of the matrix
+    and flushes them to the disk
+
+    '''
+    matrix = _worker['matrix']
+    matrix[start:stop] = bfs_rows(_worker['graph'], np.arange(start, stop))
+    matrix.flush()
+    return start
+
+
+def compute(basename, graph, content_hash, jobs=1, block_size=256, resume=True):
+    '''
+    This function computes the matrix (see the representation above), or
+    the blocks that are missing if a computation of the same graph has
+    been interrupted
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the .npy/_progress.json suffix
+    graph : Adjacency or sparse matrix
+        the graph
+    content_hash : str
+        the hash of the graph (see Thesaurus.content_hash), which tells if
+        a previous computation can be resumed
+    jobs : int, optional
+        the number of processes. The default is 1.
+    block_size : int, optional
+        the number of sources of a block. The default is 256.
+    resume : bool, optional
+        False to start again from scratch. The default is True.
+
+    '''
+    graph = as_scipy(graph).tocsr()
+    N = graph.shape[0]
+    (matrix_file, _) = _filenames(basename)
+
+    record = progress(basename)
+    if not resume or record is None or not os.path.exists(matrix_file) or \
+            (record['content_hash'], record['nodes'], record['block_size']) != \
+            (content_hash, N, block_size):
+        np.lib.format.open_memmap(matrix_file, mode='w+', dtype=np.uint8,
+                                  shape=(N, N)).flush()
+        record = {'content_hash' : content_hash, 'nodes' : N,
+                  'block_size' : block_size, 'done' : []}
+        _save_progress(basename, record)
+
+    done = set(record['done'])
+    blocks = [(start, min(start + block_size, N))
+              for start in range(0, N, block_size) if not start in done]
+    initargs = (graph.indptr, graph.indices, matrix_file)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(_fill_block, *block) for block in blocks]
+            for future in as_completed(futures):
+                record['done'].append(future.result())
+                _save_progress(basename, record)
+    else:
+        _init_worker(*initargs)
+        try:
+            for block in blocks:
+                record['done'].append(_fill_block(*block))
+                _save_progress(basename, record)
+        finally:
+            _worker.clear()
+
+
+class DistanceMatrix:
+    '''
+    This class reads the matrix saved by compute() (memory-mapped)
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the .npy/_progress.json suffix
+    mmap_mode : str or None, optional
+        the mmap_mode given to np.load(). None reads the matrix in memory.
+        The default is 'r'.
+
+    '''
+
+    def __init__(self, basename, mmap_mode='r'):
+        (matrix_file, _) = _filenames(basename)
+        self.basename = basename
+        self.matrix = np.load(matrix_file, mmap_mode=mmap_mode)
+        self.content_hash = progress(basename)['content_hash']
+
+    def __repr__(self):
+        return 'DistanceMatrix(%d nodes)' % self.matrix.shape[0]
+
+    def distance(self, source, target):
+        '''
+        This function returns the distance from source to target
+        (-1 if there is no path)
+
+        '''
+        d = int(self.matrix[source, target])
+        return -1 if d == UNREACHABLE else d
+
+    def distances_from(self, source):
+        '''
+        This function returns the distances from source to every node
+        (uint8, UNREACHABLE if there is no path), a row of the matrix
+
+        '''
+        return self.matrix[source]
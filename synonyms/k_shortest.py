@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the k shortest loopless paths between two nodes of the
+thesaurus graph (Yen's algorithm), as a generator
+
+
+Usage
+-----
+
+As a module, it will export the following classes
+
+Classes
+-------
+
+MaskedSearch(forward, backward=None, weights=None)
+    a bounded shortest path search that skips blocked nodes and edges
+
+KShortestPaths(forward, backward=None, weights=None)
+    the loopless paths from a source to a target, shortest first
+
+
+Algorithm
+---------
+
+The first path is a shortest path. Each next path deviates from one of the
+paths already found (Yen) : for each node of the last path (the spur node),
+the part of the path before it (the root) is kept, and a shortest path from
+the spur node to the target is searched in the graph without
+    - the nodes of the root (the paths stay loopless)
+    - the edges that leave the spur node along a path already found with the
+      same root (the path is a new one)
+The candidates (root + spur path) are kept in a heap, and the lightest one
+is the next path. A path only needs spur searches from the node where it
+deviates from its parent (Lawler), the nodes before it have been searched
+already.
+
+The nodes and edges are not removed from the graph : they are blocked in
+two boolean masks of the size of the graph (nodes) and of its edges
+(aligned with indices), which the search skips, and which are cleared at
+the blocked positions after each spur search. The search is bounded : it
+stops at the target, and at the length (or weight) left to the path after
+its root. On the unweighted graph, it is a level by level BFS with
+vectorized numpy operations, from both ends when the transposed graph is
+given (see traversal.BidirectionalBFS; the backward search finds the
+blocked edges by their key u*nodes + v); with weights, a Dijkstra search.
+
+The paths are generated lazily : the spur searches that give the (k+1)-th
+path are only run when it is asked for, so that a caller that stops after
+three paths does not pay for ten.
+
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+from traversal import UNSEEN
+
+
+class MaskedSearch:
+    '''
+    This class computes shortest paths in the graph without the nodes and
+    edges blocked in its masks (see the algorithm above)
+
+    Parameters
+    ----------
+    forward : Adjacency
+        the graph (out-neighbours)
+    backward : Adjacency, optional
+        the transposed graph (in-neighbours), which makes the unweighted
+        search bidirectional. The default is None.
+    weights : float32 ndarray, optional
+        the weight of each edge (aligned with the edges of forward).
+        The default is None (unweighted graph, the paths are counted in steps).
+
+    '''
+
+    def __init__(self, forward, backward=None, weights=None):
+        N = forward.shape[0]
+        self.graphs = (forward, backward)
+        self.indptr = np.asarray(forward.indptr)
+        self.weights = None if weights is None else np.asarray(weights)
+        # The blocked nodes and edges (see block and clear)
+        self.blocked_nodes = np.zeros(N, dtype=bool)
+        self.blocked_edges = np.zeros(self.indptr[-1], dtype=bool)
+        self._blocked = ([], [], [])
+        self._parent = [np.full(N, UNSEEN, dtype=np.int32) for _ in range(2)]
+        self._depth = [np.zeros(N, dtype=np.int32) for _ in range(2)]
+        # The decoded rows of the nodes already searched (see _row)
+        self._rows = {}
+
+    def __repr__(self):
+        return 'MaskedSearch(%d nodes, %s)' % (self.graphs[0].shape[0],
+                                               'unweighted' if self.weights is None
+                                               else 'weighted')
+
+    def edge(self, u, v):
+        '''
+        This function returns the position of the edge u -> v in the edges
+        of the graph
+
+        '''
+        return int(self.indptr[u]) + int(np.searchsorted(self.graphs[0].neighbors(u), v))
+
+    def block(self, nodes=(), edges=()):
+        '''
+        This function blocks nodes and edges (u, v) until clear
+
+        '''
+        nodes = list(nodes)
+        positions = [self.edge(u, v) for (u, v) in edges]
+        self.blocked_nodes[nodes] = True
+        self.blocked_edges[positions] = True
+        self._blocked[0].extend(nodes)
+        self._blocked[1].extend(positions)
+        # The backward search finds the edges by their key u*nodes + v
+        self._blocked[2].extend(u*len(self.blocked_nodes) + v for (u, v) in edges)
+
+    def clear(self):
+        '''
+        This function unblocks the blocked nodes and edges
+
+        '''
+        self.blocked_nodes[self._blocked[0]] = False
+        self.blocked_edges[self._blocked[1]] = False
+        for blocked in self._blocked:
+            blocked.clear()
+
+    def path(self, source, target, limit=None):
+        '''
+        This function computes a shortest path from source to target that
+        does not use the blocked nodes and edges
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        limit : float, optional
+            the paths longer (or heavier) than limit are not searched.
+            The default is None (no limit).
+
+        Returns
+        -------
+        cost : float
+            the length (or weight) of the path (inf if there is no path)
+        path : int list
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        if self.blocked_nodes[source] or self.blocked_nodes[target]:
+            return (math.inf, None)
+        if self.weights is None:
+            return self._bfs(source, target, limit)
+        return self._dijkstra(source, target, limit)
+
+    def _walk(self, side, node):
+        '''
+        This *internal* function returns the nodes from node back to the
+        root of a search
+
+        '''
+        parent = self._parent[side]
+        nodes = [node]
+        while parent[nodes[-1]] >= 0:
+            nodes.append(int(parent[nodes[-1]]))
+        return nodes
+
+    def _expand(self, side, frontier, level):
+        '''
+        This *internal* function expands a frontier by one level, without
+        the blocked nodes and edges (see traversal._expand)
+
+        Returns
+        -------
+        int32 ndarray
+            the new frontier (sorted)
+
+        '''
+        graph = self.graphs[side]
+        (parent, depth) = (self._parent[side], self._depth[side])
+        starts = np.asarray(graph.indptr[frontier], dtype=np.int64)
+        lengths = np.asarray(graph.indptr[frontier + 1], dtype=np.int64) - starts
+        sources = np.repeat(frontier, lengths)
+        neighbors = graph.neighbors_of(frontier)
+
+        keep = ~self.blocked_nodes[neighbors] & (parent[neighbors] == UNSEEN)
+        if self._blocked[1] and side == 0:
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) \
+                + np.arange(len(neighbors))
+            keep &= ~self.blocked_edges[positions]
+        elif self._blocked[1]:
+            keys = neighbors.astype(np.int64)*len(parent) + sources
+            keep &= ~np.isin(keys, self._blocked[2])
+        (nodes, first) = np.unique(neighbors[keep], return_index=True)
+        nodes = nodes.astype(np.int32)
+        parent[nodes] = sources[keep][first]
+        depth[nodes] = level
+        return nodes
+
+    def _bfs(self, source, target, limit):
+        '''
+        This *internal* function searches the unweighted graph level by
+        level, from both ends if the transposed graph is known (see
+        traversal.BidirectionalBFS)
+
+        '''
+        if source == target:
+            return (0, [source])
+
+        roots = (source, target)
+        sides = (0, 1) if self.graphs[1] is not None else (0,)
+        frontiers = [np.array([root], dtype=np.int32) for root in roots]
+        levels = [0, 0]
+        discovered = [[frontier] for frontier in frontiers]
+        for side in sides:
+            self._parent[side][roots[side]] = -1
+            self._depth[side][roots[side]] = 0
+
+        try:
+            while len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+                if limit is not None and levels[0] + levels[1] >= limit:
+                    return (math.inf, None)
+
+                side = 0 if len(sides) == 1 or \
+                    len(frontiers[0]) <= len(frontiers[1]) else 1
+                levels[side] += 1
+                frontiers[side] = self._expand(side, frontiers[side], levels[side])
+                discovered[side].append(frontiers[side])
+
+                if len(sides) == 1:
+                    meet = frontiers[0][frontiers[0] == target]
+                    other = None
+                else:
+                    other = 1 - side
+                    meet = frontiers[side][self._parent[other][frontiers[side]] != UNSEEN]
+                if len(meet) > 0:
+                    node = int(meet[0]) if other is None else \
+                        int(meet[np.argmin(self._depth[other][meet])])
+                    path = self._walk(0, node)
+                    path.reverse()
+                    if other is not None:
+                        path += self._walk(1, node)[1:]
+                    return (len(path) - 1, path)
+            return (math.inf, None)
+        finally:
+            # Only the discovered nodes are reset
+            for side in sides:
+                self._parent[side][np.concatenate(discovered[side])] = UNSEEN
+
+    def _row(self, node):
+        '''
+        This *internal* function returns the position of the first edge of
+        a node, its neighbours and the weights of its edges, decoded once
+        (the rows of a compressed graph are costly to decode)
+
+        '''
+        row = self._rows.get(node)
+        if row is None:
+            (a, b) = (int(self.indptr[node]), int(self.indptr[node + 1]))
+            row = (a, self.graphs[0].neighbors(node).tolist(),
+                   self.weights[a:b].tolist())
+            self._rows[node] = row
+        return row
+
+    def _dijkstra(self, source, target, limit):
+        '''
+        This *internal* function searches the weighted graph with Dijkstra
+
+        '''
+        parent = self._parent[0]
+        # The few blocked positions are faster to test as sets in a loop
+        (blocked_nodes, blocked_edges) = (set(self._blocked[0]), set(self._blocked[1]))
+        limit = math.inf if limit is None else limit
+        distance = {source : 0.0}
+        parent[source] = -1
+        queue = [(0.0, source)]
+        try:
+            while queue:
+                (cost, node) = heapq.heappop(queue)
+                if cost > distance[node]:
+                    continue
+                if node == target:
+                    path = self._walk(0, target)
+                    path.reverse()
+                    return (cost, path)
+                (a, neighbors, costs) = self._row(node)
+                for (k, neighbor) in enumerate(neighbors):
+                    new_cost = cost + costs[k]
+                    if new_cost <= limit and \
+                            new_cost < distance.get(neighbor, math.inf) and \
+                            not neighbor in blocked_nodes and \
+                            not a + k in blocked_edges:
+                        distance[neighbor] = new_cost
+                        parent[neighbor] = node
+                        heapq.heappush(queue, (new_cost, neighbor))
+            return (math.inf, None)
+        finally:
+            # Only the reached nodes are reset
+            parent[list(distance)] = UNSEEN
+
+
+class KShortestPaths:
+    '''
+    This class generates the loopless paths between two nodes, shortest
+    first (see the algorithm above)
+
+    Parameters
+    ----------
+    forward : Adjacency
+        the graph (out-neighbours)
+    backward : Adjacency, optional
+        the transposed graph (see MaskedSearch). The default is None.
+    weights : float32 ndarray, optional
+        the weight of each edge. The default is None (the paths are ranked
+        by their number of steps).
+
+    '''
+
+    def __init__(self, forward, backward=None, weights=None):
+        self.search = MaskedSearch(forward, backward, weights)
+
+    def __repr__(self):
+        return 'KShortestPaths(%d nodes)' % self.search.graphs[0].shape[0]
+
+    def _costs(self, path):
+        '''
+        This *internal* function returns the cost of each prefix of a path
+        (the number of steps, or the sum of the weights)
+
+        '''
+        if self.search.weights is None:
+            return list(range(len(path)))
+        costs = [0.0]
+        for (u, v) in zip(path[:-1], path[1:]):
+            costs.append(costs[-1] + float(self.search.weights[self.search.edge(u, v)]))
+        return costs
+
+    def paths(self, source, target, limit=None):
+        '''
+        This function generates the loopless paths from source to target,
+        by increasing length (or weight)
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        limit : float, optional
+            the paths longer (or heavier) than limit are not generated.
+            The default is None (no limit).
+
+        Yields
+        ------
+        cost : float
+            the length (or weight) of the path
+        path : int32 ndarray
+            the nodes of the path, from source to target
+
+        '''
+        search = self.search
+        (cost, path) = search.path(source, target, limit)
+        if path is None:
+            return
+
+        # The paths found (nodes and prefix costs) and the candidates
+        # (cost, length, nodes, deviation node) of the heap
+        found = []
+        candidates = []
+        seen = {tuple(path)}
+        (costs, deviation) = (self._costs(path), 0)
+        while True:
+            found.append(path)
+            yield (costs[-1], np.array(path, dtype=np.int32))
+
+            for i in range(deviation, len(path) - 1):
+                root = path[:i + 1]
+                search.block(nodes=root[:-1],
+                             edges=[(p[i], p[i + 1]) for p in found
+                                    if len(p) > i + 1 and p[:i + 1] == root])
+                try:
+                    (spur_cost, spur) = search.path(path[i], target,
+                                                    None if limit is None
+                                                    else limit - costs[i])
+                finally:
+                    search.clear()
+                if spur is not None:
+                    candidate = root[:-1] + spur
+                    if not tuple(candidate) in seen:
+                        seen.add(tuple(candidate))
+                        heapq.heappush(candidates, (costs[i] + spur_cost,
+                                                    len(candidate), candidate, i))
+
+            if not candidates:
+                return
+            (_, _, path, deviation) = heapq.heappop(candidates)
+            costs = self._costs(path)
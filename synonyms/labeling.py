@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides an exact distance oracle for the thesaurus graph : a
+2-hop labeling computed by pruned landmark labeling
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+Labels(order, out_label, in_label)
+    the 2-hop labels of a graph : exact distances and shortest paths
+
+Functions
+---------
+
+degree_order(forward, backward)
+    the nodes sorted by decreasing degree
+
+build_labels(forward, backward, order=None)
+    computes the labels by pruned landmark labeling
+
+save_labels(basename, labels, content_hash=None)
+load_labels(basename, mmap_mode='r')
+    saves and loads (memory-mapped) the label arrays
+
+labels_exist(basename, content_hash=None)
+    returns True if the labels have been saved (for the graph of the given
+    content hash, if any)
+
+
+Algorithm
+---------
+
+Every node v gets two labels, i.e. lists of (hub, distance) pairs :
+    out_label(v) : hubs h with the distance d(v, h)
+    in_label(v)  : hubs h with the distance d(h, v)
+such that for any nodes s and t, a shortest path from s to t goes through a
+hub of both out_label(s) and in_label(t). The distance is then
+    d(s, t) = min over the common hubs h of d(s, h) + d(h, t)
+which is computed by merging two short sorted lists, without any search.
+
+The labels are computed by pruned landmark labeling (Akiba et al., 2013) :
+the nodes are taken in order of decreasing degree, and each one runs a BFS
+forwards (adding itself to the in-labels of the nodes it reaches) and
+backwards (out-labels). A node is pruned, i.e. neither labelled nor
+expanded, when the labels already computed give a distance as short as the
+one of the BFS. The first hubs reach most of the graph, the following
+searches are quickly pruned, and the labels stay short on graphs that have
+hub words (the labels of a random graph without hubs would be huge : the
+size is printed by the build). Each search is vectorized level by level
+like traversal.BFS.
+
+Each label entry also stores the next node towards the hub (out-labels) or
+the previous node from the hub (in-labels) : since a pruned node is never
+expanded, this node has the same hub in its label, so that a shortest path
+is rebuilt by following the stored parents from both ends to the hub.
+
+Storage
+-------
+
+The labels are stored in CSR form, the entries of a node being sorted by
+hub (hubs are numbered by their rank in the order) :
+    order                 int32, the node of each rank
+    <side>_indptr         int64, the entries of node v are
+                          <side>_indptr[v]:<side>_indptr[v+1]
+    <side>_hubs           int32, the rank of each hub
+    <side>_dists          uint8, the distance to (or from) the hub
+    <side>_parents        int32, the next (or previous) node of the path
+for side in out and in, saved as <basename>_<array>.npy (build.py --labels)
+and memory-mapped when loaded. They are stamped with the graph hash of the
+bundle (<basename>_hash.json, see storage.py) : the labels of an earlier
+build of another graph are not used.
+
+"""
+
+import os
+
+import numpy as np
+
+import storage
+
+# The arrays of the labels, saved as <basename>_<array>.npy
+ARRAYS = ('order',
+          'out_indptr', 'out_hubs', 'out_dists', 'out_parents',
+          'in_indptr', 'in_hubs', 'in_dists', 'in_parents')
+
+# A distance larger than any distance of the labels (uint8)
+_INF = 1 << 20
+
+
+def _ranges(indptr, nodes):
+    '''
+    This *internal* function returns the positions of the entries of many
+    nodes in a CSR array, with a single vectorized gather
+
+    Returns
+    -------
+    positions : int64 ndarray
+        the concatenated ranges indptr[v]:indptr[v+1]
+    lengths : int64 ndarray
+        the number of entries of each node
+
+    '''
+    starts = np.asarray(indptr[nodes], dtype=np.int64)
+    lengths = np.asarray(indptr[nodes + 1], dtype=np.int64) - starts
+    shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return (shift + np.arange(int(lengths.sum())), lengths)
+
+
+def _min_by_node(values, lengths):
+    '''
+    This *internal* function returns the minimum of the values of each node
+    (_INF for the nodes without any value)
+
+    '''
+    result = np.full(len(lengths), _INF, dtype=np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        result[nonempty] = np.minimum.reduceat(values, starts)
+    return result
+
+
+def degree_order(forward, backward):
+    '''
+    This function returns the nodes sorted by decreasing degree (in and out
+    neighbours), the order of the hubs of build_labels
+
+    '''
+    degree = forward.degrees() + backward.degrees()
+    return np.argsort(-degree, kind='stable').astype(np.int32)
+
+
+class _Side:
+    '''
+    This *internal* class holds the labels of one side during the build :
+    a (nodes, capacity) table of hubs and distances for the pruning queries,
+    which grows when a label is full, and the added entries in build order
+
+    '''
+
+    def __init__(self, N):
+        self.hubs = np.zeros((N, 16), dtype=np.int32)
+        self.dists = np.zeros((N, 16), dtype=np.uint8)
+        self.count = np.zeros(N, dtype=np.int64)
+        self.entries = []
+
+    def add(self, nodes, hub, distance, parents):
+        if self.count[nodes].max() >= self.hubs.shape[1]:
+            (N, capacity) = self.hubs.shape
+            for name in ('hubs', 'dists'):
+                table = getattr(self, name)
+                grown = np.zeros((N, 2*capacity), dtype=table.dtype)
+                grown[:, :capacity] = table
+                setattr(self, name, grown)
+        self.hubs[nodes, self.count[nodes]] = hub
+        self.dists[nodes, self.count[nodes]] = distance
+        self.count[nodes] += 1
+        self.entries.append((nodes, np.full(len(nodes), hub, dtype=np.int32),
+                             np.full(len(nodes), distance, dtype=np.uint8),
+                             parents))
+
+    def query(self, nodes, table):
+        '''
+        the shortest distance through the hubs of the labels of each node,
+        table[h] being the distance between the root and hub h
+        '''
+        count = self.count[nodes]
+        rows = nodes.astype(np.int64)*self.hubs.shape[1]
+        positions = np.repeat(rows - (np.cumsum(count) - count), count) \
+            + np.arange(int(count.sum()))
+        values = table[self.hubs.ravel()[positions]] + self.dists.ravel()[positions]
+        return _min_by_node(values, count)
+
+    def to_csr(self, N):
+        '''the entries in CSR form, sorted by node and then by hub'''
+        (nodes, hubs, dists, parents) = (np.concatenate(a) for a in zip(*self.entries))
+        order = np.argsort(nodes, kind='stable')
+        indptr = np.zeros(N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(nodes, minlength=N), out=indptr[1:])
+        return (indptr, hubs[order], dists[order], parents[order].astype(np.int32))
+
+
+def _pruned_search(graph, root, rank, r, side, other, table, seen):
+    '''
+    This *internal* function runs the pruned BFS of the hub of rank r from
+    root, and adds (r, depth, parent) to the labels of side of the nodes
+    that are not pruned. table holds the label of root on the other side.
+
+    '''
+    c = other.count[root]
+    table[other.hubs[root, :c]] = other.dists[root, :c]
+    frontier = np.array([root], dtype=np.int32)
+    parents = np.array([-1], dtype=np.int32)
+    seen[root] = True
+    discovered = [frontier]
+    try:
+        depth = 0
+        while len(frontier) > 0:
+            if depth > 0:
+                # The hubs of lower rank are already covered, the other nodes
+                # are pruned when their labels give the distance already
+                keep = rank[frontier] > r
+                keep[keep] = side.query(frontier[keep], table) > depth
+                (frontier, parents) = (frontier[keep], parents[keep])
+                if len(frontier) == 0:
+                    break
+            if depth > np.iinfo(np.uint8).max:
+                raise ValueError('The graph has distances over %d'
+                                 % np.iinfo(np.uint8).max)
+            side.add(frontier, r, depth, parents)
+
+            lengths = graph.indptr[frontier + 1] - graph.indptr[frontier]
+            sources = np.repeat(frontier, lengths)
+            neighbors = graph.neighbors_of(frontier)
+            new = ~seen[neighbors]
+            (frontier, first) = np.unique(neighbors[new], return_index=True)
+            frontier = frontier.astype(np.int32)
+            parents = sources[new][first]
+            seen[frontier] = True
+            discovered.append(frontier)
+            depth += 1
+    finally:
+        seen[np.concatenate(discovered)] = False
+        table[other.hubs[root, :c]] = _INF
+
+
+def build_labels(forward, backward, order=None):
+    '''
+    This function computes the labels of a graph by pruned landmark labeling
+    (see the algorithm above)
+
+    Parameters
+    ----------
+    forward : Adjacency
+        the graph (out-neighbours)
+    backward : Adjacency
+        the transposed graph (in-neighbours, see views.py)
+    order : int ndarray, optional
+        the nodes in hub order. The default is None (degree_order).
+
+    Returns
+    -------
+    Labels
+        the labels of the graph
+
+    '''
+    N = forward.shape[0]
+    if order is None:
+        order = degree_order(forward, backward)
+    order = np.asarray(order, dtype=np.int32)
+    rank = np.empty(N, dtype=np.int64)
+    rank[order] = np.arange(N)
+
+    (out_side, in_side) = (_Side(N), _Side(N))
+    table = np.full(N, _INF, dtype=np.int64)
+    seen = np.zeros(N, dtype=bool)
+    for (r, root) in enumerate(order.tolist()):
+        # The forward search gives the distances from the hub (in-labels),
+        # pruned with the out-label of the hub, and the other way round
+        _pruned_search(forward, root, rank, r, in_side, out_side, table, seen)
+        _pruned_search(backward, root, rank, r, out_side, in_side, table, seen)
+
+    return Labels(order, out_side.to_csr(N), in_side.to_csr(N))
+
+
+class Labels:
+    '''
+    This class holds the 2-hop labels of a graph (see the storage above)
+    and answers distance and shortest path queries
+
+    Parameters
+    ----------
+    order : int32 ndarray
+        the node of each hub rank
+    out_label, in_label : tuple of ndarray
+        (indptr, hubs, dists, parents) of the out-labels and in-labels
+
+    '''
+
+    def __init__(self, order, out_label, in_label):
+        self.order = order
+        self.out_label = out_label
+        self.in_label = in_label
+        self._table = None
+
+    def __repr__(self):
+        return 'Labels(%d nodes, %.1f entries per node, %d bytes)' % \
+            (len(self.order), self.mean_size, self.nbytes)
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the arrays'''
+        return self.order.nbytes + sum(a.nbytes for a in self.out_label + self.in_label)
+
+    @property
+    def mean_size(self):
+        '''the mean number of entries of a label (out and in)'''
+        return (len(self.out_label[1]) + len(self.in_label[1])) / max(2*len(self.order), 1)
+
+    def arrays(self):
+        '''
+        This function returns the arrays to be saved (see ARRAYS)
+
+        '''
+        return dict(zip(ARRAYS, (self.order,) + tuple(self.out_label) + tuple(self.in_label)))
+
+    def _meet(self, source, target):
+        '''
+        This *internal* function merges the out-label of source and the
+        in-label of target
+
+        Returns
+        -------
+        distance : int
+            the distance from source to target (-1 if there is no path)
+        i, j : int
+            the positions of the best common hub in the out-label of source
+            and in the in-label of target
+
+        '''
+        (out_indptr, out_hubs, out_dists, _) = self.out_label
+        (in_indptr, in_hubs, in_dists, _) = self.in_label
+        (a, b) = (int(out_indptr[source]), int(out_indptr[source + 1]))
+        (c, d) = (int(in_indptr[target]), int(in_indptr[target + 1]))
+        (hubs1, hubs2) = (out_hubs[a:b], in_hubs[c:d])
+        # Both labels are sorted by hub : the hubs of one are searched in
+        # the other one
+        i = np.searchsorted(hubs1, hubs2)
+        j = np.flatnonzero(hubs1.take(i, mode='clip') == hubs2)
+        i = i[j]
+        if len(i) == 0:
+            return (-1, -1, -1)
+        lengths = out_dists[a:b][i].astype(np.int64) + in_dists[c:d][j]
+        k = int(np.argmin(lengths))
+        return (int(lengths[k]), a + int(i[k]), c + int(j[k]))
+
+    def distance(self, source, target):
+        '''
+        This function returns the distance from source to target
+        (-1 if there is no path)
+
+        '''
+        return self._meet(source, target)[0]
+
+    def distances(self, source, targets):
+        '''
+        This function returns the distances from source to many targets at
+        once : the out-label of source is spread in a table over the hubs,
+        and the in-labels of all the targets are read with a single gather
+
+        Parameters
+        ----------
+        source : int
+            the node of the graph
+        targets : int ndarray
+            the nodes of the graph
+
+        Returns
+        -------
+        int32 ndarray
+            the distance to each target (-1 if there is no path)
+
+        '''
+        (out_indptr, out_hubs, out_dists, _) = self.out_label
+        (in_indptr, in_hubs, in_dists, _) = self.in_label
+        if self._table is None:
+            self._table = np.full(len(self.order), _INF, dtype=np.int64)
+        table = self._table
+
+        hubs = out_hubs[out_indptr[source]:out_indptr[source + 1]]
+        table[hubs] = out_dists[out_indptr[source]:out_indptr[source + 1]]
+        try:
+            (positions, lengths) = _ranges(in_indptr, np.asarray(targets, dtype=np.int64))
+            values = table[in_hubs[positions]] + in_dists[positions]
+            result = _min_by_node(values, lengths)
+        finally:
+            table[hubs] = _INF
+        return np.where(result < _INF, result, -1).astype(np.int32)
+
+    def _walk(self, label, node, hub):
+        '''
+        This *internal* function follows the parents of a label from node
+        to the hub of rank hub
+
+        '''
+        (indptr, hubs, _, parents) = label
+        nodes = [node]
+        while True:
+            (a, b) = (int(indptr[nodes[-1]]), int(indptr[nodes[-1] + 1]))
+            k = a + int(np.searchsorted(hubs[a:b], hub))
+            if parents[k] < 0:
+                return nodes
+            nodes.append(int(parents[k]))
+
+    def path(self, source, target):
+        '''
+        This function returns a shortest path from source to target, rebuilt
+        from the parents of the labels
+
+        Returns
+        -------
+        int32 ndarray
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        (distance, i, _) = self._meet(source, target)
+        if distance < 0:
+            return None
+        hub = int(self.out_label[1][i])
+        forward = self._walk(self.out_label, source, hub)
+        backward = self._walk(self.in_label, target, hub)
+        backward.reverse()
+        return np.array(forward + backward[1:], dtype=np.int32)
+
+
+def _filenames(basename):
+    return ['%s_%s.npy' % (basename, array) for array in ARRAYS]
+
+
+def save_labels(basename, labels, content_hash=None):
+    '''
+    This function saves the label arrays as <basename>_<array>.npy, stamped
+    with the hash of the graph if it is given (see storage.save_stamp)
+
+    '''
+    arrays = labels.arrays()
+    for (array, filename) in zip(ARRAYS, _filenames(basename)):
+        np.save(filename, arrays[array])
+    if content_hash is not None:
+        storage.save_stamp(basename, content_hash)
+
+
+def labels_exist(basename, content_hash=None):
+    '''
+    This function returns True if the files written by save_labels() exist
+    (and have been stamped with the given content hash, if any)
+
+    '''
+    if not all(os.path.exists(f) for f in _filenames(basename)):
+        return False
+    return content_hash is None or storage.stamp_matches(basename, content_hash)
+
+
+def load_labels(basename, mmap_mode='r'):
+    '''
+    This function loads the labels saved by save_labels()
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the _<array>.npy suffix
+    mmap_mode : str or None, optional
+        the mmap_mode given to np.load(). None reads the arrays in memory.
+        The default is 'r'.
+
+    Returns
+    -------
+    Labels
+
+    '''
+    # The memory maps are viewed as plain arrays (still mapped) : slicing a
+    # np.memmap is several times slower, and a query slices four arrays
+    arrays = [np.asarray(np.load(f, mmap_mode=mmap_mode)) for f in _filenames(basename)]
+    return Labels(arrays[0], tuple(arrays[1:5]), tuple(arrays[5:9]))
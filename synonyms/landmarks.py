@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a goal-directed shortest path engine for the thesaurus
+graph : A* search with landmark lower bounds (ALT)
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+ALT(graph, landmarks, dist_from, dist_to)
+    A* search guided by the distances to and from a few landmark words
+
+Functions
+---------
+
+select_landmarks(forward, backward, count, method='farthest')
+    chooses the landmark nodes
+
+distance_table(adjacency, landmarks)
+    returns the BFS distances from the landmarks (uint8)
+
+compute(forward, backward, count, method='farthest')
+    selects the landmarks and returns their two distance tables
+
+from_bundle(bundle)
+    returns the landmarks and tables stored in a bundle (None if not built)
+
+
+Algorithm
+---------
+
+For a landmark L and any nodes v and t, the triangle inequality gives two
+lower bounds of the distance from v to t :
+    d(v, t) >= d(L, t) - d(L, v)
+    d(v, t) >= d(v, L) - d(t, L)
+The maximum over a few dozen well spread landmarks is a tight and consistent
+estimate, so that A* only settles the nodes that are close to a shortest
+path, even for far apart words.
+The graph is unweighted, so the estimates are small integers : the priority
+queue is a set of buckets, one per estimate, and all the nodes of the lowest
+bucket are expanded at once with vectorized numpy operations (like a BFS
+frontier, see traversal.py) instead of one node at a time.
+
+Landmarks are chosen among the nodes of highest degree ('degree') or by
+farthest point selection ('farthest') : each new landmark is the node that
+is the farthest (on the undirected graph) from the landmarks already chosen.
+
+The distances are stored as uint8 tables of shape (nodes, landmarks), so
+that the bounds of a node are read from a single row :
+    dist_from[v, l] = d(landmark l, v)
+    dist_to[v, l]   = d(v, landmark l)
+UNKNOWN (255) stands for an unreachable (or too far) node : the bounds that
+involve it are not used. The build stores the tables in the bundle
+(sections alt_landmarks, alt_from and alt_to, see create_matrix.py).
+
+"""
+
+import numpy as np
+
+import traversal
+import views
+
+METHODS = ('farthest', 'degree')
+
+# The distance of an unreachable node (the largest distance is UNKNOWN - 1)
+UNKNOWN = 255
+
+# The bundle sections of the landmarks
+SECTIONS = ('alt_landmarks', 'alt_from', 'alt_to')
+
+
+def select_landmarks(forward, backward, count, method='farthest'):
+    '''
+    This function chooses the landmark nodes
+
+    Parameters
+    ----------
+    forward, backward : Adjacency
+        the graph and its transpose (see views.py)
+    count : int
+        the number of landmarks
+    method : str, optional
+        one of METHODS. The default is 'farthest'.
+
+    Returns
+    -------
+    int32 ndarray
+        the landmark nodes
+
+    '''
+    N = forward.shape[0]
+    count = min(count, N)
+    degree = forward.degrees() + backward.degrees()
+
+    if method == 'degree':
+        return np.argsort(-degree, kind='stable')[:count].astype(np.int32)
+
+    if method != 'farthest':
+        raise ValueError('Unknown landmark method : %s (expected one of %s)'
+                         % (method, ', '.join(METHODS)))
+
+    undirected = traversal.BFS(views.symmetrize(forward))
+    # The distance of each node to the closest landmark (the unreachable
+    # nodes come first, then the farthest ones, the highest degree first)
+    closest = np.full(N, np.iinfo(np.int32).max, dtype=np.int64)
+    landmarks = []
+    for _ in range(count):
+        candidates = np.flatnonzero(closest == closest.max())
+        landmark = int(candidates[np.argmax(degree[candidates])])
+        landmarks.append(landmark)
+        tree = undirected.search(landmark)
+        closest[tree.nodes] = np.minimum(closest[tree.nodes], tree.depths)
+        closest[landmarks] = -1
+    return np.array(landmarks, dtype=np.int32)
+
+
+def distance_table(adjacency, landmarks):
+    '''
+    This function returns the BFS distances from each landmark
+
+    Parameters
+    ----------
+    adjacency : Adjacency
+        the graph (the transposed graph gives the distances to the landmarks)
+    landmarks : int ndarray
+        the landmark nodes
+
+    Returns
+    -------
+    uint8 ndarray of shape (nodes, landmarks)
+        table[v, l] is the distance from landmarks[l] to v (UNKNOWN if v is
+        unreachable or too far)
+
+    '''
+    table = np.full((adjacency.shape[0], len(landmarks)), UNKNOWN, dtype=np.uint8)
+    bfs = traversal.BFS(adjacency)
+    for (l, landmark) in enumerate(landmarks):
+        tree = bfs.search(landmark, max_depth=UNKNOWN - 1)
+        table[tree.nodes, l] = tree.depths
+    return table
+
+
+def compute(forward, backward, count, method='farthest'):
+    '''
+    This function selects the landmarks and computes their distance tables
+
+    Returns
+    -------
+    landmarks : int32 ndarray
+        the landmark nodes
+    dist_from, dist_to : uint8 ndarray
+        the distances from and to the landmarks (see distance_table)
+
+    '''
+    landmarks = select_landmarks(forward, backward, count, method)
+    return (landmarks, distance_table(forward, landmarks),
+            distance_table(backward, landmarks))
+
+
+class ALT:
+    '''
+    This class computes shortest paths with an A* search guided by the
+    landmark lower bounds (see the algorithm above)
+
+    Parameters
+    ----------
+    graph : Adjacency
+        the graph (out-neighbours)
+    landmarks : int32 ndarray
+        the landmark nodes
+    dist_from, dist_to : uint8 ndarray
+        the distances from and to the landmarks (see compute)
+
+    '''
+
+    def __init__(self, graph, landmarks, dist_from, dist_to):
+        N = graph.shape[0]
+        self.graph = graph
+        self.landmarks = landmarks
+        self.dist_from = dist_from
+        self.dist_to = dist_to
+        self._parent = np.full(N, traversal.UNSEEN, dtype=np.int32)
+        self._cost = np.zeros(N, dtype=np.int32)
+        self._bound = np.zeros(N, dtype=np.int32)
+
+    def __repr__(self):
+        return 'ALT(%d nodes, %d landmarks)' % (self.graph.shape[0], len(self.landmarks))
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the distance tables'''
+        return self.dist_from.nbytes + self.dist_to.nbytes
+
+    def lower_bounds(self, nodes, target):
+        '''
+        This function returns a lower bound of the distance from each node
+        to target
+
+        '''
+        nodes = np.atleast_1d(nodes)
+        bounds = np.zeros(len(nodes), dtype=np.int32)
+        for (table, sign) in ((self.dist_from, 1), (self.dist_to, -1)):
+            at_nodes = table[nodes].astype(np.int32)
+            at_target = table[target].astype(np.int32)
+            known = (at_nodes != UNKNOWN) & (at_target != UNKNOWN)
+            bound = np.where(known, sign*(at_target - at_nodes), 0)
+            bounds = np.maximum(bounds, bound.max(axis=1, initial=0))
+        return bounds
+
+    def path(self, source, target, max_depth=None):
+        '''
+        This function computes a shortest path from source to target
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        max_depth : int, optional
+            the paths longer than max_depth are not searched.
+            The default is None (no limit).
+
+        Returns
+        -------
+        int32 ndarray
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        parent = self._parent
+        cost = self._cost
+        bound = self._bound
+        parent[source] = -1
+        cost[source] = 0
+        bound[source] = self.lower_bounds(source, target)[0]
+        discovered = [np.array([source], dtype=np.int32)]
+
+        # buckets[estimate] holds the nodes queued with this estimate
+        buckets = {int(bound[source]) : discovered[:]}
+        try:
+            while buckets:
+                estimate = min(buckets)
+                if max_depth is not None and estimate > max_depth:
+                    return None
+                frontier = np.concatenate(buckets.pop(estimate))
+                while len(frontier) > 0:
+                    # The outdated entries (the node has been reached by a
+                    # shorter path since) are dropped
+                    frontier = np.unique(frontier)
+                    frontier = frontier[cost[frontier] + bound[frontier] == estimate]
+                    if parent[target] != traversal.UNSEEN and \
+                            cost[target] == estimate:
+                        return self._walk(target)
+                    frontier = self._expand(frontier, target, discovered, buckets,
+                                            estimate)
+            return None
+        finally:
+            # Only the discovered nodes are reset
+            parent[np.concatenate(discovered)] = traversal.UNSEEN
+
+    def _expand(self, frontier, target, discovered, buckets, estimate):
+        '''
+        This *internal* function expands the nodes of the current estimate at
+        once : the neighbours reached by a shorter path get their parent,
+        cost and bound, and are queued in the bucket of their estimate
+
+        Returns
+        -------
+        int32 ndarray
+            the neighbours of the same estimate (to be expanded next)
+
+        '''
+        parent = self._parent
+        cost = self._cost
+        bound = self._bound
+
+        lengths = self.graph.indptr[frontier + 1] - self.graph.indptr[frontier]
+        sources = np.repeat(frontier, lengths)
+        neighbors = self.graph.neighbors_of(frontier)
+        g = cost[sources] + 1
+
+        better = (parent[neighbors] == traversal.UNSEEN) | (g < cost[neighbors])
+        (neighbors, sources, g) = (neighbors[better], sources[better], g[better])
+        if len(neighbors) == 0:
+            return neighbors
+        # A neighbour reached from several nodes keeps the one of lowest cost
+        order = np.lexsort((g, neighbors))
+        (neighbors, first) = np.unique(neighbors[order], return_index=True)
+        (sources, g) = (sources[order][first], g[order][first])
+
+        new = neighbors[parent[neighbors] == traversal.UNSEEN]
+        discovered.append(new)
+        bound[new] = self.lower_bounds(new, target)
+        parent[neighbors] = sources
+        cost[neighbors] = g
+
+        estimates = g + bound[neighbors]
+        for e in np.unique(estimates[estimates != estimate]).tolist():
+            buckets.setdefault(e, []).append(neighbors[estimates == e])
+        return neighbors[estimates == estimate]
+
+    def _walk(self, node):
+        '''
+        This *internal* function returns the path from the source to node
+
+        '''
+        path = [node]
+        while self._parent[path[-1]] >= 0:
+            path.append(int(self._parent[path[-1]]))
+        path.reverse()
+        return np.array(path, dtype=np.int32)
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the landmarks and their distance tables
+    (landmarks, dist_from, dist_to) stored in the SECTIONS of a bundle,
+    or None if they have not been built
+
+    '''
+    if not all(name in bundle for name in SECTIONS):
+        return None
+    return tuple(bundle[name] for name in SECTIONS)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a compact storage for the entries of the thesaurus
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+PackedNames(blob, offsets)
+    a read-only list of words stored in a single UTF-8 byte blob,
+    with lookup(word) and lookup_many(words) to find the rank of words
+
+Functions
+---------
+
+save_names(basename, names)
+    saves a list of words in the packed format
+
+load_names(basename, mmap_mode='r')
+    loads the packed names saved by save_names()
+
+names_exist(basename)
+    checks that the files written by save_names() are available
+
+from_bundle(bundle)
+    returns the names stored in a graph bundle (see storage.py)
+
+
+File format
+-----------
+
+The words are encoded in UTF-8 and concatenated in a single byte blob.
+offsets[k] is the position of the kth word in the blob, the last value being
+the blob length (so that len(offsets) = number of words + 1)
+    <basename>_blob.npy     (uint8)
+    <basename>_offsets.npy  (int32)
+
+Compared with the fixed-width numpy <U array saved in thesaurus_entries.npz
+(4 bytes per character, every word padded to the longest one), this takes
+roughly one byte per character and both arrays can be memory-mapped and
+shared between processes. The words are only decoded on demand.
+
+The words are sorted (create_matrix.py sorts the thesaurus keys) and UTF-8
+preserves the order of code points, so a word can be found by bisection over
+the raw bytes without any hash table.
+
+"""
+
+import os
+
+import numpy as np
+
+
+class PackedNames:
+    '''
+    This class is a read-only sequence of words stored in a single UTF-8
+    byte blob plus an offsets array. It can be used in place of the names
+    array : names[k] returns the kth word as a str.
+    The words must be sorted for lookup() and lookup_many() to work.
+
+    Parameters
+    ----------
+    blob : uint8 ndarray
+        the concatenation of all the UTF-8 encoded words
+    offsets : int32 ndarray
+        the position of each word in blob, plus the total blob length
+
+    '''
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_words(cls, words):
+        '''
+        This function builds a PackedNames object from a list of str
+
+        '''
+        encoded = [w.encode('utf-8') for w in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __repr__(self):
+        return 'PackedNames(%d words, %d bytes)' % (len(self), self.nbytes)
+
+    @property
+    def nbytes(self):
+        '''the number of bytes used by the blob and the offsets'''
+        return self.blob.nbytes + self.offsets.nbytes
+
+    def _bytes(self, k):
+        return self.blob[self.offsets[k]:self.offsets[k+1]].tobytes()
+
+    def _decode(self, k):
+        return self._bytes(k).decode('utf-8')
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._decode(k) for k in range(*key.indices(len(self)))]
+
+        if np.ndim(key) > 0:
+            return [self[k] for k in key]
+
+        k = int(key)
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError('name index out of range')
+        return self._decode(k)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self._decode(k)
+
+    def __contains__(self, word):
+        return self.lookup(word) >= 0
+
+    def lookup(self, word):
+        '''
+        This function returns the rank of a given word, by bisection
+        over the sorted words (O(log N) comparisons)
+
+        Parameters
+        ----------
+        word : str
+            the word to be found
+
+        Returns
+        -------
+        int
+            the rank of the word, or -1 if it does not belong to the names
+
+        '''
+        key = word.encode('utf-8')
+        lo = 0
+        hi = len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < len(self) and self._bytes(lo) == key:
+            return lo
+        return -1
+
+    def _prefixes(self, rows, width):
+        '''
+        This *internal* function returns the first width bytes of the given
+        rows as a numpy bytes array (shorter words are padded with zeros)
+
+        '''
+        blob = self.blob if self.blob.size > 0 else np.zeros(1, dtype=np.uint8)
+        start = self.offsets[rows].astype(np.int64)
+        length = self.offsets[rows + 1] - start
+
+        cols = np.arange(width)
+        pos = np.minimum(start[:, None] + cols, len(blob) - 1)
+        prefixes = np.where(cols < length[:, None], blob[pos], 0).astype(np.uint8)
+        return np.ascontiguousarray(prefixes).view('S%d' % width).ravel()
+
+    def lookup_many(self, words):
+        '''
+        This function returns the ranks of many words at once.
+        All the bisections are run together with numpy : at each step the
+        middle words are compared with the queries through their first bytes
+        (one more byte than the longest query is enough to decide)
+
+        Parameters
+        ----------
+        words : str list
+            the words to be found
+
+        Returns
+        -------
+        ranks : int32 ndarray
+            ranks[k] is the rank of words[k], or -1 if it does not belong
+            to the names
+
+        '''
+        encoded = [w.encode('utf-8') for w in words]
+        N = len(self)
+        ranks = np.full(len(encoded), -1, dtype=np.int32)
+        if len(encoded) == 0 or N == 0:
+            return ranks
+
+        width = max(len(e) for e in encoded) + 1
+        keys = np.array(encoded, dtype='S%d' % width)
+
+        lo = np.zeros(len(keys), dtype=np.int64)
+        hi = np.full(len(keys), N, dtype=np.int64)
+        active = lo < hi
+        while active.any():
+            mid = np.minimum((lo + hi) // 2, N - 1)
+            less = self._prefixes(mid, width) < keys
+            lo = np.where(active & less, mid + 1, lo)
+            hi = np.where(active & ~less, mid, hi)
+            active = lo < hi
+
+        candidates = np.minimum(lo, N - 1)
+        found = (lo < N) & (self._prefixes(candidates, width) == keys)
+        ranks[found] = candidates[found]
+        return ranks
+
+    def tolist(self):
+        '''
+        This function decodes all the words and returns them as a list
+
+        '''
+        return list(self)
+
+
+def _names_filenames(basename):
+    return (basename + '_blob.npy', basename + '_offsets.npy')
+
+
+def save_names(basename, names):
+    '''
+    This function saves a list of words in the packed format
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the _blob.npy/_offsets.npy suffix
+    names : str list (or PackedNames)
+        the entries of the thesaurus
+
+    Returns
+    -------
+    None.
+
+    '''
+    if not isinstance(names, PackedNames):
+        names = PackedNames.from_words(names)
+
+    (file_blob, file_offsets) = _names_filenames(basename)
+    np.save(file_blob, np.asarray(names.blob, dtype=np.uint8))
+    np.save(file_offsets, np.asarray(names.offsets, dtype=np.int32))
+
+
+def names_exist(basename):
+    '''
+    This function returns True if the files written by save_names() exist
+
+    '''
+    return all(os.path.exists(f) for f in _names_filenames(basename))
+
+
+def load_names(basename, mmap_mode='r'):
+    '''
+    This function loads the packed names saved by save_names()
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the _blob.npy/_offsets.npy suffix
+    mmap_mode : str or None, optional
+        the mmap_mode given to np.load(). None reads the arrays in memory.
+        The default is 'r'.
+
+    Returns
+    -------
+    names : PackedNames
+        the entries of the thesaurus
+
+    '''
+    (file_blob, file_offsets) = _names_filenames(basename)
+    blob = np.load(file_blob, mmap_mode=mmap_mode)
+    offsets = np.load(file_offsets, mmap_mode=mmap_mode)
+    return PackedNames(blob, offsets)
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the names stored in the 'names_blob' and
+    'names_offsets' sections of a bundle (zero-copy view of the bundle)
+
+    Parameters
+    ----------
+    bundle : storage.Bundle
+        the graph bundle
+
+    Returns
+    -------
+    names : PackedNames
+        the entries of the thesaurus
+
+    '''
+    return PackedNames(bundle['names_blob'], bundle['names_offsets'])
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module gives a random access to the original entries of the thesaurus
+(with their sense lines), without parsing the whole thesaurus file
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+RawEntries(source, names, offsets)
+    reads the original entry of a word with a single seek
+
+Functions
+---------
+
+read_index(source)
+    reads the thes_fr.idx file shipped with the thesaurus (word -> offset)
+
+scan_offsets(source)
+    rebuilds the same information by scanning the thesaurus file
+
+entry_offsets(source, names)
+    returns the offset of the entry of each name (the table saved by the
+    build in ./data/step1/thesaurus_offsets.npy)
+
+
+Assumption
+----------
+
+The source is the thesaurus file (thes_fr.dat) or the archive that contains
+it (see create_matrix.open_thesaurus). The offsets are byte positions in
+thes_fr.dat : reading an entry is a single seek in a .dat file or in an
+archive where the member is stored without compression. For a compressed
+archive, the member has to be decompressed up to the entry.
+
+The offsets table is aligned with the names of the bundle (sorted words) so
+that the offset of a word is found by bisection (see packed_names.py) and
+the table itself can be memory-mapped.
+
+"""
+
+import os
+import io
+
+import numpy as np
+
+import create_matrix
+
+# The name of the index file in the grammalecte archive
+INDEX_MEMBER = 'thes_fr.idx'
+
+# Number of offsets of thes_fr.idx that are checked before it is used
+_CHECKED_OFFSETS = 64
+
+
+def _open_index(source):
+    if create_matrix.is_archive(source):
+        return create_matrix.open_thesaurus(source, INDEX_MEMBER)
+    return open(os.path.join(os.path.dirname(source), INDEX_MEMBER), mode='rb')
+
+
+def read_index(source):
+    '''
+    This function reads the index file that comes with the thesaurus
+    (thes_fr.idx next to the .dat file or in the same archive). The first
+    line gives the encoding, the second one the number of words and the
+    following ones are 'word|offset' lines.
+
+    Parameters
+    ----------
+    source : str
+        the thesaurus file (.dat) or archive (.zip)
+
+    Returns
+    -------
+    words : str list
+        the words of the index (None if there is no index)
+    offsets : int64 ndarray
+        the byte offset of the entry of each word in thes_fr.dat
+
+    '''
+    try:
+        stream = _open_index(source)
+    except (OSError, ValueError):
+        return (None, None)
+
+    words = []
+    offsets = []
+    with io.TextIOWrapper(stream, encoding='utf-8') as f:
+        next(f) # we skip first line
+        for line in f:
+            (word, sep, offset) = line.rstrip('\n').rpartition('|')
+            if sep and offset.isdigit():
+                words.append(word)
+                offsets.append(int(offset))
+
+    return (words, np.array(offsets, dtype=np.int64))
+
+
+def scan_offsets(source):
+    '''
+    This function scans the thesaurus file and returns the offset of each
+    entry line (same output as read_index)
+
+    '''
+    words = []
+    offsets = []
+    with create_matrix.open_thesaurus(source) as f:
+        pos = len(f.readline()) # we skip first line
+        for line in f:
+            if not line.startswith(b'('):
+                words.append(line.split(b'|')[0].decode('utf-8'))
+                offsets.append(pos)
+            pos += len(line)
+
+    return (words, np.array(offsets, dtype=np.int64))
+
+
+def _check_offsets(source, words, offsets):
+    '''
+    This *internal* function checks that some offsets (spread over the
+    index) point to the entry line of their word
+
+    '''
+    sample = np.unique(np.linspace(0, len(words) - 1, _CHECKED_OFFSETS).astype(int))
+    sample = sample[np.argsort(offsets[sample])]
+
+    with create_matrix.open_thesaurus(source) as f:
+        for k in sample:
+            f.seek(offsets[k])
+            if not f.readline().startswith((words[k] + '|').encode('utf-8')):
+                return False
+    return True
+
+
+def entry_offsets(source, names):
+    '''
+    This function returns the offset of the entry of each name.
+    thes_fr.idx is used when it is available (and correct), otherwise the
+    offsets are rebuilt by scanning the thesaurus file.
+    When an entry appears twice, the last one is kept (as the graph does).
+
+    Parameters
+    ----------
+    source : str
+        the thesaurus file (.dat) or archive (.zip)
+    names : PackedNames
+        the sorted entries of the graph
+
+    Returns
+    -------
+    int64 ndarray
+        offsets[k] is the position of the entry of names[k] in thes_fr.dat
+        (-1 if it was not found)
+
+    '''
+    (words, offsets) = read_index(source)
+    if not words or not _check_offsets(source, words, offsets):
+        (words, offsets) = scan_offsets(source)
+
+    table = np.full(len(names), -1, dtype=np.int64)
+    ranks = names.lookup_many(words)
+    found = ranks >= 0
+    # The offsets grow along the file : the maximum is the last entry
+    np.maximum.at(table, ranks[found], offsets[found])
+    return table
+
+
+class RawEntries:
+    '''
+    This class reads the original entries of the thesaurus on demand.
+    The thesaurus file is only opened on the first call.
+
+    Parameters
+    ----------
+    source : str
+        the thesaurus file (.dat) or archive (.zip) used for the build
+    names : PackedNames
+        the sorted entries of the graph
+    offsets : int64 ndarray
+        the output of entry_offsets() (usually memory-mapped)
+
+    '''
+
+    def __init__(self, source, names, offsets):
+        self.source = source
+        self.names = names
+        self.offsets = offsets
+        self._stream = None
+
+    def __repr__(self):
+        return 'RawEntries(%r)' % self.source
+
+    def close(self):
+        '''this function closes the thesaurus file'''
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def offset(self, word):
+        '''
+        This function returns the position of the entry of word in the
+        thesaurus file, or -1 if it does not belong to the dictionary
+
+        '''
+        ind = self.names.lookup(word)
+        if ind < 0:
+            return -1
+        return int(self.offsets[ind])
+
+    def get(self, word):
+        '''
+        This function reads the original entry of a given word
+
+        Parameters
+        ----------
+        word : str
+            the entry to be read
+
+        Returns
+        -------
+        senses : (str, str list) list
+            for each sense line of the entry, the part of speech/sense tag
+            (e.g. '(nom)') and the synonyms, as written in the thesaurus
+            (None if word does not belong to the dictionary)
+
+        '''
+        pos = self.offset(word)
+        if pos < 0:
+            return None
+
+        if self._stream is None:
+            self._stream = create_matrix.open_thesaurus(self.source)
+        f = self._stream
+
+        f.seek(pos)
+        (name, _, count) = f.readline().decode('utf-8').rstrip('\r\n').partition('|')
+        if name != word:
+            raise ValueError('%s does not match the offsets table (stale build ?)'
+                             % self.source)
+
+        senses = []
+        for _ in range(int(count)):
+            line = f.readline().decode('utf-8').rstrip('\r\n')
+            if not line.startswith('('):
+                break
+            fields = line.split('|')
+            senses.append((fields[0], fields[1:]))
+        return senses
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides node orderings of the thesaurus graph that improve
+the memory locality of the traversals
+
+
+Usage
+-----
+
+As a module, it will export the following functions
+
+Functions
+---------
+
+node_order(indptr, indices, method)
+    returns a node ordering computed with one of the METHODS
+
+permute_csr(indptr, indices, perm)
+    renumbers the nodes of a CSR graph
+
+alphabetical(indptr, indices, iperm)
+    numbers the nodes of a reordered graph back in the alphabetical order
+
+
+Orderings
+---------
+
+create_matrix.py numbers the nodes alphabetically, which scatters the
+neighbours of a node all over the adjacency arrays. The orderings below put
+the nodes that are close in the graph close in memory :
+    rcm    : reverse Cuthill-McKee ordering (bandwidth reduction)
+    bfs    : breadth first order from the node of highest degree, component
+             by component
+    degree : nodes sorted by decreasing degree (the hubs, which are visited
+             by most of the traversals, are packed at the beginning)
+
+All the functions work on the symmetrized graph since the thesaurus is
+nearly symmetric.
+
+Notations
+---------
+
+The names stay sorted alphabetically (see packed_names.py). When the graph
+is reordered, the bundle stores two more sections :
+    perm[rank] is the node of the graph of the name of alphabetical rank
+    iperm[node] is the alphabetical rank of a node of the graph
+
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+METHODS = ('rcm', 'bfs', 'degree')
+
+
+def _symmetric(indptr, indices):
+    N = len(indptr) - 1
+    M = sparse.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr),
+                          shape=(N, N))
+    return (M + M.T).tocsr()
+
+
+def node_order(indptr, indices, method):
+    '''
+    This function computes a node ordering of the graph
+
+    Parameters
+    ----------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the graph
+    method : str
+        one of METHODS
+
+    Returns
+    -------
+    order : int32 ndarray
+        order[k] is the (former) node that becomes node k
+
+    '''
+    S = _symmetric(indptr, indices)
+    degree = np.diff(S.indptr)
+
+    if method == 'rcm':
+        order = csgraph.reverse_cuthill_mckee(S, symmetric_mode=True)
+
+    elif method == 'bfs':
+        order = []
+        visited = np.zeros(S.shape[0], dtype=bool)
+        # Each component is visited from its node of highest degree
+        for start in np.argsort(-degree, kind='stable'):
+            if not visited[start]:
+                component = csgraph.breadth_first_order(S, start, directed=False,
+                                                        return_predecessors=False)
+                visited[component] = True
+                order.append(component)
+        order = np.concatenate(order) if order else np.zeros(0, dtype=np.int32)
+
+    elif method == 'degree':
+        order = np.argsort(-degree, kind='stable')
+
+    else:
+        raise ValueError('Unknown ordering method : %s (expected one of %s)'
+                         % (method, ', '.join(METHODS)))
+
+    return np.asarray(order, dtype=np.int32)
+
+
+def permute_csr(indptr, indices, perm, return_order=False):
+    '''
+    This function renumbers the nodes of a CSR graph : node i becomes
+    node perm[i]. The neighbours of each row are sorted.
+
+    Parameters
+    ----------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the graph
+    perm : int ndarray
+        the new number of each node
+    return_order : bool, optional
+        if True, the order of the edges is returned too, so that the arrays
+        aligned with the edges (e.g. see senses.py) can be permuted the same
+        way. The default is False.
+
+    Returns
+    -------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the renumbered graph
+    order : int ndarray
+        new edge e was edge order[e] (only if return_order is True)
+
+    '''
+    N = len(indptr) - 1
+    perm = np.asarray(perm)
+
+    rows = perm[np.repeat(np.arange(N), np.diff(indptr))]
+    cols = perm[indices]
+    order = np.lexsort((cols, rows))
+
+    new_indptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=N), out=new_indptr[1:])
+    if return_order:
+        return (new_indptr, cols[order].astype(np.int32), order)
+    return (new_indptr, cols[order].astype(np.int32))
+
+
+def alphabetical(indptr, indices, iperm):
+    '''
+    This function numbers the nodes of a reordered graph back in the
+    alphabetical order of the names (see the notations above)
+
+    Parameters
+    ----------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the reordered graph
+    iperm : int32 ndarray or None
+        the iperm section of the bundle (None if the graph is not reordered)
+
+    Returns
+    -------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the graph in the alphabetical order (the arrays
+        given are returned as they are if iperm is None, this is a copy
+        otherwise)
+
+    '''
+    if iperm is None:
+        return (indptr, indices)
+    return permute_csr(indptr, indices, iperm)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the part of speech and sense groups of the edges of
+the thesaurus graph
+
+
+Usage
+-----
+
+As a module, it will export the following class and function
+
+Classes
+-------
+
+Senses(tags, edge_sense, edge_pos, node_pos)
+    the sense group and part of speech of each edge, and the parts of speech
+    of each node
+
+Functions
+---------
+
+pos_bits(codes)
+    returns the bit of the node bitmask of each part of speech code
+
+from_bundle(bundle)
+    returns the Senses stored in a bundle (None for older builds)
+
+
+Representation
+--------------
+
+In the thesaurus file, each entry is followed by its sense lines
+    (nom)|synonym1|synonym2...
+The k-th sense line of an entry is its sense group k and its first field
+is the part of speech/sense tag. create_matrix.py keeps them as arrays that
+are stored in the bundle next to the graph :
+    tags        the distinct tags (e.g. '(nom)'), sorted, as PackedNames :
+                the code of a tag is its rank (sections pos_blob/pos_offsets)
+    edge_sense  the sense group of each edge (aligned with the indices of
+                the graph, uint8 unless an entry has more than 256 senses)
+    edge_pos    the code of the tag of each edge (uint8 up to 256 tags)
+    node_pos    uint64 bitmask : bit pos_bits(code) is set if the entry
+                has a sense line with this tag
+
+When a synonym appears in several sense lines of an entry, the edge keeps
+the first one.
+Filtering a traversal is then a table lookup per edge (edge_filter) and a
+bitmask test per node (pos_mask) instead of post-filtering whole results.
+There are 64 bits only : when there are more than 64 tags, the last ones
+share the last bit, so that the node test is a superset test for them (the
+per-edge test stays exact).
+
+"""
+
+import numpy as np
+
+import packed_names
+
+# The bundle sections of the senses
+SECTIONS = ('pos_blob', 'pos_offsets', 'edge_sense', 'edge_pos', 'node_pos')
+
+
+def pos_bits(codes):
+    '''
+    This function returns the bitmask (uint64) of each part of speech code
+
+    '''
+    codes = np.minimum(np.asarray(codes, dtype=np.int64), 63).astype(np.uint64)
+    return np.left_shift(np.uint64(1), codes)
+
+
+def _compact(a):
+    '''
+    This *internal* function casts non negative integers to the smallest
+    unsigned type that holds them
+
+    '''
+    a = np.asarray(a)
+    return a.astype(np.min_scalar_type(int(a.max()) if len(a) else 0))
+
+
+class Senses:
+    '''
+    This class holds the sense groups and parts of speech of the graph
+    (see the representation above)
+
+    Parameters
+    ----------
+    tags : PackedNames
+        the sorted tags
+    edge_sense : unsigned int ndarray
+        the sense group of each edge
+    edge_pos : unsigned int ndarray
+        the tag code of each edge
+    node_pos : uint64 ndarray
+        the bitmask of the tags of each node
+
+    '''
+
+    def __init__(self, tags, edge_sense, edge_pos, node_pos):
+        self.tags = tags
+        self.edge_sense = edge_sense
+        self.edge_pos = edge_pos
+        self.node_pos = node_pos
+
+    @classmethod
+    def from_arrays(cls, tags, edge_sense, edge_pos, node_pos):
+        '''
+        This function builds the Senses from sorted tags (str list) and
+        integer arrays of any type, which are stored in the smallest type
+
+        '''
+        return cls(packed_names.PackedNames.from_words(tags),
+                   _compact(edge_sense), _compact(edge_pos),
+                   np.asarray(node_pos, dtype=np.uint64))
+
+    def __repr__(self):
+        return 'Senses(%d tags, %d edges)' % (len(self.tags), len(self.edge_pos))
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the arrays'''
+        return (self.tags.nbytes + self.edge_sense.nbytes + self.edge_pos.nbytes
+                + self.node_pos.nbytes)
+
+    def sections(self):
+        '''
+        This function returns the arrays to be stored in the bundle
+
+        '''
+        return dict(zip(SECTIONS, (self.tags.blob, self.tags.offsets,
+                                   self.edge_sense, self.edge_pos, self.node_pos)))
+
+    def permuted(self, order, perm):
+        '''
+        This function returns the Senses of a renumbered graph
+
+        Parameters
+        ----------
+        order : int ndarray
+            the former position of each edge (see reorder.permute_csr)
+        perm : int ndarray
+            the new number of each node
+
+        '''
+        node_pos = np.empty_like(self.node_pos)
+        node_pos[perm] = self.node_pos
+        return Senses(self.tags, self.edge_sense[order], self.edge_pos[order],
+                      node_pos)
+
+    def codes(self, pos):
+        '''
+        This function returns the codes of one or several tags.
+        The parentheses can be omitted ('nom' is the same as '(nom)')
+
+        Parameters
+        ----------
+        pos : str or str list
+            the tags
+
+        Returns
+        -------
+        int ndarray
+            the code of each tag
+
+        '''
+        if isinstance(pos, str):
+            pos = [pos]
+        pos = [p if p.startswith('(') else '(%s)' % p for p in pos]
+        codes = self.tags.lookup_many(pos)
+        for (p, code) in zip(pos, codes):
+            if code < 0:
+                raise ValueError('Unknown part of speech : %s (expected one of %s)'
+                                 % (p, ', '.join(self.tags)))
+        return codes
+
+    def edge_filter(self, pos):
+        '''
+        This function returns a boolean table over the codes :
+        allowed[edge_pos[e]] tells if edge e has one of the given tags
+
+        '''
+        allowed = np.zeros(len(self.tags), dtype=bool)
+        allowed[self.codes(pos)] = True
+        return allowed
+
+    def pos_mask(self, pos):
+        '''
+        This function returns the bitmask (uint64) of the given tags :
+        node_pos[n] & mask is not 0 if node n may have one of these tags
+
+        '''
+        return np.bitwise_or.reduce(pos_bits(self.codes(pos)))
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the Senses stored in the SECTIONS of a bundle
+    (zero-copy view of the bundle), or None if the bundle does not have
+    them (older builds)
+
+    '''
+    if not all(name in bundle for name in SECTIONS):
+        return None
+    return Senses(packed_names.PackedNames(bundle['pos_blob'], bundle['pos_offsets']),
+                  bundle['edge_sense'], bundle['edge_pos'], bundle['node_pos'])
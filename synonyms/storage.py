@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the on-disk formats of the thesaurus graph
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+Bundle(filename, mmap_mode='r')
+    a single-file, versioned graph bundle opened with one memory map
+
+Functions
+---------
+
+save_csr(basename, graph)
+    saves the adjacency matrix as raw (uncompressed) CSR arrays
+
+load_csr(basename, mmap_mode='r')
+    loads the adjacency matrix saved by save_csr() without copying it
+
+load_csr_arrays(basename, mmap_mode='r')
+    same as load_csr() but returns the index arrays only
+
+csr_exists(basename)
+    checks that the files written by save_csr() are available
+
+save_stamp(basename, content_hash), stamp_matches(basename, content_hash)
+    records and checks the graph a set of derived files was built from
+
+csr_from_arrays(indptr, indices)
+    wraps CSR index arrays as a scipy sparse matrix without copying them
+
+save_bundle(filename, sections, source_hash='', build_options=None,
+            graph_sections=None)
+    saves named arrays (adjacency, names, indexes...) in a single bundle file
+
+content_hash(sections)
+    returns the hash of a set of named arrays, as stored in bundle headers
+
+
+File formats
+------------
+
+The CSR arrays are stored as plain .npy files (int32) :
+    <basename>_indptr.npy
+    <basename>_indices.npy
+
+The shape of the matrix is deduced from indptr (the matrix is square) and
+the values are all True, so that nothing else needs to be stored.
+The files derived from a bundle (views, labels...) are stamped with the
+graph hash of the bundle in <basename>_hash.json (see save_stamp), so that
+the files left by an earlier build of another graph are not used.
+Unlike sparse.save_npz(), these files are not compressed : they can be
+opened with mmap_mode='r' and several processes then share the same
+page-cache pages instead of inflating and copying the matrix each.
+
+The bundle gathers all the arrays of a build in a single file :
+    magic        8 bytes   b'SYNOBNDL'
+    version      uint32    BUNDLE_VERSION
+    header size  uint32    size of the JSON header in bytes
+    header       JSON      format_version, nodes, edges, source_hash,
+                           build_options, content_hash, graph_hash and, for
+                           each section, its offset, dtype and shape
+    sections     raw arrays, each one starting on a SECTION_ALIGN boundary
+
+The required sections are 'indptr' (CSR row pointers, which give the node
+and edge counts) and 'names_blob' and 'names_offsets' (see packed_names.py).
+The neighbour lists are stored in 'indices' (CSR column indices). Any other
+array (e.g. a precomputed index) can be stored as an optional section : the
+optional sections are documented by the modules that read them, this module
+only deals with sections, headers and hashes.
+content_hash is the sha256 of all the sections : it identifies the content
+of the bundle. graph_hash is the sha256 of the graph sections only (the
+sections given as graph_sections to save_bundle, e.g. the adjacency and the
+names) : it is the key of every index, file or cache derived from the graph,
+which must not be rebuilt when only an optional section changes.
+
+"""
+
+import os
+import json
+import struct
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+BUNDLE_MAGIC = b'SYNOBNDL'
+BUNDLE_VERSION = 1
+SECTION_ALIGN = 64
+
+_BUNDLE_PREFIX = struct.Struct('<8sII')
+
+
+def _csr_filenames(basename):
+    return (basename + '_indptr.npy', basename + '_indices.npy')
+
+
+def save_csr(basename, graph):
+    '''
+    This function saves the adjacency matrix as raw CSR arrays
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the _indptr.npy/_indices.npy suffix
+    graph : sparse matrix (in any format)
+        the square adjacency matrix of the thesaurus
+
+    Returns
+    -------
+    None.
+
+    '''
+    M = sparse.csr_matrix(graph, dtype=bool)
+    M.sum_duplicates()
+    M.sort_indices()
+
+    (file_indptr, file_indices) = _csr_filenames(basename)
+    np.save(file_indptr, M.indptr.astype(np.int32))
+    np.save(file_indices, M.indices.astype(np.int32))
+
+
+def csr_exists(basename):
+    '''
+    This function returns True if the files written by save_csr() exist
+
+    '''
+    return all(os.path.exists(f) for f in _csr_filenames(basename))
+
+
+def _stamp_filename(basename):
+    return basename + '_hash.json'
+
+
+def save_stamp(basename, content_hash):
+    '''
+    This function records the hash of the graph that the files
+    <basename>_* have been built from, in <basename>_hash.json
+
+    '''
+    with open(_stamp_filename(basename), mode='wt', encoding='utf-8') as f:
+        json.dump({'content_hash' : content_hash}, f)
+
+
+def stamp_matches(basename, content_hash):
+    '''
+    This function returns True if the files <basename>_* have been stamped
+    (see save_stamp) with the given hash
+
+    '''
+    filename = _stamp_filename(basename)
+    if not os.path.exists(filename):
+        return False
+    with open(filename, mode='rt', encoding='utf-8') as f:
+        return json.load(f).get('content_hash') == content_hash
+
+
+def load_csr(basename, mmap_mode='r'):
+    '''
+    This function loads the adjacency matrix saved by save_csr()
+    The index arrays are memory-mapped (by default) and wrapped as a CSR
+    matrix without any copy
+
+    Parameters
+    ----------
+    basename : str
+        the path of the files without the _indptr.npy/_indices.npy suffix
+    mmap_mode : str or None, optional
+        the mmap_mode given to np.load(). None reads the arrays in memory.
+        The default is 'r'.
+
+    Returns
+    -------
+    graph : sparse matrix in CSR format
+        the adjacency matrix of the thesaurus
+
+    '''
+    return csr_from_arrays(*load_csr_arrays(basename, mmap_mode))
+
+
+def load_csr_arrays(basename, mmap_mode='r'):
+    '''
+    This function loads the index arrays saved by save_csr()
+    (see load_csr() for the parameters)
+
+    Returns
+    -------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the adjacency matrix
+
+    '''
+    (file_indptr, file_indices) = _csr_filenames(basename)
+    indptr = np.load(file_indptr, mmap_mode=mmap_mode)
+    indices = np.load(file_indices, mmap_mode=mmap_mode)
+
+    return (indptr, indices)
+
+
+def csr_from_arrays(indptr, indices):
+    '''
+    This function wraps the CSR index arrays of a square boolean matrix
+    as a scipy sparse matrix without copying them
+
+    Parameters
+    ----------
+    indptr : int32 ndarray
+        the row pointers (length = number of nodes + 1)
+    indices : int32 ndarray
+        the column indices (length = number of edges)
+
+    Returns
+    -------
+    graph : sparse matrix in CSR format
+        the adjacency matrix
+
+    '''
+    N = len(indptr) - 1
+    data = np.ones(len(indices), dtype=bool)
+
+    return sparse.csr_matrix((data, indices, indptr), shape=(N, N), copy=False)
+
+
+def _align(offset):
+    return -(-offset // SECTION_ALIGN) * SECTION_ALIGN
+
+
+def content_hash(sections):
+    '''
+    This function returns the sha256 (hex digest) of a set of named arrays.
+    The name, dtype and shape of each array are hashed with its bytes so that
+    two different layouts of the same bytes do not collide
+
+    Parameters
+    ----------
+    sections : dictionary {name : ndarray}
+        the arrays to be hashed (the order of the names does not matter)
+
+    Returns
+    -------
+    str
+        the hex digest
+
+    '''
+    h = hashlib.sha256()
+    for name in sorted(sections):
+        a = np.ascontiguousarray(sections[name])
+        h.update(('%s|%s|%s|' % (name, a.dtype.str, a.shape)).encode('utf-8'))
+        h.update(memoryview(a).cast('B'))
+    return h.hexdigest()
+
+
+def save_bundle(filename, sections, source_hash='', build_options=None,
+                graph_sections=None):
+    '''
+    This function saves named arrays in a single bundle file
+    (see the file formats section above)
+
+    Parameters
+    ----------
+    filename : str
+        the bundle filename
+    sections : dictionary {name : ndarray}
+        the arrays to be saved. 'indptr', 'names_blob' and 'names_offsets'
+        are required
+    source_hash : str, optional
+        the hash of the thesaurus file that was used for the build
+    build_options : dictionary, optional
+        the options used for the build (must be JSON serializable)
+    graph_sections : str list, optional
+        the sections hashed in graph_hash (the sections that the derived
+        indexes depend on). The default is all the sections.
+
+    Returns
+    -------
+    str
+        the content hash of the bundle
+
+    '''
+    for name in ('indptr', 'names_blob', 'names_offsets'):
+        if not name in sections:
+            raise ValueError('Missing bundle section : %s' % name)
+
+    arrays = {name:np.ascontiguousarray(a) for (name, a) in sections.items()}
+
+    header = {
+        'format_version' : BUNDLE_VERSION,
+        'nodes' : len(arrays['indptr']) - 1,
+        'edges' : int(arrays['indptr'][-1]),
+        'source_hash' : source_hash,
+        'build_options' : build_options or {},
+        'content_hash' : content_hash(arrays),
+        'graph_hash' : content_hash({name:arrays[name] for name in
+                                     (graph_sections or arrays)}),
+        'sections' : {},
+        }
+
+    # The offsets depend on the header size, which depends on the offsets :
+    # we simply grow the reserved header size until everything fits
+    header_size = 1024
+    while True:
+        offset = _align(_BUNDLE_PREFIX.size + header_size)
+        for (name, a) in arrays.items():
+            header['sections'][name] = {'offset' : offset,
+                                        'dtype' : a.dtype.str,
+                                        'shape' : list(a.shape)}
+            offset = _align(offset + a.nbytes)
+        raw_header = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(raw_header) <= header_size:
+            break
+        header_size *= 2
+
+    with open(filename, 'wb') as f:
+        f.write(_BUNDLE_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_VERSION, header_size))
+        f.write(raw_header.ljust(header_size, b' '))
+        for (name, a) in arrays.items():
+            f.seek(header['sections'][name]['offset'])
+            f.write(memoryview(a).cast('B'))
+
+    return header['content_hash']
+
+
+class Bundle:
+    '''
+    This class opens a bundle written by save_bundle(). The whole file is
+    memory-mapped once and each section is a zero-copy view of this map.
+    The header is checked (magic, version, node and edge counts) when the
+    bundle is opened; the content hash is only checked by verify().
+
+    Parameters
+    ----------
+    filename : str
+        the bundle filename
+    mmap_mode : str or None, optional
+        'r' (default) memory-maps the file, None reads it in memory
+
+    Attributes
+    ----------
+    header : dictionary
+        the JSON header of the bundle
+    content_hash : str
+        the hash of all the sections
+    graph_hash : str
+        the hash of the graph sections (key for derived indexes and caches)
+    nodes, edges : int
+        the number of nodes and edges of the graph
+
+    '''
+
+    def __init__(self, filename, mmap_mode='r'):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            prefix = f.read(_BUNDLE_PREFIX.size)
+            if len(prefix) < _BUNDLE_PREFIX.size:
+                raise ValueError('%s is not a thesaurus bundle' % filename)
+            (magic, version, header_size) = _BUNDLE_PREFIX.unpack(prefix)
+            if magic != BUNDLE_MAGIC:
+                raise ValueError('%s is not a thesaurus bundle' % filename)
+            if version != BUNDLE_VERSION:
+                raise ValueError('%s : unsupported bundle version %d (expected %d)'
+                                 % (filename, version, BUNDLE_VERSION))
+            self.header = json.loads(f.read(header_size).decode('utf-8'))
+
+            if mmap_mode is None:
+                f.seek(0)
+                self._buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+        if mmap_mode is not None:
+            # A plain view of the map (still mapped) : slicing a np.memmap is
+            # several times slower, and the lookups slice the sections a lot
+            self._buffer = np.asarray(np.memmap(filename, dtype=np.uint8,
+                                                mode=mmap_mode))
+        self._sections = {}
+
+        self.content_hash = self.header['content_hash']
+        # Older bundles only hold graph sections
+        self.graph_hash = self.header.get('graph_hash', self.content_hash)
+        self.nodes = self.header['nodes']
+        self.edges = self.header['edges']
+
+        if (len(self['indptr']) != self.nodes + 1
+            or ('indices' in self and len(self['indices']) != self.edges)
+            or len(self['names_offsets']) != self.nodes + 1):
+            raise ValueError('%s : inconsistent bundle sections' % filename)
+
+    def __repr__(self):
+        return 'Bundle(%r, %d nodes, %d edges)' % (self.filename, self.nodes, self.edges)
+
+    def __contains__(self, name):
+        return name in self.header['sections']
+
+    def __getitem__(self, name):
+        # The views are cached : the perm section is read for every lookup
+        if not name in self._sections:
+            section = self.header['sections'][name]
+            dtype = np.dtype(section['dtype'])
+            shape = tuple(section['shape'])
+            offset = section['offset']
+            nbytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+            self._sections[name] = \
+                self._buffer[offset:offset+nbytes].view(dtype).reshape(shape)
+        return self._sections[name]
+
+    def get(self, name, default=None):
+        '''
+        This function returns the section name, or default if the bundle
+        does not have this (optional) section
+
+        '''
+        return self[name] if name in self else default
+
+    def sections(self):
+        '''
+        This function returns the names of all the sections of the bundle
+
+        '''
+        return list(self.header['sections'])
+
+    def verify(self):
+        '''
+        This function checks the content hash of the bundle
+        (all the sections are read)
+
+        Returns
+        -------
+        bool
+            True if the sections match the content hash of the header
+
+        '''
+        arrays = {name:self[name] for name in self.sections()}
+        return content_hash(arrays) == self.content_hash
@@ -14,21 +14,82 @@ Usage
 As a main call, it will compute and plot the different cases described in the article
 TBD
 
-As a module, it will export the following functions
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+Thesaurus(data_dir=None)
+    a thesaurus whose graph, names and table are loaded lazily
+    from data_dir (default : ../data/step1 relative to this file)
 
 Functions
 ---------
 
+lookup(word), lookup_many(words)
+    returns the rank of one or many words (-1 if not in the dictionary)
+
+raw_entry(word)
+    returns the original entry of a word, with its sense lines
+
+shortest_path(word1, word2, limit=100, engine='bidirectional')
+    computes, prints and returns the shortest path from word1 to word2
+
+shortest_paths(pairs, limit=100)
+    returns the shortest paths of many (word1, word2) pairs (no printing)
+
+k_shortest_paths(word1, word2, limit=100, weighted=False)
+    generates the loopless paths from word1 to word2, shortest first
+
+within(word, targets, max_depth=6)
+    returns the paths from a word to the targets within max_depth steps
+
+distance(word1, word2), distances(word, words)
+    returns the number of steps from a word to one or many words
+
+distances_from(word)
+    returns the number of steps from a word to every word
+
+definitions_length(graph=None)
+    returns the number of synonyms of each entry
+
+print_synonyms(word, graph, order)
+    prints the order-k synonyms of a given word
+
+compute_syno_set(graph, word, itermax=20, pos=None, sense=None)
+    constructs the growing sets of order-k synonyms of a given word,
+    optionally following only the synonyms of given parts of speech
+
+get_next(graph), sp_unique(sp_matrix, axis=0)
+    sparse matrix helpers
+
+The module level functions are thin wrappers around the methods of a default
+Thesaurus object, which is only created (and loaded) on first use.
+The module level graph, names and table attributes are kept for backward
+compatibility and are also loaded on first access.
+
 
 Assumption
 ----------
 
+The dictionary and its index are stored in a single bundle (see storage.py)
+../data/step1/thesaurus.bundle
+
+If the bundle is not available, the older files are used.
 The dictionary is stored in sparse matrix COO format in the following file
 ../data/step1/thesaurus_matrix.npz
 
+or, preferably, as raw CSR arrays that are memory-mapped (see storage.py)
+../data/step1/thesaurus_csr_indptr.npy
+../data/step1/thesaurus_csr_indices.npy
+
 The dictionary index is stored in the following file
 ../data/step1/thesaurus_entries.npz
 
+or, preferably, in the packed UTF-8 format (see packed_names.py)
+../data/step1/thesaurus_names_blob.npy
+../data/step1/thesaurus_names_offsets.npy
+
 These two files are created by
 $ make matrix
 
@@ -36,101 +97,1129 @@ You can also run directly the create_matrix.py script
 
 """
 
+import os
+
 from scipy import sparse
 import numpy as np
-from matplotlib import rc, pyplot as plt
-import pandas as pd
+
+import storage
+import packed_names
+import raw_entries
+import compressed
+import senses
+import views
+import traversal
+import landmarks
+import labeling
+import distance_matrix
+import tree_cache
+import weights
+import contraction
+import k_shortest
+from adjacency import Adjacency, as_adjacency, as_scipy
 
 # Global fontsize for plots
 _fontsize = 22
 
-rc('xtick', labelsize=_fontsize) 
-rc('ytick', labelsize=_fontsize) 
+# In shortest_paths(), one search tree is computed for a source when it has
+# more than sqrt(N)/_TREE_FACTOR targets : a tree visits about N words
+# whereas a bidirectional search visits about sqrt(N) words on this
+# small-world graph (bidirectional searches are used below)
+_TREE_FACTOR = 8
 
+# The shortest path engines
+ENGINES = ('bidirectional', 'alt', 'labels', 'cache', 'dijkstra', 'hierarchy')
 
-# We load/compute the main strucutres that are used : graph, names and table
-# graph is the sparse matrix that represents the adjacency matrix of our thesaurus
-# names is the list of the entries of our thesaurus
-# table is a dictionary that gives the rank of any given entry
+# Number of landmarks of the ALT engine when the bundle does not have them
+_DEFAULT_LANDMARKS = 16
 
-graph = sparse.load_npz('../data/step1/thesaurus_matrix.npz')
-names = np.load('../data/step1/thesaurus_entries.npz')['names']
+# Default location of the files created by create_matrix.py
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'data', 'step1')
 
-table = {n:k for (k, n) in enumerate(names)}
+# Default location of the thesaurus archive used by the build
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              os.pardir, 'data', 'step0', 'thesaurus.zip')
 
 
-def shortest_path(word1, word2):
+class Thesaurus:
     '''
-    This function computes and prints the shortest path from word1 to word2.
-    It does nothing if either word1 or word2 does not belong to the graph
+    This class holds the three main structures that are used : graph, names
+    and table
+    graph is the sparse matrix that represents the adjacency matrix of our thesaurus
+    It is only built (from adjacency, the pattern-only int32 CSR arrays,
+    see adjacency.py) for the functions that need scipy
+    names is the (sorted) list of the entries of our thesaurus, as a PackedNames
+    table is a dictionary that gives the rank of any given entry
+    Only kept for backward compatibility : use lookup() and lookup_many()
+    which bisect the sorted names instead
+
+    When the bundle has been built with --reorder (see reorder.py), the nodes
+    of graph are no longer numbered in the alphabetical order of names :
+    node()/nodes() give the node of a word and word()/words() the word of
+    a node.
+
+    Nothing is read from the disk when the object is created : each structure
+    is loaded (or computed) on first access and then kept in cache.
+    Several Thesaurus objects (e.g. for different data directories) can
+    live in the same process.
 
     Parameters
     ----------
-    word1 : str
-        starting node for shortest path computation
-    word2 : str
-        ending node for shortest path computation
+    data_dir : str, optional
+        the directory that contains thesaurus.bundle or, for older builds,
+        thesaurus_matrix.npz (or the raw CSR
+        arrays thesaurus_csr_*.npy) and thesaurus_entries.npz (or the packed
+        names thesaurus_names_*.npy). The default is DEFAULT_DATA_DIR.
+    mmap_mode : str or None, optional
+        how the raw CSR arrays and the packed names are opened (see np.load).
+        With the default 'r' they are memory-mapped and shared between
+        processes.
+    source : str, optional
+        the thesaurus file (.dat) or archive (.zip) used for the build, only
+        needed by raw_entry(). The default is DEFAULT_SOURCE.
+    cache : TreeCache, optional
+        the cache of the search trees (see tree_cache.py), which may be
+        shared by several thesauri. The default is None (a cache of
+        tree_cache.DEFAULT_MAX_BYTES bytes).
 
-    Returns
-    -------
-    None.
-
-    '''
-    if (not word1 in names):
-        print('Error : %s does not belong to the dictionary' % word1)
-        return
-    
-    if (not word2 in names):
-        print('Error : %s does not belong to the dictionary' % word2)
-        return
-    
-    ind1 = table[word1]
-    ind2 = table[word2]
-    
-    limit = 100 # We do not compute path above 100 heaps
-    
-    (dist_matrix, predecessors) = \
-    sparse.csgraph.dijkstra(graph, directed=True, return_predecessors=True,
-                            indices=[ind1], limit=limit,
-                            unweighted=True, min_only=False)
-    
-    
-    path_length = dist_matrix[0][ind2]
-    
-    if path_length == np.inf:
-        print('Path length : above %d heap limit value' % limit)
-    else:
-        print('Path length : %d' % path_length)
-        path_names = [];
-        while ind2 != ind1:
-            path_names.append(names[ind2])
-            ind2 = predecessors[0][ind2]
-        
-        path_names.append(names[ind1])
-        path_names.reverse()
+    '''
+
+    def __init__(self, data_dir=None, mmap_mode='r', source=None, cache=None):
+        if data_dir is None:
+            data_dir = DEFAULT_DATA_DIR
+        if source is None:
+            source = DEFAULT_SOURCE
+        self.data_dir = data_dir
+        self.mmap_mode = mmap_mode
+        self.source = source
+        self.cache = tree_cache.TreeCache() if cache is None else cache
+
+        self._bundle = None
+        self._adjacency = None
+        self._names = None
+        self._table = None
+        self._content_hash = None
+        self._raw_entries = None
+        self._senses = None
+        self._views = None
+        self._bidirectional = None
+        self._bfs = None
+        self._alt = None
+        self._labels = None
+        self._distance_matrix = None
+        self._backward_bfs = None
+        self._dijkstra = None
+        self._hierarchy = None
+        self._k_shortest = {}
+
+    def __repr__(self):
+        return 'Thesaurus(%r)' % self.data_dir
+
+    def _path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    @property
+    def bundle(self):
+        '''the graph bundle of the thesaurus, or None for older builds'''
+        if self._bundle is None:
+            filename = self._path('thesaurus.bundle')
+            if os.path.exists(filename):
+                self._bundle = storage.Bundle(filename, self.mmap_mode)
+        return self._bundle
+
+    @property
+    def content_hash(self):
+        '''
+        the hash of the graph and names, used as the key of derived
+        indexes and caches (the graph hash of the bundle when available,
+        see storage.py)
+        '''
+        if self._content_hash is None:
+            if self.bundle is not None:
+                self._content_hash = self.bundle.graph_hash
+            else:
+                graph = self.adjacency
+                self._content_hash = storage.content_hash(
+                    {'indptr' : graph.indptr, 'indices' : graph.indices,
+                     'names_blob' : self.names.blob,
+                     'names_offsets' : self.names.offsets})
+        return self._content_hash
+
+    @property
+    def adjacency(self):
+        '''the pattern of the adjacency matrix (loaded on first access)'''
+        if self._adjacency is None:
+            basename = self._path('thesaurus_csr')
+            if self.bundle is not None:
+                self._adjacency = compressed.from_bundle(self.bundle)
+            elif storage.csr_exists(basename):
+                self._adjacency = Adjacency.load(basename, self.mmap_mode)
+            else:
+                graph = sparse.load_npz(self._path('thesaurus_matrix.npz'))
+                self._adjacency = Adjacency.from_scipy(graph)
+        return self._adjacency
+
+    @property
+    def graph(self):
+        '''the adjacency matrix of the thesaurus as a scipy CSR matrix'''
+        return self.adjacency.to_scipy()
+
+    @property
+    def views(self):
+        '''
+        the registry of the views of the graph (csr, csc, symmetric and
+        reciprocal, see views.py) : each view is built, or loaded from the
+        thesaurus_view_*.npy files saved by the build for this graph, on
+        first access
+        '''
+        if self._views is None:
+            self._views = views.GraphViews(self.adjacency,
+                                           self._path('thesaurus_view'),
+                                           self.mmap_mode, self.content_hash)
+        return self._views
+
+    @property
+    def names(self):
+        '''the entries of the thesaurus (loaded on first access)'''
+        if self._names is None:
+            basename = self._path('thesaurus_names')
+            if self.bundle is not None:
+                self._names = packed_names.from_bundle(self.bundle)
+            elif packed_names.names_exist(basename):
+                self._names = packed_names.load_names(basename, self.mmap_mode)
+            else:
+                with np.load(self._path('thesaurus_entries.npz')) as data:
+                    self._names = packed_names.PackedNames.from_words(data['names'])
+        return self._names
+
+    @property
+    def table(self):
+        '''a dictionary that gives the rank of any given entry'''
+        if self._table is None:
+            self._table = {n:k for (k, n) in enumerate(self.names)}
+        return self._table
+
+    @property
+    def senses(self):
+        '''
+        the sense group and part of speech of each edge of the graph
+        (see senses.py), None for older builds
+        '''
+        if self._senses is None and self.bundle is not None:
+            self._senses = senses.from_bundle(self.bundle)
+        return self._senses
+
+    @property
+    def perm(self):
+        '''perm[rank] is the node of the name of rank (None if not reordered)'''
+        return None if self.bundle is None else self.bundle.get('perm')
+
+    @property
+    def iperm(self):
+        '''iperm[node] is the rank of the name of a node (None if not reordered)'''
+        return None if self.bundle is None else self.bundle.get('iperm')
+
+    def node(self, word):
+        '''
+        This function returns the node of the graph of a given word,
+        or -1 if it does not belong to the dictionary
+
+        '''
+        ind = self.lookup(word)
+        perm = self.perm
+        if ind < 0 or perm is None:
+            return ind
+        return int(perm[ind])
+
+    def nodes(self, words):
+        '''
+        This function returns the nodes of the graph of many words at once
+        (int32 ndarray, -1 for the words that do not belong to the dictionary)
+
+        '''
+        ind = self.lookup_many(words)
+        if self.perm is None:
+            return ind
+        return np.where(ind < 0, -1, self.perm[ind]).astype(np.int32)
+
+    def word(self, node):
+        '''
+        This function returns the word of a given node of the graph
+
+        '''
+        if self.iperm is None:
+            return self.names[node]
+        return self.names[self.iperm[node]]
+
+    def words(self, nodes):
+        '''
+        This function returns the words of a list of nodes of the graph
+
+        '''
+        if self.iperm is None:
+            return self.names[np.asarray(nodes)]
+        return self.names[self.iperm[np.asarray(nodes)]]
+
+    def lookup(self, word):
+        '''
+        This function returns the rank of a given word in O(log N)
+
+        Parameters
+        ----------
+        word : str
+            the word to be found
+
+        Returns
+        -------
+        int
+            the rank of the word, or -1 if it does not belong to the dictionary
+
+        '''
+        return self.names.lookup(word)
+
+    def lookup_many(self, words):
+        '''
+        This function returns the ranks of many words at once
+
+        Parameters
+        ----------
+        words : str list
+            the words to be found
+
+        Returns
+        -------
+        int32 ndarray
+            the rank of each word, or -1 if it does not belong to the dictionary
+
+        '''
+        return self.names.lookup_many(words)
+
+    @property
+    def raw_entries(self):
+        '''
+        the reader of the original entries, based on the offsets table
+        thesaurus_offsets.npy written by the build (see raw_entries.py)
+        '''
+        if self._raw_entries is None:
+            offsets = np.load(self._path('thesaurus_offsets.npy'),
+                              mmap_mode=self.mmap_mode)
+            self._raw_entries = raw_entries.RawEntries(self.source, self.names,
+                                                       offsets)
+        return self._raw_entries
+
+    def raw_entry(self, word):
+        '''
+        This function returns the original entry of a given word, as written
+        in the thesaurus file (the graph merges all the sense lines and drops
+        the synonyms that are not entries)
+
+        Parameters
+        ----------
+        word : str
+            the entry to be read
+
+        Returns
+        -------
+        senses : (str, str list) list
+            for each sense line, its tag (e.g. '(nom)') and its synonyms
+            (None if word does not belong to the dictionary)
+
+        '''
+        return self.raw_entries.get(word)
+
+    @property
+    def bidirectional(self):
+        '''the bidirectional BFS engine of the graph (see traversal.py)'''
+        if self._bidirectional is None:
+            self._bidirectional = traversal.BidirectionalBFS(self.views['csr'],
+                                                             self.views['csc'])
+        return self._bidirectional
+
+    @property
+    def bfs(self):
+        '''the depth-bounded BFS engine of the graph (see traversal.py)'''
+        if self._bfs is None:
+            self._bfs = traversal.BFS(self.views['csr'])
+        return self._bfs
+
+    @property
+    def alt(self):
+        '''
+        the ALT engine of the graph (see landmarks.py) : the landmark tables
+        are read from the bundle, or computed (once) if it does not have them
+        '''
+        if self._alt is None:
+            tables = None if self.bundle is None else landmarks.from_bundle(self.bundle)
+            if tables is None:
+                tables = landmarks.compute(self.views['csr'], self.views['csc'],
+                                           _DEFAULT_LANDMARKS)
+            self._alt = landmarks.ALT(self.views['csr'], *tables)
+        return self._alt
+
+    @property
+    def labels(self):
+        '''
+        the distance labels of the graph (see labeling.py), memory-mapped
+        from the thesaurus_labels_*.npy files, or None if they have not been
+        built for this graph (build.py --labels)
+        '''
+        if self._labels is None:
+            # False : the files are only looked for once
+            basename = self._path('thesaurus_labels')
+            self._labels = False
+            if labeling.labels_exist(basename, self.content_hash):
+                self._labels = labeling.load_labels(basename, self.mmap_mode)
+        return self._labels or None
+
+    @property
+    def distance_matrix(self):
+        '''
+        the all-pairs distance matrix of the graph (see distance_matrix.py),
+        memory-mapped from thesaurus_distances.npy, or None if it has not
+        been (fully) computed for this graph (build.py --distances)
+        '''
+        if self._distance_matrix is None:
+            # False : the files are only looked for once
+            basename = self._path('thesaurus_distances')
+            self._distance_matrix = False
+            if distance_matrix.is_complete(basename, self.content_hash):
+                self._distance_matrix = distance_matrix.DistanceMatrix(basename,
+                                                                       self.mmap_mode)
+        return self._distance_matrix or None
+
+    @property
+    def weights(self):
+        '''
+        the weight of each edge of the graph (float32, see weights.py), or
+        None if the bundle has not been built with --weights
+        '''
+        return None if self.bundle is None else weights.from_bundle(self.bundle)
+
+    @property
+    def dijkstra(self):
+        '''the weighted shortest path engine of the graph (see weights.py)'''
+        if self._dijkstra is None:
+            if self.weights is None:
+                raise ValueError('The graph is not weighted '
+                                 '(see create_matrix.py --weights)')
+            self._dijkstra = weights.Dijkstra(self.views['csr'], self.weights)
+        return self._dijkstra
+
+    @property
+    def hierarchy(self):
+        '''
+        the contraction hierarchy of the weighted graph (see contraction.py),
+        read from the bundle, or None if it has not been built
+        (build.py --contract)
+        '''
+        if self._hierarchy is None and self.bundle is not None:
+            self._hierarchy = contraction.from_bundle(self.bundle)
+        return self._hierarchy
+
+    def source_tree(self, node, direction='forward', max_depth=None):
+        '''
+        This function returns the whole search tree of a node, from the cache
+        of the thesaurus if it is there, computed (and cached) otherwise
+
+        Parameters
+        ----------
+        node : int
+            the source of the search
+        direction : str, optional
+            'forward' (the paths from node) or 'backward' (the paths to node,
+            along the in-neighbours). The default is 'forward'.
+        max_depth : int, optional
+            the search stops after this level, which must not exceed
+            tree_cache.MAX_DEPTH (the depths are stored as int8). The default
+            is None (tree_cache.MAX_DEPTH).
+
+        Returns
+        -------
+        SourceTree
+            the distances and predecessors of the search (see tree_cache.py)
+
+        '''
+        if not direction in tree_cache.DIRECTIONS:
+            raise ValueError('Unknown direction : %s (expected one of %s)'
+                             % (direction, ', '.join(tree_cache.DIRECTIONS)))
+        if max_depth is None:
+            max_depth = tree_cache.MAX_DEPTH
+        elif max_depth > tree_cache.MAX_DEPTH:
+            raise ValueError('The depth of a cached tree is at most %d (got %d)'
+                             % (tree_cache.MAX_DEPTH, max_depth))
+
+        key = (self.content_hash, int(node), direction, max_depth)
+        tree = self.cache.get(key)
+        if tree is None:
+            if direction == 'forward':
+                engine = self.bfs
+            else:
+                if self._backward_bfs is None:
+                    self._backward_bfs = traversal.BFS(self.views['csc'])
+                engine = self._backward_bfs
+            tree = tree_cache.SourceTree.from_bfs(node, engine.search(node, max_depth),
+                                                  self.adjacency.shape[0])
+            self.cache.put(key, tree)
+        return tree
+
+    def shortest_path(self, word1, word2, limit=100, engine='bidirectional'):
+        '''
+        This function computes and prints the shortest path from word1 to word2
+        with a bidirectional breadth first search (see traversal.py), an A*
+        search with landmarks (see landmarks.py), the distance labels (see
+        labeling.py), the cached search tree of word1 (see tree_cache.py) or,
+        for a weighted graph, Dijkstra (see weights.py) or the contraction
+        hierarchy (see contraction.py).
+        It does nothing if either word1 or word2 does not belong to the graph
+
+        Parameters
+        ----------
+        word1 : str
+            starting node for shortest path computation
+        word2 : str
+            ending node for shortest path computation
+        limit : int, optional
+            the paths longer than limit are not searched. The default is 100.
+        engine : str, optional
+            'bidirectional' (bidirectional BFS, see traversal.py), 'alt'
+            (A* with landmarks, see landmarks.py) or 'labels' (the labels
+            built by build.py --labels, see labeling.py) or 'cache' (the whole
+            search tree of word1 is kept in the cache of the thesaurus, the
+            next paths from word1 are read from it, see source_tree; the
+            paths longer than tree_cache.MAX_DEPTH are searched with the
+            bidirectional BFS) or 'dijkstra' (the path of smallest total
+            weight, limit is then the maximum weight) or 'hierarchy' (the
+            same path, found with the contraction hierarchy built by
+            build.py --contract). The default is 'bidirectional'.
+
+        Returns
+        -------
+        str list
+            the words of the path, from word1 to word2 (None if there is no
+            path or if a word does not belong to the graph)
+
+        '''
+        ind1 = self.node(word1)
+        if ind1 < 0:
+            print('Error : %s does not belong to the dictionary' % word1)
+            return
+
+        ind2 = self.node(word2)
+        if ind2 < 0:
+            print('Error : %s does not belong to the dictionary' % word2)
+            return
+
+        if engine == 'bidirectional':
+            path = self.bidirectional.path(ind1, ind2, max_depth=limit)
+        elif engine == 'alt':
+            path = self.alt.path(ind1, ind2, max_depth=limit)
+        elif engine == 'labels':
+            if self.labels is None:
+                raise ValueError('The distance labels have not been built '
+                                 '(see build.py --labels)')
+            path = self.labels.path(ind1, ind2)
+            if path is not None and len(path) - 1 > limit:
+                path = None
+        elif engine == 'cache':
+            path = self.source_tree(ind1, 'forward',
+                                    min(limit, tree_cache.MAX_DEPTH)).path(ind2)
+            if path is None and limit > tree_cache.MAX_DEPTH:
+                # Beyond the depth of a cached tree
+                path = self.bidirectional.path(ind1, ind2, max_depth=limit)
+        elif engine == 'dijkstra':
+            (cost, path) = self.dijkstra.shortest(ind1, ind2, max_cost=limit)
+            if path is not None:
+                print('Path weight : %g' % cost)
+        elif engine == 'hierarchy':
+            if self.hierarchy is None:
+                raise ValueError('The contraction hierarchy has not been built '
+                                 '(see build.py --contract)')
+            (cost, path) = self.hierarchy.shortest(ind1, ind2, max_cost=limit)
+            if path is not None:
+                print('Path weight : %g' % cost)
+        else:
+            raise ValueError('Unknown engine : %s (expected one of %s)'
+                             % (engine, ', '.join(ENGINES)))
+
+        if path is None:
+            print('Path length : above %d heap limit value' % limit)
+            return None
+
+        print('Path length : %d' % (len(path) - 1))
+        path_names = self.words(path)
         print(' -> '.join(path_names))
-            
-def definitions_length(graph):
+        return path_names
+
+    def shortest_paths(self, pairs, limit=100):
+        '''
+        This function computes the shortest paths of many pairs of words.
+        The words are looked up in bulk and the pairs are grouped by source.
+        A source with many targets is searched once (until all its targets
+        are found, see traversal.BFS) and all its paths are walked back
+        together; the pairs of the other sources use the bidirectional
+        search, which visits far fewer words per pair. Nothing is printed.
+
+        Parameters
+        ----------
+        pairs : iterable of (str, str)
+            the (word1, word2) pairs
+        limit : int, optional
+            the paths longer than limit are not searched. The default is 100.
+
+        Returns
+        -------
+        Paths
+            lengths[k] is the length of the k-th path (-1 if there is no
+            path or if a word does not belong to the graph), path(k) its
+            nodes and words(k) its words, which are decoded on demand
+            (see traversal.Paths)
+
+        '''
+        pairs = list(pairs)
+        nodes = self.nodes([word for pair in pairs for word in pair])
+        nodes = nodes.reshape(len(pairs), 2)
+        (sources, targets) = (nodes[:, 0], nodes[:, 1])
+
+        # The pairs are grouped by source
+        valid = np.flatnonzero((sources >= 0) & (targets >= 0))
+        valid = valid[np.argsort(sources[valid], kind='stable')]
+        starts = np.flatnonzero(np.diff(sources[valid]) != 0) + 1
+
+        results = []
+        min_targets = np.sqrt(self.adjacency.shape[0]) / _TREE_FACTOR
+        for group in np.split(valid, starts) if len(valid) else []:
+            if len(group) >= min_targets:
+                tree = self.bfs.search(sources[group[0]], limit, targets[group])
+                results.append(tree.paths(targets[group]))
+                continue
+            paths = [self.bidirectional.path(sources[k], targets[k], limit)
+                     for k in group]
+            results.append((np.array([-1 if p is None else len(p) - 1 for p in paths],
+                                     dtype=np.int32), None,
+                            np.concatenate([p for p in paths if p is not None]
+                                           + [np.zeros(0, dtype=np.int32)])))
+
+        lengths = np.full(len(pairs), -1, dtype=np.int32)
+        if len(results) > 0:
+            lengths[valid] = np.concatenate([r[0] for r in results])
+
+        indptr = np.zeros(len(pairs) + 1, dtype=np.int64)
+        np.cumsum(lengths + 1, out=indptr[1:])
+        path_nodes = np.empty(indptr[-1], dtype=np.int32)
+
+        # The paths are moved from the source order to the pairs order
+        if len(results) > 0:
+            grouped = np.concatenate([r[2] for r in results])
+            sizes = lengths[valid] + 1
+            within = np.arange(len(grouped)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            path_nodes[np.repeat(indptr[valid], sizes) + within] = grouped
+
+        return traversal.Paths(sources, targets, lengths, indptr, path_nodes,
+                               self.words)
+
+    def k_shortest_paths(self, word1, word2, limit=100, weighted=False):
+        '''
+        This function generates the loopless paths from word1 to word2, the
+        shortest first (Yen's algorithm, see k_shortest.py). The next path
+        is only searched when it is asked for, so that the alternatives to
+        a shortest path cost nothing until they are used. Nothing is printed.
+
+        Parameters
+        ----------
+        word1 : str
+            starting node of the paths
+        word2 : str
+            ending node of the paths
+        limit : int, optional
+            the paths longer (or heavier) than limit are not generated.
+            The default is 100.
+        weighted : bool, optional
+            True to rank the paths by their weight (see build.py --weights)
+            instead of their number of steps. The default is False.
+
+        Returns
+        -------
+        generator of (float, int32 ndarray)
+            the length (or weight) and the nodes of each path (see words),
+            nothing if a word does not belong to the graph
+
+        '''
+        ind1 = self.node(word1)
+        if ind1 < 0:
+            print('Error : %s does not belong to the dictionary' % word1)
+            return iter(())
+
+        ind2 = self.node(word2)
+        if ind2 < 0:
+            print('Error : %s does not belong to the dictionary' % word2)
+            return iter(())
+
+        if not weighted in self._k_shortest:
+            if weighted and self.weights is None:
+                raise ValueError('The graph is not weighted '
+                                 '(see create_matrix.py --weights)')
+            self._k_shortest[weighted] = k_shortest.KShortestPaths(
+                self.views['csr'], None if weighted else self.views['csc'],
+                self.weights if weighted else None)
+        return self._k_shortest[weighted].paths(ind1, ind2, limit)
+
+    def within(self, word, targets, max_depth=6):
+        '''
+        This function finds which targets are within max_depth steps of
+        word, and how. The search stops as soon as all the targets are found
+        or at depth max_depth, so that its cost depends on the explored ball
+        only (see traversal.BFS).
+
+        Parameters
+        ----------
+        word : str
+            the starting word
+        targets : str or str list
+            the words to be reached
+        max_depth : int, optional
+            the maximum number of steps. The default is 6.
+
+        Returns
+        -------
+        dictionary {str : str list}
+            the path from word to each target that has been reached
+            (None if word does not belong to the dictionary)
+
+        '''
+        ind = self.node(word)
+        if ind < 0:
+            print('Error : %s does not belong to the dictionary' % word)
+            return None
+
+        if isinstance(targets, str):
+            targets = [targets]
+        nodes = self.nodes(targets)
+        for (target, node) in zip(targets, nodes):
+            if node < 0:
+                print('Error : %s does not belong to the dictionary' % target)
+
+        tree = self.bfs.search(ind, max_depth, nodes[nodes >= 0])
+        paths = {}
+        for (target, node) in zip(targets, nodes):
+            path = tree.path(node) if node >= 0 else None
+            if path is not None:
+                paths[target] = self.words(path)
+        return paths
+
+    def distance(self, word1, word2):
+        '''
+        This function returns the number of steps of the shortest path from
+        word1 to word2, read from the all-pairs distance matrix or from the
+        distance labels if they have been built (see distance_matrix.py and
+        labeling.py), computed by the bidirectional search otherwise.
+        Nothing is printed but the errors.
+
+        Parameters
+        ----------
+        word1 : str
+            the starting word
+        word2 : str
+            the ending word
+
+        Returns
+        -------
+        int
+            the distance (-1 if there is no path, None if a word does not
+            belong to the dictionary)
+
+        '''
+        # Two scalar lookups : lookup_many() costs more than a label query
+        (ind1, ind2) = (self.node(word1), self.node(word2))
+        for (word, ind) in ((word1, ind1), (word2, ind2)):
+            if ind < 0:
+                print('Error : %s does not belong to the dictionary' % word)
+                return None
+
+        if self.distance_matrix is not None:
+            return self.distance_matrix.distance(ind1, ind2)
+        if self.labels is not None:
+            return self.labels.distance(ind1, ind2)
+        path = self.bidirectional.path(ind1, ind2)
+        return -1 if path is None else len(path) - 1
+
+    def distances(self, word, words):
+        '''
+        This function returns the number of steps from word to each of many
+        words, e.g. to score a list of candidates. With the all-pairs
+        distance matrix (see distance_matrix.py), they are read from a row;
+        with the distance labels (see labeling.py), all the labels of the
+        words are read at once; otherwise a single search stops when all the
+        words have been found.
+
+        Parameters
+        ----------
+        word : str
+            the starting word
+        words : str list
+            the words to be reached
+
+        Returns
+        -------
+        int32 ndarray
+            the distance to each of words (-1 if there is no path or if it
+            does not belong to the dictionary), None if word does not belong
+            to the dictionary
+
+        '''
+        ind = self.node(word)
+        if ind < 0:
+            print('Error : %s does not belong to the dictionary' % word)
+            return None
+
+        nodes = self.nodes(words)
+        known = nodes >= 0
+        result = np.full(len(nodes), -1, dtype=np.int32)
+        if self.distance_matrix is not None:
+            row = self.distance_matrix.distances_from(ind)[nodes[known]]
+            result[known] = np.where(row == distance_matrix.UNREACHABLE, -1,
+                                     row.astype(np.int32))
+        elif self.labels is not None:
+            result[known] = self.labels.distances(ind, nodes[known])
+        else:
+            tree = self.bfs.search(ind, targets=nodes[known])
+            result[known] = tree.paths(nodes[known])[0]
+        return result
+
+    def distances_from(self, word):
+        '''
+        This function returns the number of steps from word to every word of
+        the graph : a row of the all-pairs distance matrix if it has been
+        computed (see distance_matrix.py), a whole search otherwise
+
+        Parameters
+        ----------
+        word : str
+            the starting word
+
+        Returns
+        -------
+        uint8 ndarray
+            the distance to each node of the graph (see words()), 255 if
+            there is no path (None if word does not belong to the dictionary)
+
+        '''
+        ind = self.node(word)
+        if ind < 0:
+            print('Error : %s does not belong to the dictionary' % word)
+            return None
+
+        if self.distance_matrix is not None:
+            return self.distance_matrix.distances_from(ind)
+        row = np.full(self.adjacency.shape[0], distance_matrix.UNREACHABLE,
+                      dtype=np.uint8)
+        tree = self.bfs.search(ind, max_depth=distance_matrix.UNREACHABLE - 1)
+        row[tree.nodes] = tree.depths
+        return row
+
+    def definitions_length(self, graph=None):
+        '''
+        This function returns the number of neighbours of each node of the graph
+        That is to say, for each word in the dictionary, this functions returns
+        the number of synonyms
+
+        Parameters
+        ----------
+        graph : sparse matrix (in COO format, but other formats might work as well)
+            or Adjacency
+            the adjecency matrix that describes the thesaurus
+            The default is the graph of this thesaurus.
+
+        Returns
+        -------
+        int list
+            the kth word of the thesaurus is defined with output[k] synonyms
+            (for the graph of this thesaurus, k is the alphabetical rank
+            even if the graph has been reordered)'''
+        if graph is None:
+            counts = self.adjacency.degrees()[:, None]
+            return counts if self.perm is None else counts[self.perm]
+        if isinstance(graph, Adjacency):
+            return graph.degrees()[:, None]
+        return np.array(graph.sum(1))
+
+    def print_synonyms(self, word, order, graph=None):
+        '''
+        This function prints the synonyms of a given order for the given word
+        Please notice that this still need some improvements since the time
+        computation for the graph^order is extremely large for order >= 2
+
+        Parameters
+        ----------
+        word  : str
+            the word that you want to compute the order-k synonyms list
+        order : int
+            the order of the synonyms to be computed
+            0 means the direct synonyms of the given word
+            1 means the synonyms of the direct synonyms of the given word
+            etc...
+            Please note that actually only order 0 and 1 should be used
+        graph : sparse matrix (in COO format, but other formats might work as well)
+            or Adjacency
+            the adjecency matrix that describes the thesaurus
+            The default is the graph of this thesaurus.
+
+        Returns
+        -------
+        None.
+
+        '''
+        ind = self.node(word)
+        if ind < 0:
+            print('Error : %s does not belong to the dictionary' % word)
+            return
+
+        # Initialization of the matrix
+        M = self.graph if graph is None else as_scipy(graph)
+
+        for k in range(order):
+            print('Multiplication order %d...' % k)
+            M = get_next(M)
+
+        # We only read the row of the word (no dense matrix)
+        row = sparse.csr_matrix(M)[[ind], :]
+        ind_syno = np.sort(row.indices[row.data != 0])
+
+        for k in ind_syno:
+            print(self.word(k))
+
+    def compute_syno_set(self, word, itermax=20, graph=None, pos=None, sense=None):
+        '''
+        This functions explicitly constructs the growing sets of order-k synonyms
+        of a given word up to iteration max number (defaut : 20).
+        Notice that it is a lot faster than print_synonyms() because
+        we do not compute the entire matrix multiplication : at each
+        iteration, only the rows of the words added at the previous
+        iteration are read.
+
+        Parameters
+        ----------
+        word  : str
+            the initial word that will be used as a seed for our incremental
+            order-k synonyms list
+        itermax : int, optional
+            the computation will stop after itermax iteration. The default is 20.
+            Preliminary tests have shown that around 10 iterations seems to be
+            sufficient for getting an invariant set. Or in other word, it seems
+            that order-11 synonyms list of any given word is equal to order-10
+            synonyms list (this have been verified over a few random words but
+            we can't say it is true for ANY word in the thesaurus...)
+        graph : sparse matrix (in COO format, but other formats might work as well)
+            or Adjacency
+            the adjecency matrix that describes the thesaurus
+            The default is the graph of this thesaurus.
+        pos : str or str list, optional
+            if given, only the synonyms of these parts of speech (e.g. 'nom'
+            or ['(adj.)', '(adv.)']) are followed. Only for the graph of this
+            thesaurus. The default is None.
+        sense : int, optional
+            if given, only the synonyms of this sense group (rank of the sense
+            line in the entry, see raw_entry) of the given word are used at
+            the first iteration. Only for the graph of this thesaurus.
+            The default is None.
+
+        Returns
+        -------
+        iteration_vect : int list
+            this is just a range vector [1, 2, ..., n] of the iteration
+            (used mainly for plotting)
+        size_set_vect : int list
+            size_set_vect[k] contains the cardinality of order-k synonyms list
+
+        '''
+        ind = self.node(word)
+        if ind < 0:
+            print('Error : %s does not belong to the dictionary' % word)
+            return
+
+        adjacency = self.adjacency if graph is None else as_adjacency(graph)
+
+        filtered = pos is not None or sense is not None
+        if filtered:
+            if graph is not None or self.senses is None:
+                raise ValueError('pos and sense need the senses of the bundle '
+                                 '(graph must not be given)')
+            allowed = np.ones(len(self.senses.tags), dtype=bool)
+            if pos is not None:
+                allowed = self.senses.edge_filter(pos)
+                mask = self.senses.pos_mask(pos)
+
+        # syno_set is stored as a boolean mask and the last added words
+        seen = np.zeros(adjacency.shape[0], dtype=bool)
+        seen[ind] = True
+        frontier = np.array([ind])
+        size_set = 1
+        iteration = 1
+
+        size_set_vect = [size_set]
+        iteration_vect = [iteration]
+
+        same_size = False
+
+        while (same_size==False) and (iteration < itermax):
+            print('Iteration %d...' % iteration)
+            # We construct the set
+            if filtered:
+                if pos is not None:
+                    # the words without these parts of speech are not expanded
+                    frontier = frontier[(self.senses.node_pos[frontier] & mask) != 0]
+                edges = adjacency.edges_of(frontier)
+                keep = allowed[self.senses.edge_pos[edges]]
+                if sense is not None and iteration == 1:
+                    keep &= self.senses.edge_sense[edges] == sense
+                new_syno = np.unique(adjacency.neighbors_of(frontier)[keep])
+            else:
+                new_syno = np.unique(adjacency.neighbors_of(frontier))
+            frontier = new_syno[~seen[new_syno]]
+            seen[frontier] = True
+
+            if len(frontier) == 0:
+                same_size = True
+
+            size_set += len(frontier)
+
+            size_set_vect.append(size_set)
+            iteration += 1
+
+
+        iteration_vect = range(0, iteration)
+
+        return (iteration_vect, size_set_vect)
+
+
+# The default thesaurus used by the module level functions
+# It is only created on first use (see _default_thesaurus)
+_thesaurus = None
+
+
+def _default_thesaurus():
     '''
-    This function returns the number of neighbours of each node of the graph
-    That is to say, for each word in the dictionary, this functions returns
-    the number of synonyms
+    This *internal* function returns the default Thesaurus object,
+    creating it on first call
 
-    Parameters
-    ----------
-    graph : sparse matrix (in COO format, but other formats might work as well)
-        the adjecency matrix that describes the thesaurus
+    '''
+    global _thesaurus
+    if _thesaurus is None:
+        _thesaurus = Thesaurus()
+    return _thesaurus
 
-    Returns
-    -------
-    int list
-        the kth word of the thesaurus is defined with output[k] synonyms'''
-    return np.array(graph.sum(1))
+
+def __getattr__(name):
+    # graph, names and table used to be loaded when importing this module
+    # They are now loaded on first access to keep the import cheap
+    if name in ('graph', 'names', 'table'):
+        return getattr(_default_thesaurus(), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def lookup(word):
+    '''
+    This function returns the rank of a given word in the default thesaurus
+    (see Thesaurus.lookup)
+
+    '''
+    return _default_thesaurus().lookup(word)
+
+
+def lookup_many(words):
+    '''
+    This function returns the ranks of many words in the default thesaurus
+    (see Thesaurus.lookup_many)
+
+    '''
+    return _default_thesaurus().lookup_many(words)
+
+
+def raw_entry(word):
+    '''
+    This function returns the original entry of a given word in the
+    default thesaurus (see Thesaurus.raw_entry)
+
+    '''
+    return _default_thesaurus().raw_entry(word)
+
+
+def shortest_path(word1, word2, limit=100, engine='bidirectional'):
+    '''
+    This function computes and prints the shortest path from word1 to word2
+    in the default thesaurus (see Thesaurus.shortest_path)
+
+    '''
+    return _default_thesaurus().shortest_path(word1, word2, limit, engine)
+
+
+def shortest_paths(pairs, limit=100):
+    '''
+    This function returns the shortest paths of many pairs of words in the
+    default thesaurus (see Thesaurus.shortest_paths)
+
+    '''
+    return _default_thesaurus().shortest_paths(pairs, limit)
+
+
+def k_shortest_paths(word1, word2, limit=100, weighted=False):
+    '''
+    This function generates the loopless paths from word1 to word2, the
+    shortest first, in the default thesaurus (see Thesaurus.k_shortest_paths)
+
+    '''
+    return _default_thesaurus().k_shortest_paths(word1, word2, limit, weighted)
+
+
+def within(word, targets, max_depth=6):
+    '''
+    This function returns the paths from word to the targets that are within
+    max_depth steps in the default thesaurus (see Thesaurus.within)
+
+    '''
+    return _default_thesaurus().within(word, targets, max_depth)
+
+
+def distance(word1, word2):
+    '''
+    This function returns the number of steps from word1 to word2 in the
+    default thesaurus (see Thesaurus.distance)
+
+    '''
+    return _default_thesaurus().distance(word1, word2)
+
+
+def distances(word, words):
+    '''
+    This function returns the number of steps from word to many words in the
+    default thesaurus (see Thesaurus.distances)
+
+    '''
+    return _default_thesaurus().distances(word, words)
+
+
+def distances_from(word):
+    '''
+    This function returns the number of steps from word to every word of the
+    default thesaurus (see Thesaurus.distances_from)
+
+    '''
+    return _default_thesaurus().distances_from(word)
+
+
+def definitions_length(graph=None):
+    '''
+    This function returns the number of neighbours of each node of the graph
+    (see Thesaurus.definitions_length)
+
+    '''
+    return _default_thesaurus().definitions_length(graph)
 
 
 def get_next(graph):
     '''
-    This function returns the next order of a given graph
+    This function returns the next order of a given graph (a scipy sparse
+    matrix, an Adjacency is converted)
     If graph is the initial sparse matrix, and e_k = [0, ..., 0, 1, 0, ..., 0]
     then graph*e_k returns the list of synonyms of word e_k
     and get_next_(graph)*e_k return the list of synonyms of synonyms of word e_k
@@ -151,56 +1240,21 @@ def get_next(graph):
         the adjecency matrix that describes the thesaurus of the next order
 
     '''
-    # This does not work since it element wise 
+    # This does not work since it element wise
     #return graph.multiply(graph)
-    
+
+    graph = as_scipy(graph)
     return graph.dot(graph)
 
 
 def print_synonyms(word, graph, order):
     '''
     This function prints the synonyms of a given order for the given word
-    Please notice that this still need some improvements since the time
-    computation for the graph^order is extremely large for order >= 2
+    in the default thesaurus (see Thesaurus.print_synonyms)
 
-    Parameters
-    ----------
-    word  : str
-        the word that you want to compute the order-k synonyms list
-    graph : sparse matrix (in COO format, but other formats might work as well)
-        the adjecency matrix that describes the thesaurus
-    order : int
-        the order of the synonyms to be computed
-        0 means the direct synonyms of the given word
-        1 means the synonyms of the direct synonyms of the given word
-        etc...
-        Please note that actually only order 0 and 1 should be used
+    '''
+    return _default_thesaurus().print_synonyms(word, order, graph)
 
-    Returns
-    -------
-    None.
-
-    '''
-    if (not word in names):
-        print('Error : %s does not belong to the dictionary' % word)
-        return
-    
-    # Initialization of the matrix
-    M = graph
-    
-    for k in range(order):
-        print('Multiplication order %d...' % k)
-        M = get_next(M)
-    
-    # We trasnform M in ndarray format in order to access elements
-    M = M.toarray()
-    
-    ind = table[word]
-    
-    ind_syno = np.where(M[ind,:])[0]
-    
-    for k in ind_syno:
-        print(names[k])
 
 def sp_unique(sp_matrix, axis=0):
     '''
@@ -246,98 +1300,50 @@ def sp_unique(sp_matrix, axis=0):
 
     ret = sp_matrix.asformat(old_format)
     if axis == 1:
-        ret = ret.T        
+        ret = ret.T
     return ret
 
 
-def compute_syno_set(graph, word, itermax=20):
+def compute_syno_set(graph, word, itermax=20, pos=None, sense=None):
     '''
     This functions explicitly constructs the growing sets of order-k synonyms
-    of a given word up to iteration max number (defaut : 20).
-    Notice that it is a little bit faster than print_synonyms() because
-    we do not compute the entire matrix multiplication but only on the
-    relevant rows.
+    of a given word in the default thesaurus
+    (see Thesaurus.compute_syno_set : graph must be None to use pos or sense)
 
-    Parameters
-    ----------
-    graph : sparse matrix (in COO format, but other formats might work as well)
-        the adjecency matrix that describes the thesaurus
-    word  : str
-        the initial word that will be used as a seed for our incremental
-        order-k synonyms list
-    itermax : int, optional
-        the computation will stop after itermax iteration. The default is 20.
-        Preliminary tests have shown that around 10 iterations seems to be
-        sufficient for getting an invariant set. Or in other word, it seems
-        that order-11 synonyms list of any given word is equal to order-10
-        synonyms list (this have been verified over a few random words but
-        we can't say it is true for ANY word in the thesaurus...)
+    '''
+    return _default_thesaurus().compute_syno_set(word, itermax, graph, pos, sense)
 
-    Returns
-    -------
-    iteration_vect : int list
-        this is just a range vector [1, 2, ..., n] of the iteration
-        (used mainly for plotting)
-    size_set_vect : int list
-        size_set_vect[k] contains the cardinality of order-k synonyms list
-
-    '''
-    if (not word in names):
-        print('Error : %s does not belong to the dictionary' % word)
-        return
-    
-    M = graph.todense()
-    
-    ind = table[word]
-    syno_set = set([ind])
-    size_set = 1
-    iteration = 1
-    
-    size_set_vect = [size_set]
-    iteration_vect = [iteration]
-    
-    same_size = False
-    
-    while (same_size==False) and (iteration < itermax):
-        print('Iteration %d...' % iteration)
-        # We construct the set
-        for k in syno_set:
-            line = np.array(M[k][:]).flatten()
-            new_syno = np.where(line==True)[0]
-            syno_set = syno_set.union(set(new_syno))
-        
-        if len(syno_set) == size_set:
-            same_size = True
-        
-        size_set = len(syno_set)
-        
-        size_set_vect.append(size_set)
-        iteration += 1
-        
-         
-    iteration_vect = range(0, iteration)
-        
-    return (iteration_vect, size_set_vect)
-        
 
 if __name__ == '__main__':
-    
+
+    # Plotting libraries are only needed for the main call
+    from matplotlib import rc, pyplot as plt
+    import pandas as pd
+
+    # Global fontsize for plots
+    rc('xtick', labelsize=_fontsize)
+    rc('ytick', labelsize=_fontsize)
+
+    thesaurus = _default_thesaurus()
+    graph = thesaurus.graph
+    names = thesaurus.names
+
     # Some example of shortest_path usage
-    shortest_path("marionnette", "enfant")    
+    shortest_path("marionnette", "enfant")
     shortest_path("poisson", "chat")
     shortest_path("chat", "poisson")
-    
+
     # Computation of definitions length and conversion to a pandas Series
-    p = definitions_length(graph)
-    ps = pd.Series(data=p[:,0], index=names)
-    
+    p = definitions_length()
+    ps = pd.Series(data=p[:,0], index=list(names))
+
     # Histogram plot
     plt.close('all')
-    
+
     legend = 'min : %d, mean : %3.1f, max = %d' % (p.min(), p.mean(), p.max())
-    n, bins, patches = plt.hist(x=p, bins=range(p.max()), color=[1,0,0], 
+    n, bins, patches = plt.hist(x=p, bins=range(p.max()), color=[1,0,0],
                                 alpha=0.7, label=legend)
-    
+
     plt.grid(axis='y', alpha=0.75)
     plt.xlabel('Definition length', fontsize=_fontsize)
     plt.ylabel('Frequency', fontsize=_fontsize)
@@ -348,45 +1354,44 @@ if __name__ == '__main__':
     # Sort of ps pandas Series
     ps.sort_values(inplace=True)
     ps = ps[ps>0]
-    
+
     # The first ten entries
     print('\n--> The first 10 entries')
     print(ps.head(10))
-    
+
     # The last ten entries
     print('\n--> the last ten entries')
     print(ps.tail(10)[::-1])
-        
-    
+
+
     # Iterate for a given word
-    
+
     (x, y) = compute_syno_set(graph, "active")
-    
+
     plt.figure()
     plt.plot(x, y, 'r-+')
-    
-    
+
+
     # This still need some work....
     for order in range(3):
         pass
         #print('\n --> Order %d' % order)
         #print_synonyms("manger", graph, order)
-        
-    
+
+
     # print('Computing order graphs...')
     # order_graph = [graph.tocsr()]
     # for k in range(10):
     #     print(k)
     #     order_graph.append(get_next(order_graph[k]))
-    
+
     # print('The plots stuff...')
     # plt.figure()
     # for order in range(3):
     #     syno_sets, syno_sets_length, nsets = compute_syno_set(order_graph[order])
-        
+
     #     print('There are %d sets of order-%d synonyms' % (nsets, order))
     #     plt.subplot(1,3, order+1)
     #     plt.hist(x=syno_sets_length, color=[1,0,0])
     #     plt.xlabel('Syno sets length')
     #     plt.title('Order %d' % order)
-        
\ No newline at end of file
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the breadth first search engines used for the shortest
+paths of the thesaurus graph
+
+
+Usage
+-----
+
+As a module, it will export the following classes
+
+Classes
+-------
+
+BFS(adjacency)
+    depth-bounded breadth first search, with an early exit on target nodes
+
+BFSTree(nodes, depths, parents)
+    the nodes discovered by a BFS search, with their depth and parent
+
+BidirectionalBFS(forward, backward)
+    shortest path between two nodes of an unweighted graph
+
+Paths(sources, targets, lengths, indptr, nodes, decode=None)
+    the shortest paths of many (source, target) pairs
+
+
+Algorithm
+---------
+
+The graph is unweighted and small-world : a single source search visits
+most of the graph before reaching a word 5 or 6 steps away, whereas two
+searches, one from each end, meet after visiting a tiny fraction of it.
+The forward search follows the out-neighbours (csr view) from the source,
+the backward search follows the in-neighbours (csc view, see views.py) from
+the target. At each step, the smaller frontier is expanded by one whole
+level with vectorized numpy operations (see Adjacency.neighbors_of). The
+searches stop at the first level where they meet : the shortest path goes
+through the meeting node of smallest total depth.
+
+Most of the queries only need to know if (and how) a word is within a few
+steps of another one : BFS expands the frontier level by level as well, but
+stops at a given depth or as soon as all the target nodes are discovered,
+and only returns the discovered nodes (BFSTree).
+
+The parents and depths are stored in arrays of the size of the graph that
+are allocated once per engine and reset after each search at the discovered
+nodes only, so that the cost of a search depends on the visited nodes only.
+
+"""
+
+import numpy as np
+
+# The parent of an undiscovered node
+UNSEEN = -2
+
+
+def _expand(adjacency, frontier, parent, depth, level):
+    '''
+    This *internal* function expands a frontier by one level : the
+    undiscovered neighbours get their parent (the first node of the frontier
+    that reaches them) and their depth
+
+    Returns
+    -------
+    int32 ndarray
+        the new frontier (sorted)
+
+    '''
+    lengths = adjacency.indptr[frontier + 1] - adjacency.indptr[frontier]
+    sources = np.repeat(frontier, lengths)
+    neighbors = adjacency.neighbors_of(frontier)
+
+    new = parent[neighbors] == UNSEEN
+    (nodes, first) = np.unique(neighbors[new], return_index=True)
+    parent[nodes] = sources[new][first]
+    depth[nodes] = level
+    return nodes.astype(np.int32)
+
+
+class BFSTree:
+    '''
+    This class holds the result of a BFS search : the discovered nodes in
+    discovery order (level by level), with their depth and parent
+
+    Parameters
+    ----------
+    nodes : int32 ndarray
+        the discovered nodes (the sources first)
+    depths : int32 ndarray
+        the depth of each node (0 for the sources)
+    parents : int32 ndarray
+        the parent of each node (-1 for the sources)
+
+    '''
+
+    def __init__(self, nodes, depths, parents):
+        self.nodes = nodes
+        self.depths = depths
+        self.parents = parents
+        self._order = None
+
+    def __repr__(self):
+        return 'BFSTree(%d nodes, depth %d)' % (len(self.nodes), self.max_depth)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def max_depth(self):
+        '''the depth of the last discovered level'''
+        return int(self.depths[-1]) if len(self.depths) else -1
+
+    def _positions(self, nodes):
+        '''
+        This *internal* function returns the positions of many nodes in
+        nodes (-1 for the nodes that have not been discovered), by bisection
+
+        '''
+        if self._order is None:
+            self._order = np.argsort(self.nodes, kind='stable')
+        nodes = np.asarray(nodes)
+        k = np.searchsorted(self.nodes, nodes, sorter=self._order)
+        k = np.minimum(k, len(self.nodes) - 1)
+        found = self.nodes[self._order[k]] == nodes
+        return np.where(found, self._order[k], -1)
+
+    def _position(self, node):
+        return int(self._positions(np.array([node]))[0])
+
+    def __contains__(self, node):
+        return self._position(node) >= 0
+
+    def depth(self, node):
+        '''
+        This function returns the depth of a node (-1 if not discovered)
+
+        '''
+        k = self._position(node)
+        return -1 if k < 0 else int(self.depths[k])
+
+    def path(self, node):
+        '''
+        This function returns the path from a source to a node
+
+        Returns
+        -------
+        int32 ndarray
+            the nodes of the path (None if node has not been discovered)
+
+        '''
+        k = self._position(node)
+        if k < 0:
+            return None
+        path = [node]
+        while self.parents[k] >= 0:
+            path.append(int(self.parents[k]))
+            k = self._position(path[-1])
+        path.reverse()
+        return np.array(path, dtype=np.int32)
+
+    def paths(self, nodes):
+        '''
+        This function returns the paths from the sources to many nodes at
+        once : all the paths are walked back together, one level per step
+
+        Parameters
+        ----------
+        nodes : int ndarray
+            the end of each path
+
+        Returns
+        -------
+        lengths : int32 ndarray
+            the length of each path (-1 if the node has not been discovered)
+        indptr : int64 ndarray
+            the k-th path is path_nodes[indptr[k]:indptr[k+1]]
+        path_nodes : int32 ndarray
+            the nodes of all the paths, from the source to the node
+
+        '''
+        positions = self._positions(nodes)
+        found = positions >= 0
+        lengths = np.where(found, self.depths[np.maximum(positions, 0)], -1)
+        lengths = lengths.astype(np.int32)
+
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths + 1, out=indptr[1:])
+        path_nodes = np.empty(indptr[-1], dtype=np.int32)
+
+        # The paths are written from their end, all at once
+        current = positions[found]
+        slots = indptr[1:][found] - 1
+        while len(current) > 0:
+            path_nodes[slots] = self.nodes[current]
+            parents = self.parents[current]
+            more = parents >= 0
+            current = self._positions(parents[more])
+            slots = slots[more] - 1
+        return (lengths, indptr, path_nodes)
+
+
+class BFS:
+    '''
+    This class is a level-synchronous breadth first search engine with a
+    depth bound and an early exit (see the algorithm above)
+
+    Parameters
+    ----------
+    adjacency : Adjacency
+        the graph to be searched
+
+    '''
+
+    def __init__(self, adjacency):
+        N = adjacency.shape[0]
+        self.graph = adjacency
+        self._parent = np.full(N, UNSEEN, dtype=np.int32)
+        self._depth = np.zeros(N, dtype=np.int32)
+        self._target = np.zeros(N, dtype=bool)
+
+    def __repr__(self):
+        return 'BFS(%d nodes)' % self.graph.shape[0]
+
+    def search(self, sources, max_depth=None, targets=None):
+        '''
+        This function searches the graph from one or several sources
+
+        Parameters
+        ----------
+        sources : int or int ndarray
+            the node(s) where the search starts (depth 0)
+        max_depth : int, optional
+            the search stops after this level. The default is None
+            (no limit).
+        targets : int or int ndarray, optional
+            the search stops as soon as all these nodes are discovered.
+            The default is None (the whole ball is searched).
+
+        Returns
+        -------
+        BFSTree
+            the discovered nodes, with their depth and parent
+
+        '''
+        frontier = np.unique(np.atleast_1d(sources)).astype(np.int32)
+        self._parent[frontier] = -1
+        self._depth[frontier] = 0
+        discovered = [frontier]
+
+        if targets is not None:
+            targets = np.unique(np.atleast_1d(targets))
+            self._target[targets] = True
+            left = len(targets) - int(self._target[frontier].sum())
+
+        try:
+            level = 0
+            while len(frontier) > 0:
+                if targets is not None and left == 0:
+                    break
+                if max_depth is not None and level >= max_depth:
+                    break
+                level += 1
+                frontier = _expand(self.graph, frontier, self._parent,
+                                   self._depth, level)
+                discovered.append(frontier)
+                if targets is not None:
+                    left -= int(self._target[frontier].sum())
+
+            nodes = np.concatenate(discovered)
+            return BFSTree(nodes, self._depth[nodes], self._parent[nodes])
+        finally:
+            # Only the discovered nodes (and the targets) are reset
+            self._parent[np.concatenate(discovered)] = UNSEEN
+            if targets is not None:
+                self._target[targets] = False
+
+
+class BidirectionalBFS:
+    '''
+    This class computes shortest paths with a bidirectional breadth first
+    search (see the algorithm above)
+
+    Parameters
+    ----------
+    forward : Adjacency
+        the graph (out-neighbours)
+    backward : Adjacency
+        the transposed graph (in-neighbours)
+
+    '''
+
+    def __init__(self, forward, backward):
+        N = forward.shape[0]
+        self.graphs = (forward, backward)
+        self._parent = [np.full(N, UNSEEN, dtype=np.int32) for _ in range(2)]
+        self._depth = [np.zeros(N, dtype=np.int32) for _ in range(2)]
+
+    def __repr__(self):
+        return 'BidirectionalBFS(%d nodes)' % self.graphs[0].shape[0]
+
+    def _walk(self, side, node):
+        '''
+        This *internal* function returns the nodes from node back to the
+        root of a search
+
+        '''
+        parent = self._parent[side]
+        nodes = [node]
+        while parent[nodes[-1]] >= 0:
+            nodes.append(int(parent[nodes[-1]]))
+        return nodes
+
+    def path(self, source, target, max_depth=None):
+        '''
+        This function computes a shortest path from source to target
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        max_depth : int, optional
+            the paths longer than max_depth are not searched.
+            The default is None (no limit).
+
+        Returns
+        -------
+        int32 ndarray
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        if source == target:
+            return np.array([source], dtype=np.int32)
+
+        roots = (source, target)
+        frontiers = [np.array([root], dtype=np.int32) for root in roots]
+        levels = [0, 0]
+        discovered = [[frontier] for frontier in frontiers]
+        for side in (0, 1):
+            self._parent[side][roots[side]] = -1
+            self._depth[side][roots[side]] = 0
+
+        try:
+            while len(frontiers[0]) > 0 and len(frontiers[1]) > 0:
+                if max_depth is not None and levels[0] + levels[1] >= max_depth:
+                    return None
+
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                other = 1 - side
+                levels[side] += 1
+                frontiers[side] = _expand(self.graphs[side], frontiers[side],
+                                          self._parent[side], self._depth[side],
+                                          levels[side])
+                discovered[side].append(frontiers[side])
+
+                meet = frontiers[side][self._parent[other][frontiers[side]] != UNSEEN]
+                if len(meet) > 0:
+                    node = int(meet[np.argmin(self._depth[other][meet])])
+                    forward = self._walk(0, node)
+                    backward = self._walk(1, node)
+                    forward.reverse()
+                    return np.array(forward + backward[1:], dtype=np.int32)
+            return None
+        finally:
+            # Only the discovered nodes are reset
+            for side in (0, 1):
+                self._parent[side][np.concatenate(discovered[side])] = UNSEEN
+
+
+class Paths:
+    '''
+    This class holds the shortest paths of many (source, target) pairs,
+    packed like a CSR matrix. The words of a path are only decoded when
+    they are asked for.
+
+    Parameters
+    ----------
+    sources, targets : int32 ndarray
+        the nodes of each pair (-1 for a word that is not in the graph)
+    lengths : int32 ndarray
+        the length of each path (-1 if there is no path)
+    indptr : int64 ndarray
+        the k-th path is nodes[indptr[k]:indptr[k+1]]
+    nodes : int32 ndarray
+        the nodes of all the paths
+    decode : callable, optional
+        returns the words of a list of nodes (e.g. Thesaurus.words)
+
+    '''
+
+    def __init__(self, sources, targets, lengths, indptr, nodes, decode=None):
+        self.sources = sources
+        self.targets = targets
+        self.lengths = lengths
+        self.indptr = indptr
+        self.nodes = nodes
+        self.decode = decode
+
+    def __repr__(self):
+        return 'Paths(%d pairs, %d found)' % (len(self), int((self.lengths >= 0).sum()))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def path(self, k):
+        '''
+        This function returns the nodes of the k-th path (None if no path)
+
+        '''
+        if self.lengths[k] < 0:
+            return None
+        return self.nodes[self.indptr[k]:self.indptr[k+1]]
+
+    def words(self, k):
+        '''
+        This function returns the words of the k-th path (None if no path)
+
+        '''
+        path = self.path(k)
+        return None if path is None else self.decode(path)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.words(k)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides a memory-bounded cache of single source search trees,
+so that the shortest paths from (or to) a frequent word are answered by
+walking predecessors only
+
+
+Usage
+-----
+
+As a module, it will export the following classes
+
+Classes
+-------
+
+SourceTree(root, distances, predecessors)
+    the distances and predecessors of a whole single source search
+
+TreeCache(max_bytes=DEFAULT_MAX_BYTES)
+    a least recently used cache of SourceTree under a byte budget
+
+
+Representation
+--------------
+
+A SourceTree holds two arrays of the size of the graph :
+    distances     int8, the depth of each node (-1 if it has not been
+                  reached, so that the depth is at most MAX_DEPTH)
+    predecessors  int32, the parent of each node in the search
+The path from the root to a node is read backwards from the node, in as
+many steps as its depth, without any search.
+
+The cache is keyed by (content hash of the graph, source, direction, depth
+limit) : a cache can be shared by several thesauri, and the trees of an
+older graph are never returned. The trees are kept in least recently used
+order; when a new tree does not fit in the byte budget, the least recently
+used ones are evicted until it fits (a tree larger than the whole budget
+is not kept). The hits, misses and evictions are counted (see stats).
+
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+# The default byte budget of a cache
+DEFAULT_MAX_BYTES = 64 << 20
+
+# The largest depth of a SourceTree (int8 distances)
+MAX_DEPTH = np.iinfo(np.int8).max
+
+# The directions of a search : from the source along the out-neighbours,
+# or towards the source along the in-neighbours
+DIRECTIONS = ('forward', 'backward')
+
+
+class SourceTree:
+    '''
+    This class holds the result of a whole single source search as dense
+    arrays (see the representation above)
+
+    Parameters
+    ----------
+    root : int
+        the source of the search
+    distances : int8 ndarray
+        the depth of each node (-1 if not reached)
+    predecessors : int32 ndarray
+        the parent of each node (-1 for the root and the nodes not reached)
+
+    '''
+
+    def __init__(self, root, distances, predecessors):
+        self.root = root
+        self.distances = distances
+        self.predecessors = predecessors
+
+    @classmethod
+    def from_bfs(cls, root, tree, N):
+        '''
+        This function builds the dense arrays of a traversal.BFSTree
+
+        '''
+        distances = np.full(N, -1, dtype=np.int8)
+        predecessors = np.full(N, -1, dtype=np.int32)
+        distances[tree.nodes] = tree.depths
+        predecessors[tree.nodes] = tree.parents
+        return cls(root, distances, predecessors)
+
+    def __repr__(self):
+        return 'SourceTree(%d, %d nodes reached)' % (self.root,
+                                                      int((self.distances >= 0).sum()))
+
+    @property
+    def nbytes(self):
+        '''the number of bytes of the arrays'''
+        return self.distances.nbytes + self.predecessors.nbytes
+
+    def distance(self, node):
+        '''
+        This function returns the depth of a node (-1 if not reached)
+
+        '''
+        return int(self.distances[node])
+
+    def path(self, node):
+        '''
+        This function returns the path from the root to a node, by walking
+        the predecessors
+
+        Returns
+        -------
+        int32 ndarray
+            the nodes of the path (None if node has not been reached)
+
+        '''
+        if self.distances[node] < 0:
+            return None
+        path = [node]
+        while self.predecessors[path[-1]] >= 0:
+            path.append(int(self.predecessors[path[-1]]))
+        path.reverse()
+        return np.array(path, dtype=np.int32)
+
+
+class TreeCache:
+    '''
+    This class is a least recently used cache of SourceTree objects under a
+    byte budget (see the representation above)
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        the byte budget. The default is DEFAULT_MAX_BYTES.
+
+    '''
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._trees = OrderedDict()
+
+    def __repr__(self):
+        return 'TreeCache(%d trees, %d/%d bytes)' % (len(self), self.nbytes,
+                                                    self.max_bytes)
+
+    def __len__(self):
+        return len(self._trees)
+
+    def __contains__(self, key):
+        '''True if the tree is in cache (not counted as a hit or a miss)'''
+        return key in self._trees
+
+    def get(self, key):
+        '''
+        This function returns the tree of a key, or None (a hit or a miss)
+
+        Parameters
+        ----------
+        key : tuple
+            (content hash, source, direction, depth limit)
+
+        '''
+        tree = self._trees.get(key)
+        if tree is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._trees.move_to_end(key)
+        return tree
+
+    def put(self, key, tree):
+        '''
+        This function adds a tree, after evicting the least recently used
+        trees that do not leave room for it
+
+        Returns
+        -------
+        bool
+            False if the tree is larger than the whole budget (not kept)
+
+        '''
+        if key in self._trees:
+            self.nbytes -= self._trees.pop(key).nbytes
+        if tree.nbytes > self.max_bytes:
+            return False
+        while self.nbytes + tree.nbytes > self.max_bytes:
+            (_, evicted) = self._trees.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+        self._trees[key] = tree
+        self.nbytes += tree.nbytes
+        return True
+
+    def clear(self):
+        '''
+        This function empties the cache (the counters are kept)
+
+        '''
+        self._trees.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        '''
+        This function returns the counters of the cache
+
+        Returns
+        -------
+        dictionary
+            hits, misses, evictions, trees and bytes
+
+        '''
+        return {'hits' : self.hits, 'misses' : self.misses,
+                'evictions' : self.evictions, 'trees' : len(self),
+                'bytes' : self.nbytes}
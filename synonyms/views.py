@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the derived views of the thesaurus graph (in-neighbours,
+undirected graph...) that the traversals need, built once and kept in cache
+
+
+Usage
+-----
+
+As a module, it will export the following class and functions
+
+Classes
+-------
+
+GraphViews(adjacency, basename=None, mmap_mode='r', content_hash=None)
+    a registry of the views of a graph, each one built (or loaded) on first
+    access
+
+Functions
+---------
+
+transpose(adjacency)
+    the in-neighbours of each node
+
+symmetrize(adjacency)
+    the undirected graph (an edge in either direction)
+
+reciprocal(adjacency)
+    the reciprocal edges only (an edge in both directions)
+
+
+Views
+-----
+
+Every view is an Adjacency (see adjacency.py), numbered like the graph :
+    csr        : the graph itself, the out-neighbours of each node
+    csc        : the in-neighbours of each node (the CSC format of the graph,
+                 stored as the CSR arrays of its transpose)
+    symmetric  : the neighbours in either direction
+    reciprocal : the neighbours in both directions (word1 gives word2 as a
+                 synonym and word2 gives word1)
+
+The thesaurus is nearly symmetric but not quite : the traversals that go
+backwards (e.g. a bidirectional search) need csc, the ones that consider
+synonymy as a symmetric relation need symmetric or reciprocal.
+The views can be saved by the build (build.py --views) as raw CSR arrays
+<basename>_<view>_indptr.npy and <basename>_<view>_indices.npy, stamped with
+the graph hash of the bundle (<basename>_<view>_hash.json, see storage.py),
+which are then memory-mapped instead of being computed. A saved view whose
+stamp does not match the graph (e.g. left by an earlier build with another
+--reorder) is ignored and the view is computed.
+
+"""
+
+import numpy as np
+
+import storage
+from adjacency import Adjacency
+
+VIEWS = ('csr', 'csc', 'symmetric', 'reciprocal')
+
+
+def _edges(adjacency):
+    '''
+    This *internal* function returns the (row, column) arrays of all the
+    edges of a graph (compressed graphs are decoded)
+
+    '''
+    N = adjacency.shape[0]
+    rows = np.repeat(np.arange(N, dtype=np.int64), adjacency.degrees())
+    cols = adjacency.neighbors_of(np.arange(N)).astype(np.int64)
+    return (rows, cols)
+
+
+def _from_keys(N, keys):
+    '''
+    This *internal* function builds an Adjacency from sorted and unique
+    edge keys row*N + column
+
+    '''
+    rows = keys // max(N, 1)
+    indptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=N), out=indptr[1:])
+    return Adjacency(indptr, (keys - rows*N).astype(np.int32))
+
+
+def transpose(adjacency):
+    '''
+    This function returns the transposed graph : the neighbours of a node
+    are its in-neighbours in the original graph
+
+    '''
+    N = adjacency.shape[0]
+    (rows, cols) = _edges(adjacency)
+    return _from_keys(N, np.unique(cols*N + rows))
+
+
+def symmetrize(adjacency):
+    '''
+    This function returns the undirected graph : node j is a neighbour of
+    node i if there is an edge from i to j or from j to i
+
+    '''
+    N = adjacency.shape[0]
+    (rows, cols) = _edges(adjacency)
+    return _from_keys(N, np.union1d(rows*N + cols, cols*N + rows))
+
+
+def reciprocal(adjacency):
+    '''
+    This function returns the reciprocal graph : node j is a neighbour of
+    node i if there is an edge from i to j and from j to i
+
+    '''
+    N = adjacency.shape[0]
+    (rows, cols) = _edges(adjacency)
+    return _from_keys(N, np.intersect1d(rows*N + cols, cols*N + rows))
+
+
+_BUILDERS = {'csc' : transpose, 'symmetric' : symmetrize, 'reciprocal' : reciprocal}
+
+
+class GraphViews:
+    '''
+    This class is a registry of the views of a graph (see VIEWS). A view is
+    loaded from the disk if it has been saved, computed otherwise, and then
+    kept in cache : views['csc'] always returns the same object.
+
+    Parameters
+    ----------
+    adjacency : Adjacency
+        the graph (the csr view)
+    basename : str, optional
+        the path of the saved views without the _<view>_indptr.npy suffix.
+        The default is None (nothing is loaded).
+    mmap_mode : str or None, optional
+        how the saved views are opened (see np.load). The default is 'r'.
+    content_hash : str, optional
+        the hash of the graph : the saved views are only loaded if they
+        are stamped with it. The default is None (nothing is checked).
+
+    '''
+
+    def __init__(self, adjacency, basename=None, mmap_mode='r', content_hash=None):
+        self.basename = basename
+        self.mmap_mode = mmap_mode
+        self.content_hash = content_hash
+        self._views = {'csr' : adjacency}
+
+    def __repr__(self):
+        return 'GraphViews(%s)' % ', '.join('%s : %d bytes' % item
+                                            for item in self.memory().items())
+
+    def __contains__(self, view):
+        '''True if the view is already built or loaded'''
+        return view in self._views
+
+    def __getitem__(self, view):
+        if not view in self._views:
+            if not view in VIEWS:
+                raise ValueError('Unknown view : %s (expected one of %s)'
+                                 % (view, ', '.join(VIEWS)))
+            if self._saved(view):
+                self._views[view] = Adjacency.load(self._basename(view),
+                                                     self.mmap_mode)
+            else:
+                self._views[view] = _BUILDERS[view](self._views['csr'])
+        return self._views[view]
+
+    def _basename(self, view):
+        return '%s_%s' % (self.basename, view)
+
+    def _saved(self, view):
+        '''
+        This *internal* function returns True if the view has been saved
+        for this graph
+
+        '''
+        if self.basename is None or not storage.csr_exists(self._basename(view)):
+            return False
+        return self.content_hash is None or \
+            storage.stamp_matches(self._basename(view), self.content_hash)
+
+    def memory(self):
+        '''
+        This function returns the number of bytes of each view in cache
+        (the memory-mapped views are counted as well)
+
+        Returns
+        -------
+        dictionary {view : int}
+
+        '''
+        return {view:self._views[view].nbytes for view in VIEWS if view in self._views}
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+This module provides the edge weights of the thesaurus graph and the
+weighted shortest paths
+
+
+Usage
+-----
+
+As a module, it will export the following classes and functions
+
+Classes
+-------
+
+Dijkstra(adjacency, weights)
+    weighted shortest paths, by a bidirectional search
+
+Functions
+---------
+
+register(name)
+    decorator that adds a weight source to SOURCES
+
+parse_spec(spec)
+    splits a weight specification 'name[:option]'
+
+edge_weights(spec, keys, indptr, indices, sense_info=None)
+    computes the weight of every edge with a weight source
+
+reverse(adjacency, weights)
+    the in-neighbours of each node with the weights of these edges
+
+from_bundle(bundle)
+    returns the edge weights stored in a bundle (None if not weighted)
+
+
+Weight sources
+--------------
+
+A weight source is a function
+    source(keys, indptr, indices, sense_info, option)
+that returns the weight of each edge (aligned with indices), where keys are
+the sorted entries, indptr/indices the CSR arrays built by create_matrix.py,
+sense_info the Senses of the edges (see senses.py) and option the text after
+the colon of the specification (None if there is none). The sources are
+registered by name in SOURCES with the register decorator :
+    file:<path>         weights read from a tab separated file
+                        word1<TAB>word2<TAB>weight (the other edges weigh 1)
+    sense               1 + log2(size of the sense group of the edge) : a
+                        synonym given in a short sense line is closer than
+                        one of a long list
+    reciprocity[:<w>]   1 for the reciprocal edges (word2 gives word1 as a
+                        synonym too), w (default 2) for the others
+The weights are stored as float32 in the weights section of the bundle
+(create_matrix.py/build.py --weights). They must be finite and non
+negative.
+
+Algorithm
+---------
+
+Dijkstra runs two searches that settle the nodes in order of weight : one
+from the source along the out-neighbours, one from the target along the
+in-neighbours (the reversed weighted graph is built on the first query).
+The side with the shorter queue goes next. When a node reached by one
+search has already been reached by the other one, the path through it is a
+candidate, and the searches stop as soon as the two smallest queued weights
+add up to more than the best candidate : no lighter path is left. On this
+small-world graph, the two searches settle far fewer nodes than a single
+one that has to reach the target.
+The queues are heapq lists (the heap is implemented in C) : a node is
+queued again when its weight decreases and the outdated entries are
+skipped (lazy deletion) instead of being moved in the heap. Like the BFS
+engines (see traversal.py), the weights are kept in lists of the size of
+the graph that are reset at the touched nodes only.
+
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+import packed_names
+
+# The weight sources, by name (see register)
+SOURCES = {}
+
+
+def register(name):
+    '''
+    This function returns a decorator that registers a weight source under
+    a given name (see the weight sources above)
+
+    '''
+    def decorator(source):
+        SOURCES[name] = source
+        return source
+    return decorator
+
+
+def parse_spec(spec):
+    '''
+    This function splits a weight specification 'name[:option]'
+
+    Returns
+    -------
+    name : str
+        the name of the source (one of SOURCES)
+    option : str
+        the option of the source (None if there is none)
+
+    '''
+    (name, _, option) = spec.partition(':')
+    if not name in SOURCES:
+        raise ValueError('Unknown weight source : %s (expected one of %s)'
+                         % (name, ', '.join(SOURCES)))
+    return (name, option if option else None)
+
+
+def _edge_positions(indptr, indices, rows, cols):
+    '''
+    This *internal* function returns the position of the edges (rows, cols)
+    in indices (-1 for the pairs that are not edges), by bisection on the
+    sorted keys row*N + column
+
+    '''
+    N = len(indptr) - 1
+    edge_rows = np.repeat(np.arange(N, dtype=np.int64), np.diff(indptr))
+    keys = edge_rows*N + np.asarray(indices, dtype=np.int64)
+    wanted = np.asarray(rows, dtype=np.int64)*N + np.asarray(cols, dtype=np.int64)
+    k = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+    found = (keys[k] == wanted) if len(keys) else np.zeros(len(wanted), dtype=bool)
+    return np.where(found, k, -1)
+
+
+@register('file')
+def from_file(keys, indptr, indices, sense_info, option):
+    '''
+    This function reads the weights of a tab separated file
+    word1<TAB>word2<TAB>weight (the edges that are not listed weigh 1, the
+    lines whose pair is not an edge are ignored)
+
+    '''
+    if option is None:
+        raise ValueError('The file weight source needs a path (file:<path>)')
+    (words1, words2, values) = ([], [], [])
+    with open(option, mode='rt', encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) == 3:
+                words1.append(fields[0])
+                words2.append(fields[1])
+                values.append(float(fields[2]))
+
+    names = packed_names.PackedNames.from_words(keys)
+    rows = names.lookup_many(words1)
+    cols = names.lookup_many(words2)
+    known = (rows >= 0) & (cols >= 0)
+    positions = _edge_positions(indptr, indices, rows[known], cols[known])
+
+    weights = np.ones(len(indices), dtype=np.float32)
+    found = positions >= 0
+    weights[positions[found]] = np.asarray(values, dtype=np.float32)[known][found]
+    return weights
+
+
+@register('sense')
+def from_senses(keys, indptr, indices, sense_info, option):
+    '''
+    This function weighs each edge by the size of its sense group :
+    1 + log2(size), so that the synonyms of a short sense line are closer
+
+    '''
+    if sense_info is None:
+        raise ValueError('The sense weight source needs the sense groups')
+    N = len(indptr) - 1
+    rows = np.repeat(np.arange(N, dtype=np.int64), np.diff(indptr))
+    groups = rows*(int(sense_info.edge_sense.max(initial=0)) + 1) \
+        + sense_info.edge_sense
+    (_, inverse, sizes) = np.unique(groups, return_inverse=True, return_counts=True)
+    return (1 + np.log2(sizes[inverse])).astype(np.float32)
+
+
+@register('reciprocity')
+def from_reciprocity(keys, indptr, indices, sense_info, option):
+    '''
+    This function weighs the reciprocal edges 1 and the other ones option
+    (default 2)
+
+    '''
+    one_way = 2.0 if option is None else float(option)
+    N = len(indptr) - 1
+    rows = np.repeat(np.arange(N, dtype=np.int64), np.diff(indptr))
+    reverse = _edge_positions(indptr, indices, indices, rows)
+    return np.where(reverse >= 0, 1.0, one_way).astype(np.float32)
+
+
+def edge_weights(spec, keys, indptr, indices, sense_info=None):
+    '''
+    This function computes the weight of every edge with a weight source
+
+    Parameters
+    ----------
+    spec : str
+        the weight specification 'name[:option]' (see the weight sources)
+    keys : str tuple
+        the sorted entries
+    indptr, indices : int32 ndarray
+        the CSR arrays of the graph
+    sense_info : Senses, optional
+        the sense groups of the edges. The default is None.
+
+    Returns
+    -------
+    float32 ndarray
+        the weight of each edge
+
+    '''
+    (name, option) = parse_spec(spec)
+    weights = np.asarray(SOURCES[name](keys, indptr, indices, sense_info, option),
+                         dtype=np.float32)
+    if len(weights) != len(indices):
+        raise ValueError('The weight source %s returned %d weights for %d edges'
+                         % (name, len(weights), len(indices)))
+    if not np.all(np.isfinite(weights) & (weights >= 0)):
+        raise ValueError('The weights must be finite and non negative')
+    return weights
+
+
+def reverse(adjacency, weights):
+    '''
+    This function returns the reversed weighted graph : the in-neighbours of
+    each node and the weights of these edges
+
+    Returns
+    -------
+    indptr, indices : int32 ndarray
+        the CSR arrays of the reversed graph
+    weights : float32 ndarray
+        the weight of each edge of the reversed graph
+
+    '''
+    N = adjacency.shape[0]
+    rows = np.repeat(np.arange(N, dtype=np.int32), adjacency.degrees())
+    cols = adjacency.neighbors_of(np.arange(N))
+    order = np.argsort(cols, kind='stable')
+    indptr = np.zeros(N + 1, dtype=np.int32)
+    np.cumsum(np.bincount(cols, minlength=N), out=indptr[1:])
+    return (indptr, rows[order], np.asarray(weights, dtype=np.float32)[order])
+
+
+def from_bundle(bundle):
+    '''
+    This function returns the weight of each edge (float32, aligned with the
+    edges of the graph) stored in the weights section of a bundle, or None
+    if the graph is not weighted
+
+    '''
+    return bundle.get('weights')
+
+
+class Dijkstra:
+    '''
+    This class computes weighted shortest paths (see the algorithm above)
+
+    Parameters
+    ----------
+    adjacency : Adjacency
+        the graph (out-neighbours)
+    weights : float32 ndarray
+        the weight of each edge (aligned with the edges of adjacency)
+
+    '''
+
+    def __init__(self, adjacency, weights):
+        N = adjacency.shape[0]
+        self.graph = adjacency
+        # Plain views of the memory-mapped arrays are much faster to slice
+        self.weights = np.asarray(weights)
+        self._indptr = np.asarray(adjacency.indptr)
+        self._backward = None
+        self._distance = ([math.inf]*N, [math.inf]*N)
+        self._parent = ([-1]*N, [-1]*N)
+
+    def __repr__(self):
+        return 'Dijkstra(%d nodes)' % self.graph.shape[0]
+
+    def _edges(self, side, node):
+        '''
+        This *internal* function returns the neighbours of a node and the
+        weights of these edges, forwards (side 0) or backwards (side 1)
+
+        '''
+        if side == 0:
+            (a, b) = (int(self._indptr[node]), int(self._indptr[node + 1]))
+            return zip(self.graph.neighbors(node).tolist(),
+                       self.weights[a:b].tolist())
+        (indptr, indices, weights) = self._backward
+        (a, b) = (int(indptr[node]), int(indptr[node + 1]))
+        return zip(indices[a:b].tolist(), weights[a:b].tolist())
+
+    def _walk(self, meeting):
+        '''
+        This *internal* function returns the path through the meeting node,
+        read from the parents of both searches
+
+        '''
+        (forward, backward) = self._parent
+        path = [meeting]
+        while forward[path[-1]] >= 0:
+            path.append(forward[path[-1]])
+        path.reverse()
+        while backward[path[-1]] >= 0:
+            path.append(backward[path[-1]])
+        return np.array(path, dtype=np.int32)
+
+    def shortest(self, source, target, max_cost=None):
+        '''
+        This function computes a shortest path from source to target
+
+        Parameters
+        ----------
+        source, target : int
+            the nodes of the graph
+        max_cost : float, optional
+            the paths heavier than max_cost are not searched.
+            The default is None (no limit).
+
+        Returns
+        -------
+        cost : float
+            the total weight of the path (inf if there is no path)
+        path : int32 ndarray
+            the nodes of the path, from source to target (None if there
+            is no path)
+
+        '''
+        if self._backward is None:
+            self._backward = reverse(self.graph, self.weights)
+        (distance, parent) = (self._distance, self._parent)
+        limit = math.inf if max_cost is None else max_cost
+        queues = ([(0.0, source)], [(0.0, target)])
+        touched = ([source], [target])
+        distance[0][source] = distance[1][target] = 0.0
+        parent[0][source] = parent[1][target] = -1
+        (best, meeting) = ((0.0, source) if source == target else (math.inf, -1))
+        try:
+            while queues[0] and queues[1]:
+                # No path lighter than the two smallest keys is left
+                bound = queues[0][0][0] + queues[1][0][0]
+                if bound >= best or bound > limit:
+                    break
+                side = 0 if len(queues[0]) <= len(queues[1]) else 1
+                (cost, node) = heapq.heappop(queues[side])
+                if cost > distance[side][node]:
+                    continue
+                (dist, other) = (distance[side], distance[1 - side])
+                for (neighbor, weight) in self._edges(side, node):
+                    new_cost = cost + weight
+                    if new_cost < dist[neighbor]:
+                        if dist[neighbor] == math.inf:
+                            touched[side].append(neighbor)
+                        dist[neighbor] = new_cost
+                        parent[side][neighbor] = node
+                        heapq.heappush(queues[side], (new_cost, neighbor))
+                        if new_cost + other[neighbor] < best:
+                            (best, meeting) = (new_cost + other[neighbor], neighbor)
+
+            if meeting < 0 or best > limit:
+                return (math.inf, None)
+            return (best, self._walk(meeting))
+        finally:
+            # Only the touched nodes are reset
+            for side in (0, 1):
+                for node in touched[side]:
+                    distance[side][node] = math.inf
+
+    def path(self, source, target, max_cost=None):
+        '''
+        This function returns the nodes of a shortest path from source to
+        target (None if there is no path, see shortest)
+
+        '''
+        return self.shortest(source, target, max_cost)[1]
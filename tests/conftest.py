@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The configuration and the fixtures of the tests : small random thesauri
+and small random graphs, with their exact distances computed by
+scipy.sparse.csgraph, against which every engine is checked
+
+The modules of ./synonyms import each other by their flat names, so this
+directory is put on the path first.
+
+"""
+
+import os
+import sys
+import zipfile
+
+import numpy as np
+import pytest
+from scipy import sparse
+from scipy.sparse import csgraph
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'synonyms'))
+
+import create_matrix  # noqa: E402
+import synonyms  # noqa: E402
+import views  # noqa: E402
+from adjacency import Adjacency  # noqa: E402
+
+
+def random_thesaurus(seed, N=300):
+    '''
+    This function returns the lines of a small random thesaurus in the format
+    of thes_fr.dat (see create_matrix.py), header line included. Some entries
+    appear twice and some synonyms are not entries of the thesaurus.
+
+    '''
+    rng = np.random.default_rng(seed)
+    words = sorted({''.join(rng.choice(list('abcdeéfghilmnoprstuœ'), rng.integers(2, 8)))
+                    for _ in range(N)})
+    entries = rng.permutation(words + rng.choice(words, N // 20).tolist()).tolist()
+    lines = ['UTF-8']
+    for word in entries:
+        senses = int(rng.integers(1, 3))
+        lines.append('%s|%d' % (word, senses))
+        for _ in range(senses):
+            names = rng.choice(words, rng.integers(1, 4)).tolist()
+            lines.append('|'.join(['(nom)'] + names + ['inconnu']))
+    return lines
+
+
+@pytest.fixture
+def source(tmp_path):
+    '''a small random thesaurus file'''
+    filename = tmp_path / 'thes_fr.dat'
+    filename.write_text('\n'.join(random_thesaurus(0)) + '\n', encoding='utf-8')
+    return str(filename)
+
+
+@pytest.fixture
+def archive(source, tmp_path):
+    '''the same thesaurus in an archive, with its member in a sub-directory'''
+    filename = tmp_path / 'thesaurus.zip'
+    with zipfile.ZipFile(filename, mode='w', compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr('thesaurus/README_thes_fr.txt', 'README')
+        z.write(source, 'thesaurus/thes_fr.dat')
+    return str(filename)
+
+
+@pytest.fixture(params=[None, 'rcm'], ids=lambda method: method or 'alphabetical')
+def thesaurus(request, source, tmp_path):
+    '''the Thesaurus of the small random thesaurus file, whose graph is
+    numbered alphabetically or reordered'''
+    output_dir = tmp_path / 'step1'
+    output_dir.mkdir()
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.read_thesaurus(source))
+    create_matrix.write_bundle(str(output_dir / 'thesaurus.bundle'), keys,
+                               indptr, indices, create_matrix.source_hash(source),
+                               {}, request.param, sense_info=sense_info)
+    return synonyms.Thesaurus(str(output_dir), source=source)
+
+
+class RandomGraph:
+    '''
+    This class holds a random directed graph (sparse enough to have
+    unreachable pairs), its integer edge weights and the exact distances
+    of scipy, in steps and in weight
+
+    '''
+
+    def __init__(self, seed, N=120, degree=2.5):
+        rng = np.random.default_rng(seed)
+        E = int(N*degree)
+        keys = np.unique(rng.integers(0, N, E)*N + rng.integers(0, N, E))
+        (rows, cols) = (keys // N, keys % N)
+        keep = rows != cols
+        self.matrix = sparse.csr_matrix((np.ones(keep.sum(), dtype=bool),
+                                         (rows[keep], cols[keep])), shape=(N, N))
+        self.matrix.sort_indices()
+        self.N = N
+        self.forward = Adjacency.from_scipy(self.matrix)
+        self.backward = views.transpose(self.forward)
+        # Small integer weights : the sums are exact in float32
+        self.weights = rng.integers(1, 5, self.forward.nnz).astype(np.float32)
+        self.weighted = sparse.csr_matrix((self.weights.astype(np.float64),
+                                           self.matrix.indices, self.matrix.indptr),
+                                          shape=(N, N))
+        self.steps = csgraph.shortest_path(self.matrix, unweighted=True)
+        self.costs = csgraph.dijkstra(self.weighted)
+        self.rng = rng
+
+    def __repr__(self):
+        return 'RandomGraph(%d nodes, %d edges)' % (self.N, self.forward.nnz)
+
+    def distance(self, source, target):
+        '''the number of steps from source to target (-1 if there is no path)'''
+        d = self.steps[source, target]
+        return int(d) if np.isfinite(d) else -1
+
+    def pairs(self, count=200):
+        '''random (source, target) pairs, reachable or not'''
+        return self.rng.integers(0, self.N, (count, 2)).tolist()
+
+    def check_path(self, path, source, target, cost=None):
+        '''
+        This function asserts that path is a shortest path (in steps, or in
+        weight if cost is given) from source to target (None if there is
+        no path)
+
+        '''
+        d = self.steps[source, target]
+        if not np.isfinite(d):
+            assert path is None
+            return
+        assert path is not None
+        assert path[0] == source and path[-1] == target
+        assert all(self.matrix[u, v] for (u, v) in zip(path[:-1], path[1:]))
+        if cost is None:
+            assert len(path) - 1 == d
+        else:
+            assert cost == pytest.approx(self.costs[source, target])
+            assert sum(self.weighted[u, v] for (u, v) in zip(path[:-1], path[1:])) \
+                == pytest.approx(cost)
+
+
+@pytest.fixture(params=[0, 1, 2], ids=lambda seed: 'seed%d' % seed)
+def graph(request):
+    return RandomGraph(request.param)
+
+
+@pytest.fixture(params=[0, 1, 2, 3, 4], ids=lambda seed: 'seed%d' % seed)
+def small_graph(request):
+    # Small enough for all the simple paths to be enumerated
+    return RandomGraph(request.param, N=12, degree=2.5)
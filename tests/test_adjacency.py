@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The pattern-only adjacency : same graph as the scipy matrix, loaded from
+the raw CSR files or from a bundle without any copy
+
+"""
+
+import numpy as np
+from scipy import sparse
+
+import packed_names
+import storage
+from adjacency import Adjacency, as_adjacency, as_scipy
+
+
+def random_matrix(seed=0, N=150):
+    rng = np.random.default_rng(seed)
+    return sparse.random(N, N, density=0.03, random_state=rng, format='coo') != 0
+
+
+def test_from_scipy():
+    M = random_matrix()
+    graph = Adjacency.from_scipy(M)
+    assert graph.shape == M.shape and graph.nnz == M.nnz
+    assert graph.indptr.dtype == graph.indices.dtype == np.int32
+    assert (graph.to_scipy() != M.tocsr()).nnz == 0
+    assert graph.degrees().tolist() == np.asarray(M.sum(1)).ravel().tolist()
+    assert as_adjacency(graph) is graph and as_scipy(M) is M
+
+    nodes = np.array([3, 0, 3, 149])
+    expected = np.concatenate([graph.neighbors(u) for u in nodes])
+    assert graph.neighbors_of(nodes).tolist() == expected.tolist()
+    assert graph.neighbors_of(np.zeros(0, dtype=int)).tolist() == []
+
+
+def test_load(tmp_path):
+    M = random_matrix(1)
+    graph = Adjacency.from_scipy(M)
+    basename = str(tmp_path / 'graph')
+    storage.save_csr(basename, M)
+    loaded = Adjacency.load(basename)
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.indices.tolist() == graph.indices.tolist()
+
+    filename = str(tmp_path / 'graph.bundle')
+    names = packed_names.PackedNames.from_words(['w%03d' % k for k in range(150)])
+    storage.save_bundle(filename, {'indptr' : graph.indptr, 'indices' : graph.indices,
+                                   'names_blob' : names.blob,
+                                   'names_offsets' : names.offsets})
+    bundled = Adjacency.from_bundle(storage.Bundle(filename))
+    assert bundled.indptr.tolist() == graph.indptr.tolist()
+    assert bundled.indices.tolist() == graph.indices.tolist()
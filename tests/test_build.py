@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The build driver : the stages are only rebuilt when they are stale and the
+built files match the thesaurus
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+import create_matrix
+import reorder
+import storage
+import synonyms
+
+BUILD = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                     'synonyms', 'build.py')
+
+
+def build(source, output_dir, *options):
+    '''
+    This function runs build.py and returns the stages that have been built
+
+    '''
+    result = subprocess.run([sys.executable, BUILD, '--source', source,
+                             '--output-dir', output_dir] + list(options),
+                            capture_output=True, text=True, check=True)
+    return [line.split()[1] for line in result.stdout.splitlines()
+            if line.endswith(': building...')]
+
+
+def check_thesaurus(output_dir, source):
+    '''
+    This function asserts that a freshly opened thesaurus holds the entries
+    and the matrix of the source file, whatever the order of its nodes
+
+    '''
+    (keys, indptr, indices, _) = create_matrix.build_csr(
+        *create_matrix.read_thesaurus(source))
+    thesaurus = synonyms.Thesaurus(output_dir, source=source)
+    assert thesaurus.bundle is not None
+    assert thesaurus.names.tolist() == list(keys)
+    graph = thesaurus.graph
+    (graph_indptr, graph_indices) = reorder.alphabetical(graph.indptr, graph.indices,
+                                                         thesaurus.iperm)
+    assert graph_indptr.tolist() == indptr.tolist()
+    assert graph_indices.tolist() == indices.tolist()
+    # The other files are in the alphabetical order
+    legacy = sparse.load_npz(os.path.join(output_dir, 'thesaurus_matrix.npz')).tocsr()
+    assert (legacy != storage.csr_from_arrays(indptr, indices)).nnz == 0
+    nodes = thesaurus.nodes(keys)
+    assert thesaurus.words(nodes) == list(keys)
+    assert thesaurus.raw_entry(keys[0]) is not None
+    return thesaurus
+
+
+def test_missing_output_dir(source, tmp_path):
+    output_dir = str(tmp_path / 'out' / 'step1')
+    assert build(source, output_dir) == ['bundle', 'csr', 'legacy', 'offsets']
+    check_thesaurus(output_dir, source)
+    assert os.path.exists(os.path.join(output_dir, 'build_manifest.json'))
+
+
+def test_incremental(source, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    build(source, output_dir)
+    assert build(source, output_dir) == []
+    assert build(source, output_dir, '--packed-names') == ['packed_names']
+    assert build(source, output_dir, '--jobs', '2') == []
+    # The weights are not part of the graph : the derived stages are kept
+    assert build(source, output_dir, '--weights', 'reciprocity') == ['bundle']
+    assert synonyms.Thesaurus(output_dir).weights is not None
+    assert build(source, output_dir, '--weights', 'reciprocity', '--contract') \
+        == ['bundle']
+    assert synonyms.Thesaurus(output_dir).hierarchy is not None
+    assert build(source, output_dir) == ['bundle']
+
+    # A missing output only rebuilds its stage
+    os.remove(os.path.join(output_dir, 'thesaurus_csr_indices.npy'))
+    assert build(source, output_dir) == ['csr']
+
+    # A new source rebuilds the bundle and the stages derived from it
+    with open(source, mode='at', encoding='utf-8') as f:
+        f.write('zzz|1\n(nom)|zzz\n')
+    assert build(source, output_dir, '--packed-names') \
+        == ['bundle', 'csr', 'legacy', 'packed_names', 'offsets']
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.lookup('zzz') >= 0
+
+    assert build(source, output_dir, '--force') == ['bundle', 'csr', 'legacy', 'offsets']
+
+
+def test_archive(source, archive, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    assert build(archive, output_dir) == ['bundle', 'csr', 'legacy', 'offsets']
+    check_thesaurus(output_dir, source)
+    assert build(archive, output_dir) == []
+
+
+def test_reorder(source, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    build(source, output_dir)
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.perm is None
+    for method in reorder.METHODS:
+        assert build(source, output_dir, '--reorder', method)[0] == 'bundle'
+        thesaurus = check_thesaurus(output_dir, source)
+        assert thesaurus.perm is not None
+
+
+def test_compress(source, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    build(source, output_dir)
+    word = synonyms.Thesaurus(output_dir).names[0]
+    expected = synonyms.Thesaurus(output_dir).compute_syno_set(word)
+    build(source, output_dir, '--compress', '--reorder', 'rcm')
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.adjacency.indices is None
+    (iterations, sizes) = thesaurus.compute_syno_set(word)
+    assert list(iterations) == list(expected[0]) and sizes == expected[1]
+
+
+def check_views(thesaurus, saved):
+    csc = thesaurus.views['csc']
+    assert isinstance(csc.indptr, np.memmap) == saved
+    assert (csc.to_scipy() != thesaurus.graph.T).nnz == 0
+
+
+def test_stale_views(source, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    assert 'views' in build(source, output_dir, '--views', 'csc', 'symmetric')
+    check_views(check_thesaurus(output_dir, source), True)
+    saved = str(tmp_path / 'saved')
+    os.makedirs(saved)
+    for filename in os.listdir(output_dir):
+        if filename.startswith('thesaurus_view_'):
+            shutil.copy(os.path.join(output_dir, filename), saved)
+
+    # Another numbering of the nodes, without the views : they are deleted
+    build(source, output_dir, '--reorder', 'rcm')
+    assert not [f for f in os.listdir(output_dir) if f.startswith('thesaurus_view_')]
+    check_views(check_thesaurus(output_dir, source), False)
+
+    # The views of the first build are not loaded
+    for filename in os.listdir(saved):
+        shutil.copy(os.path.join(saved, filename), output_dir)
+    check_views(check_thesaurus(output_dir, source), False)
+
+    assert 'views' in build(source, output_dir, '--reorder', 'rcm', '--views', 'csc')
+    check_views(check_thesaurus(output_dir, source), True)
+    assert build(source, output_dir, '--reorder', 'rcm', '--views', 'csc') == []
+
+
+def test_stale_indexes(source, tmp_path):
+    output_dir = str(tmp_path / 'step1')
+    build(source, output_dir)
+    assert build(source, output_dir, '--labels') == ['labels']
+    assert build(source, output_dir, '--labels', '--distances') == ['distances']
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.labels is not None and thesaurus.distance_matrix is not None
+
+    # The indexes of the alphabetical graph are not used for another one
+    assert 'labels' not in build(source, output_dir, '--reorder', 'rcm')
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.labels is None and thesaurus.distance_matrix is None
+    assert build(source, output_dir, '--reorder', 'rcm', '--labels', '--distances') \
+        == ['labels', 'distances']
+    thesaurus = check_thesaurus(output_dir, source)
+    assert thesaurus.labels is not None and thesaurus.distance_matrix is not None
+    words = thesaurus.names.tolist()
+    steps = csgraph.shortest_path(thesaurus.graph, unweighted=True,
+                                  indices=thesaurus.node(words[0]))
+    steps = np.where(np.isfinite(steps), steps, -1)[thesaurus.nodes(words)]
+    assert thesaurus.distances(words[0], words).tolist() == steps.tolist()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The gap/varint compressed adjacency : same neighbours as the plain one
+
+"""
+
+import numpy as np
+
+import compressed
+import packed_names
+import storage
+from compressed import CompressedAdjacency, compress
+
+
+def test_varints():
+    values = np.array([0, 1, 127, 128, 300, 16383, 16384, 1 << 21, (1 << 28) + 5,
+                       (1 << 35) - 1], dtype=np.int64)
+    (data, nbytes) = compressed.encode_varints(values)
+    assert nbytes.tolist() == [1, 1, 1, 2, 2, 2, 3, 4, 5, 5]
+    assert len(data) == nbytes.sum()
+    assert compressed.decode_varints(data).tolist() == values.tolist()
+    assert compressed.decode_varints(np.zeros(0, dtype=np.uint8)).tolist() == []
+
+
+def test_compressed(graph):
+    packed = compress(graph.forward)
+    assert packed.nnz == graph.forward.nnz
+    assert packed.data.nbytes < graph.forward.indices.nbytes
+    nodes = np.arange(graph.N)
+    assert np.array_equal(packed.neighbors_of(nodes), graph.forward.neighbors_of(nodes))
+    for node in range(graph.N):
+        assert packed.neighbors(node).tolist() == graph.forward.neighbors(node).tolist()
+    # Some nodes only, in any order, some of them without neighbours
+    nodes = graph.rng.integers(0, graph.N, 50)
+    assert np.array_equal(packed.neighbors_of(nodes), graph.forward.neighbors_of(nodes))
+    assert (packed.to_scipy() != graph.matrix).nnz == 0
+
+
+def test_bundle(graph, tmp_path):
+    names = packed_names.PackedNames.from_words(['w%03d' % k for k in range(graph.N)])
+    packed = compress(graph.forward)
+    filename = str(tmp_path / 'graph.bundle')
+    storage.save_bundle(filename, {'indptr' : packed.indptr,
+                                   'cadj_offsets' : packed.offsets,
+                                   'cadj_data' : packed.data,
+                                   'names_blob' : names.blob,
+                                   'names_offsets' : names.offsets})
+    bundle = storage.Bundle(filename)
+    assert bundle.edges == graph.forward.nnz and 'indices' not in bundle
+    loaded = compressed.from_bundle(bundle)
+    assert isinstance(loaded, CompressedAdjacency)
+    assert loaded.decompress().indices.tolist() == graph.forward.indices.tolist()
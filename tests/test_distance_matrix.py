@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The all-pairs distance matrix checked against scipy.sparse.csgraph,
+computed serially or in parallel, and resumed after an interruption
+
+"""
+
+import json
+
+import numpy as np
+
+import distance_matrix
+
+
+def expected_rows(graph):
+    return np.where(np.isfinite(graph.steps), graph.steps,
+                    distance_matrix.UNREACHABLE).astype(np.uint8)
+
+
+def test_bfs_rows(graph):
+    sources = np.arange(0, graph.N, 3)
+    rows = distance_matrix.bfs_rows(graph.matrix, sources)
+    assert rows.tolist() == expected_rows(graph)[sources].tolist()
+
+
+def test_compute(graph, tmp_path):
+    for jobs in (1, 2):
+        basename = str(tmp_path / ('distances%d' % jobs))
+        assert not distance_matrix.is_complete(basename)
+        distance_matrix.compute(basename, graph.forward, 'abc', jobs, block_size=32)
+        assert distance_matrix.is_complete(basename, 'abc')
+        assert not distance_matrix.is_complete(basename, 'abd')
+        matrix = distance_matrix.DistanceMatrix(basename)
+        assert matrix.content_hash == 'abc'
+        assert matrix.matrix.tolist() == expected_rows(graph).tolist()
+        for (source, target) in graph.pairs():
+            assert matrix.distance(source, target) == graph.distance(source, target)
+
+
+def test_resume(graph, tmp_path):
+    basename = str(tmp_path / 'distances')
+    distance_matrix.compute(basename, graph.forward, 'abc', block_size=32)
+
+    # An interrupted computation : the last block is not done
+    record = distance_matrix.progress(basename)
+    record['done'].remove(96)
+    with open(basename + '_progress.json', mode='wt', encoding='utf-8') as f:
+        json.dump(record, f)
+    matrix = np.load(basename + '.npy', mmap_mode='r+')
+    matrix[:] = 0
+    matrix.flush()
+    del matrix
+    assert not distance_matrix.is_complete(basename, 'abc')
+
+    # Only the missing block is computed
+    distance_matrix.compute(basename, graph.forward, 'abc', block_size=32)
+    matrix = distance_matrix.DistanceMatrix(basename).matrix
+    assert matrix[:96].max() == 0
+    assert matrix[96:].tolist() == expected_rows(graph)[96:].tolist()
+
+    # Another graph starts again from scratch
+    distance_matrix.compute(basename, graph.forward, 'abd', block_size=32)
+    assert distance_matrix.is_complete(basename, 'abd')
+    matrix = distance_matrix.DistanceMatrix(basename).matrix
+    assert matrix.tolist() == expected_rows(graph).tolist()
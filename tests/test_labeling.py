@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The distance labels (pruned landmark labeling) checked against
+scipy.sparse.csgraph, in memory and saved
+
+"""
+
+import numpy as np
+
+import labeling
+
+
+def check_labels(graph, labels):
+    for (source, target) in graph.pairs():
+        assert labels.distance(source, target) == graph.distance(source, target)
+        graph.check_path(labels.path(source, target), source, target)
+    targets = np.arange(graph.N)
+    for source in range(0, graph.N, 13):
+        expected = [graph.distance(source, target) for target in targets]
+        assert labels.distances(source, targets).tolist() == expected
+
+
+def test_labels(graph):
+    labels = labeling.build_labels(graph.forward, graph.backward)
+    check_labels(graph, labels)
+    # Any order of the hubs gives exact labels
+    order = graph.rng.permutation(graph.N).astype(np.int32)
+    check_labels(graph, labeling.build_labels(graph.forward, graph.backward, order))
+
+
+def test_saved_labels(graph, tmp_path):
+    basename = str(tmp_path / 'labels')
+    assert not labeling.labels_exist(basename)
+    labeling.save_labels(basename, labeling.build_labels(graph.forward, graph.backward),
+                         'abc')
+    assert labeling.labels_exist(basename)
+    assert labeling.labels_exist(basename, 'abc')
+    assert not labeling.labels_exist(basename, 'abd')
+    check_labels(graph, labeling.load_labels(basename))
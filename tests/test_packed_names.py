@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The packed UTF-8 name table
+
+"""
+
+import numpy as np
+import pytest
+
+import packed_names
+
+WORDS = sorted(['abaca', 'abbé', 'aboiement', 'été', 'étêté', 'œuvre', 'pomme de terre',
+                'zèbre', 'zéro'])
+
+
+def test_round_trip():
+    names = packed_names.PackedNames.from_words(WORDS)
+    assert len(names) == len(WORDS)
+    assert names.tolist() == WORDS
+    assert list(names) == WORDS
+    assert [names[k] for k in range(len(WORDS))] == WORDS
+    assert names[-1] == WORDS[-1]
+    assert names[2:5] == WORDS[2:5]
+    assert names[np.array([4, 0])] == [WORDS[4], WORDS[0]]
+    # The blob holds the UTF-8 bytes, not the characters
+    assert names.offsets[-1] == sum(len(w.encode('utf-8')) for w in WORDS)
+    with pytest.raises(IndexError):
+        names[len(WORDS)]
+
+
+def test_empty():
+    names = packed_names.PackedNames.from_words([])
+    assert len(names) == 0
+    assert names.tolist() == []
+
+
+def test_save_and_load(tmp_path):
+    basename = str(tmp_path / 'names')
+    assert not packed_names.names_exist(basename)
+    packed_names.save_names(basename, WORDS)
+    assert packed_names.names_exist(basename)
+    for mmap_mode in ('r', None):
+        assert packed_names.load_names(basename, mmap_mode).tolist() == WORDS
+
+
+# Absent words : before the first one, after the last one, prefixes and
+# extensions of entries, other accents
+MISSING = ['', 'a', 'aaa', 'abb', 'abbés', 'ete', 'étê', 'zz', 'zérot', 'ÿ']
+
+
+def test_lookup():
+    names = packed_names.PackedNames.from_words(WORDS)
+    for (k, word) in enumerate(WORDS):
+        assert names.lookup(word) == k
+    assert names.lookup(WORDS[0]) == 0
+    assert names.lookup(WORDS[-1]) == len(WORDS) - 1
+    for word in MISSING:
+        assert names.lookup(word) == -1
+
+
+def test_lookup_many():
+    names = packed_names.PackedNames.from_words(WORDS)
+    queries = WORDS[::-1] + MISSING + [WORDS[0], WORDS[-1]]
+    expected = [names.lookup(word) for word in queries]
+    ranks = names.lookup_many(queries)
+    assert ranks.dtype == np.int32
+    assert ranks.tolist() == expected
+    assert ranks[:len(WORDS)].tolist() == list(range(len(WORDS)))[::-1]
+    assert names.lookup_many([]).tolist() == []
+    assert packed_names.PackedNames.from_words([]).lookup_many(['abbé']).tolist() == [-1]
+    assert packed_names.PackedNames.from_words([]).lookup('abbé') == -1
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The parsing of the thesaurus : the streaming parser of create_matrix.py
+gives the same entries and matrix as the former dictionnary-based script,
+and the parallel parser (--jobs) and the archive reader the same as the
+serial parse of the thesaurus file
+
+"""
+
+import io
+import zipfile
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import create_matrix
+from conftest import random_thesaurus
+
+
+def reference(lines):
+    '''
+    This function parses the thesaurus (without its first line) as the
+    former script did : dictionnary of the entries, self consistency check
+    and COO matrix. It returns the sorted keys and the CSR arrays.
+
+    '''
+    d = {}
+    name = ''
+    syno_list = []
+    for line in lines:
+        if not line.startswith('('):
+            if name != '':
+                d[name] = syno_list
+                syno_list = []
+            (name, _) = line.split('|')
+        else:
+            syno_list = syno_list + line.split('|')[1:]
+    d[name] = syno_list
+
+    keys = tuple(sorted(d))
+    t = {n:k for (k, n) in enumerate(keys)}
+    I = []; J = []
+    for (name, syno_list) in d.items():
+        J_name = [t[n] for n in syno_list if n in d]
+        I.extend([t[name]]*len(J_name))
+        J.extend(J_name)
+    M = sparse.coo_matrix(([True]*len(I), (I, J)), shape=(len(keys), len(keys)),
+                          dtype=bool).tocsr()
+    M.sum_duplicates()
+    M.sort_indices()
+    return (keys, M.indptr, M.indices)
+
+
+def parse(lines):
+    return create_matrix.build_csr(*create_matrix.parse_thesaurus(lines))
+
+
+def check_same(result, expected):
+    (keys, indptr, indices) = result[:3]
+    assert keys == expected[0]
+    assert indptr.tolist() == expected[1].tolist()
+    assert indices.tolist() == expected[2].tolist()
+    assert indptr.dtype == indices.dtype == np.int32
+
+
+def test_streaming_parse():
+    for seed in range(3):
+        lines = random_thesaurus(seed)[1:]
+        check_same(parse(line + '\n' for line in lines), reference(lines))
+
+
+def test_duplicate_entries():
+    # Only the last occurrence of an entry is kept, the synonyms which are
+    # not entries are dropped
+    lines = ['b|1', '(nom)|a|c', 'a|1', '(nom)|b|inconnu', 'b|1', '(nom)|a']
+    (keys, indptr, indices, _) = parse(lines)
+    assert keys == ('a', 'b')
+    assert indptr.tolist() == [0, 1, 2]
+    assert indices.tolist() == [1, 0]
+    check_same((keys, indptr, indices), reference(lines))
+
+
+def serial(filename):
+    with open(filename, mode='rt', encoding='utf-8') as f:
+        next(f)
+        return create_matrix.build_csr(*create_matrix.parse_thesaurus(f))
+
+
+@pytest.mark.parametrize('nchunks', [1, 2, 7, 50, 10000])
+def test_chunks(source, nchunks):
+    chunks = create_matrix.find_chunks(source, nchunks)
+    assert len(chunks) <= nchunks
+    with open(source, mode='rb') as f:
+        data = f.read()
+    # The chunks cover the file (first line excepted) and start on entries
+    assert chunks[0][0] == data.index(b'\n') + 1 and chunks[-1][1] == len(data)
+    assert all(end == start for ((_, end), (start, _)) in zip(chunks[:-1], chunks[1:]))
+    assert all(data[start-1:start] == b'\n' and data[start:start+1] != b'('
+               for (start, _) in chunks)
+    results = [create_matrix.parse_chunk(source, start, end) for (start, end) in chunks]
+    check_same(create_matrix.build_csr(*create_matrix.merge_chunks(results)),
+               serial(source))
+
+
+@pytest.mark.parametrize('jobs', [2, 3])
+def test_parallel(source, jobs):
+    result = create_matrix.build_csr(*create_matrix.parse_parallel(source, jobs))
+    check_same(result, serial(source))
+
+
+def test_archive(source, archive):
+    expected = serial(source)
+    check_same(create_matrix.build_csr(*create_matrix.read_thesaurus(archive)),
+               expected)
+    check_same(create_matrix.build_csr(*create_matrix.read_thesaurus(archive, 2)),
+               expected)
+    assert create_matrix.source_hash(archive) == create_matrix.source_hash(source)
+    assert create_matrix.source_hash(archive) != create_matrix.file_hash(archive)
+
+
+def test_archive_without_thesaurus(tmp_path):
+    filename = str(tmp_path / 'empty.zip')
+    with zipfile.ZipFile(filename, mode='w') as z:
+        z.writestr('README', 'README')
+    with pytest.raises(ValueError):
+        create_matrix.read_thesaurus(filename)
+
+
+@pytest.mark.parametrize('block_size', [1, 5, 64, 1000, 1 << 24])
+def test_blocks(source, block_size):
+    with open(source, mode='rb') as f:
+        data = f.read()
+    blocks = list(create_matrix.iter_blocks(io.BytesIO(data), block_size))
+    # The blocks are made of whole entries
+    assert b''.join(blocks) == data[data.index(b'\n')+1:]
+    assert all(not block.startswith(b'(') and block.endswith(b'\n') for block in blocks)
+    results = [create_matrix.parse_block(block) for block in blocks]
+    check_same(create_matrix.build_csr(*create_matrix.merge_chunks(results)),
+               serial(source))
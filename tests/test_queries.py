@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The word level queries of a Thesaurus checked against scipy.sparse.csgraph
+on the graph of a small random thesaurus, numbered alphabetically or not
+
+"""
+
+import os
+from itertools import islice
+
+import numpy as np
+import pytest
+from scipy.sparse import csgraph
+
+import create_matrix
+import distance_matrix
+import labeling
+import landmarks
+import synonyms
+
+
+def steps_of(thesaurus, word, words):
+    '''the number of steps from word to each of words (-1 if unreachable)'''
+    steps = csgraph.shortest_path(thesaurus.graph, unweighted=True,
+                                  indices=thesaurus.node(word))
+    steps = steps[thesaurus.nodes(words)]
+    return np.where(np.isfinite(steps), steps, -1).astype(int)
+
+
+def check_word_path(thesaurus, path, word1, word2, length):
+    assert path[0] == word1 and path[-1] == word2
+    assert len(path) - 1 == length
+    for (u, v) in zip(thesaurus.nodes(path[:-1]), thesaurus.nodes(path[1:])):
+        assert thesaurus.graph[u, v]
+
+
+def test_within(thesaurus):
+    words = thesaurus.names.tolist()
+    for word in words[::40]:
+        steps = steps_of(thesaurus, word, words)
+        paths = thesaurus.within(word, words, max_depth=3)
+        for (target, d) in zip(words, steps):
+            if 0 <= d <= 3:
+                check_word_path(thesaurus, paths[target], word, target, d)
+            else:
+                assert not target in paths
+
+
+def test_within_unknown_words(thesaurus):
+    word = thesaurus.names[0]
+    assert thesaurus.within('inconnu', word) is None
+    paths = thesaurus.within(word, ['inconnu', word])
+    assert paths == {word : [word]}
+
+
+def all_steps(thesaurus, words):
+    '''the number of steps between each pair of words (-1 if unreachable)'''
+    nodes = thesaurus.nodes(words)
+    steps = csgraph.shortest_path(thesaurus.graph, unweighted=True)[np.ix_(nodes, nodes)]
+    return np.where(np.isfinite(steps), steps, -1).astype(int)
+
+
+def test_shortest_paths(thesaurus):
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    rng = np.random.default_rng(0)
+    # The pairs of words[0] are grouped and searched with a single tree,
+    # the other sources have one target each (bidirectional search)
+    pairs = [(0, t) for t in range(len(words))]
+    pairs += rng.integers(1, len(words), (100, 2)).tolist()
+    pairs = [pairs[k] for k in rng.permutation(len(pairs))]
+    paths = thesaurus.shortest_paths((words[s], words[t]) for (s, t) in pairs)
+    assert len(paths) == len(pairs)
+    for (k, (s, t)) in enumerate(pairs):
+        assert paths.lengths[k] == steps[s, t]
+        if steps[s, t] < 0:
+            assert paths.words(k) is None
+        else:
+            check_word_path(thesaurus, paths.words(k), words[s], words[t], steps[s, t])
+    assert list(paths) == [paths.words(k) for k in range(len(pairs))]
+
+
+def test_shortest_paths_limit(thesaurus):
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    pairs = [(0, t) for t in range(len(words))] + [(t, 0) for t in range(1, len(words))]
+    paths = thesaurus.shortest_paths([(words[s], words[t]) for (s, t) in pairs], limit=2)
+    for (k, (s, t)) in enumerate(pairs):
+        assert paths.lengths[k] == (steps[s, t] if steps[s, t] <= 2 else -1)
+
+
+def test_shortest_paths_unknown_words(thesaurus):
+    (word1, word2) = thesaurus.names[:2]
+    paths = thesaurus.shortest_paths([('inconnu', word1), (word1, 'inconnu'),
+                                      (word1, word1), (word2, '')])
+    assert paths.lengths.tolist() == [-1, -1, 0, -1]
+    assert paths.sources[0] == -1 and paths.targets[1] == -1
+    assert list(paths) == [None, None, [word1], None]
+
+
+def test_shortest_paths_empty(thesaurus):
+    paths = thesaurus.shortest_paths([])
+    assert len(paths) == 0
+    assert paths.lengths.tolist() == []
+    assert list(paths) == []
+
+
+def test_shortest_path_engines(thesaurus, tmp_path):
+    # The landmarks are computed in memory, or read from the bundle
+    (keys, indptr, indices, _) = create_matrix.build_csr(
+        *create_matrix.read_thesaurus(thesaurus.source))
+    create_matrix.write_bundle(str(tmp_path / 'thesaurus.bundle'), keys, indptr,
+                               indices, '', {}, nlandmarks=4)
+    stored = synonyms.Thesaurus(str(tmp_path))
+    assert landmarks.from_bundle(thesaurus.bundle) is None
+    assert len(landmarks.from_bundle(stored.bundle)[0]) == 4
+
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    rng = np.random.default_rng(0)
+    for (s, t) in rng.integers(0, len(words), (50, 2)).tolist():
+        for (engine, queried) in (('bidirectional', thesaurus), ('alt', thesaurus),
+                             ('alt', stored)):
+            path = queried.shortest_path(words[s], words[t], engine=engine)
+            if steps[s, t] < 0:
+                assert path is None
+            else:
+                check_word_path(thesaurus, path, words[s], words[t], steps[s, t])
+    assert thesaurus.shortest_path('inconnu', words[0]) is None
+    with pytest.raises(ValueError):
+        thesaurus.shortest_path(words[0], words[1], engine='dijkstra')
+    # The labels have not been built
+    with pytest.raises(ValueError):
+        thesaurus.shortest_path(words[0], words[1], engine='labels')
+
+
+def test_k_shortest_paths(thesaurus):
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    rng = np.random.default_rng(1)
+    for (s, t) in rng.integers(0, len(words), (20, 2)).tolist():
+        paths = list(islice(thesaurus.k_shortest_paths(words[s], words[t]), 3))
+        if steps[s, t] <= 0:
+            assert len(paths) == (s == t)
+            continue
+        lengths = [length for (length, _) in paths]
+        assert lengths[0] == steps[s, t] and lengths == sorted(lengths)
+        for (length, path) in paths:
+            check_word_path(thesaurus, thesaurus.words(path), words[s], words[t],
+                            length)
+    assert list(thesaurus.k_shortest_paths('inconnu', words[0])) == []
+    with pytest.raises(ValueError):
+        next(thesaurus.k_shortest_paths(words[0], words[1], weighted=True))
+
+
+def save_labels(thesaurus, content_hash):
+    labeling.save_labels(os.path.join(thesaurus.data_dir, 'thesaurus_labels'),
+                         labeling.build_labels(thesaurus.adjacency,
+                                               thesaurus.views['csc']),
+                         content_hash)
+    return synonyms.Thesaurus(thesaurus.data_dir, source=thesaurus.source)
+
+
+def check_distances(thesaurus):
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    rng = np.random.default_rng(0)
+    for (s, t) in rng.integers(0, len(words), (100, 2)).tolist():
+        assert thesaurus.distance(words[s], words[t]) == steps[s, t]
+    for s in range(0, len(words), 37):
+        assert thesaurus.distances(words[s], words + ['inconnu']).tolist() \
+            == steps[s].tolist() + [-1]
+    assert thesaurus.distance('inconnu', words[0]) is None
+    assert thesaurus.distances('inconnu', words) is None
+
+
+def test_distances(thesaurus):
+    assert thesaurus.labels is None
+    check_distances(thesaurus)
+    # Labels built for another graph are not used
+    assert save_labels(thesaurus, 'abc').labels is None
+
+    labelled = save_labels(thesaurus, thesaurus.content_hash)
+    assert labelled.labels is not None
+    check_distances(labelled)
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    for (s, t) in np.random.default_rng(1).integers(0, len(words), (50, 2)).tolist():
+        path = labelled.shortest_path(words[s], words[t], engine='labels')
+        if steps[s, t] < 0:
+            assert path is None
+        else:
+            check_word_path(thesaurus, path, words[s], words[t], steps[s, t])
+
+
+def test_distance_matrix(thesaurus):
+    assert thesaurus.distance_matrix is None
+    words = thesaurus.names.tolist()
+    steps = all_steps(thesaurus, words)
+    rows = np.where(steps >= 0, steps, distance_matrix.UNREACHABLE)
+    nodes = thesaurus.nodes(words)
+    assert thesaurus.distances_from(words[0])[nodes].tolist() == rows[0].tolist()
+
+    basename = os.path.join(thesaurus.data_dir, 'thesaurus_distances')
+    # The missing matrix is only looked for once
+    distance_matrix.compute(basename, thesaurus.adjacency, thesaurus.content_hash)
+    assert thesaurus.distance_matrix is None
+    # A matrix of another graph is not used
+    distance_matrix.compute(basename, thesaurus.adjacency, 'abc')
+    assert synonyms.Thesaurus(thesaurus.data_dir).distance_matrix is None
+
+    distance_matrix.compute(basename, thesaurus.adjacency, thesaurus.content_hash)
+    computed = synonyms.Thesaurus(thesaurus.data_dir)
+    assert computed.distance_matrix is not None
+    check_distances(computed)
+    for s in range(0, len(words), 37):
+        assert computed.distances_from(words[s])[nodes].tolist() == rows[s].tolist()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The original entries of the thesaurus, read back through the offsets table
+
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import create_matrix
+import packed_names
+import raw_entries
+import synonyms
+
+
+def expected_entries(source):
+    '''
+    This function returns the sense lines of the last occurrence of each
+    entry of the thesaurus file
+
+    '''
+    entries = {}
+    with open(source, mode='rt', encoding='utf-8') as f:
+        next(f)
+        for line in f:
+            fields = line.rstrip('\n').split('|')
+            if line.startswith('('):
+                senses.append((fields[0], fields[1:]))
+            else:
+                senses = entries[fields[0]] = []
+    return entries
+
+
+def names_of(source):
+    (keys, _, _, _) = create_matrix.build_csr(*create_matrix.read_thesaurus(source))
+    return packed_names.PackedNames.from_words(keys)
+
+
+def check_entries(source, entries):
+    expected = expected_entries(source)
+    for word in entries.names:
+        assert entries.get(word) == expected[word]
+    # Neither an unknown word nor a synonym which is not an entry
+    assert entries.get('inconnu') is None
+    assert entries.get('') is None
+    assert entries.offset('inconnu') == -1
+
+
+@pytest.mark.parametrize('archived', [False, True])
+def test_raw_entries(source, archive, archived):
+    if archived:
+        source = archive
+    names = names_of(source)
+    offsets = raw_entries.entry_offsets(source, names)
+    assert offsets.dtype == np.int64 and (offsets > 0).all()
+    entries = raw_entries.RawEntries(source, names, offsets)
+    check_entries(source if not archived else os.path.join(
+        os.path.dirname(source), 'thes_fr.dat'), entries)
+    entries.close()
+
+
+def write_index(source, words, offsets):
+    with open(os.path.join(os.path.dirname(source), raw_entries.INDEX_MEMBER),
+              mode='wt', encoding='utf-8') as f:
+        f.write('UTF-8\n%d\n' % len(words))
+        f.writelines('%s|%d\n' % (w, o) for (w, o) in zip(words, offsets))
+
+
+def test_index(source):
+    names = names_of(source)
+    expected = raw_entries.entry_offsets(source, names)
+    (words, offsets) = raw_entries.scan_offsets(source)
+
+    write_index(source, words, offsets)
+    assert raw_entries.read_index(source)[0] == words
+    assert raw_entries.entry_offsets(source, names).tolist() == expected.tolist()
+
+    # A wrong index is not used
+    write_index(source, words, offsets + 1)
+    assert raw_entries.entry_offsets(source, names).tolist() == expected.tolist()
+
+
+def test_thesaurus(source, tmp_path):
+    data_dir = str(tmp_path / 'step1')
+    os.makedirs(data_dir)
+    parsed = create_matrix.read_thesaurus(source)
+    (keys, indptr, indices, _) = create_matrix.build_csr(*parsed)
+    create_matrix.write_bundle(os.path.join(data_dir, 'thesaurus.bundle'),
+                               keys, indptr, indices, '', {})
+    np.save(os.path.join(data_dir, 'thesaurus_offsets.npy'),
+            raw_entries.entry_offsets(source, names_of(source)))
+
+    thesaurus = synonyms.Thesaurus(data_dir, source=source)
+    expected = expected_entries(source)
+    for word in keys[::10]:
+        assert thesaurus.raw_entry(word) == expected[word]
+    assert thesaurus.raw_entry('inconnu') is None
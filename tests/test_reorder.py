@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The node orderings : they are permutations and renumbering the graph back
+gives the alphabetical graph
+
+"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import reorder
+
+
+@pytest.fixture
+def csr():
+    rng = np.random.default_rng(0)
+    M = sparse.random(200, 200, density=0.02, random_state=rng, format='csr')
+    M.sort_indices()
+    return (M.indptr.astype(np.int32), M.indices.astype(np.int32))
+
+
+@pytest.mark.parametrize('method', reorder.METHODS)
+def test_node_order(csr, method):
+    (indptr, indices) = csr
+    iperm = reorder.node_order(indptr, indices, method)
+    assert iperm.dtype == np.int32
+    assert sorted(iperm.tolist()) == list(range(len(indptr) - 1))
+
+    perm = np.empty_like(iperm)
+    perm[iperm] = np.arange(len(iperm), dtype=np.int32)
+    (new_indptr, new_indices) = reorder.permute_csr(indptr, indices, perm)
+    # Node iperm[k] became node k, with the same (renumbered) neighbours
+    for k in range(0, len(iperm), 7):
+        row = new_indices[new_indptr[k]:new_indptr[k+1]]
+        u = iperm[k]
+        assert row.tolist() == sorted(perm[indices[indptr[u]:indptr[u+1]]].tolist())
+
+    (back_indptr, back_indices) = reorder.alphabetical(new_indptr, new_indices, iperm)
+    assert back_indptr.tolist() == indptr.tolist()
+    assert back_indices.tolist() == indices.tolist()
+
+
+def test_alphabetical_without_reordering(csr):
+    assert reorder.alphabetical(*csr, None) == csr
+
+
+def test_unknown_method(csr):
+    with pytest.raises(ValueError):
+        reorder.node_order(*csr, 'alphabetical')
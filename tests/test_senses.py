@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The part of speech and sense group of the edges : the arrays built by
+create_matrix.py on a hand-built thesaurus, the node bitmask and the
+filtering of compute_syno_set, whatever the order of the nodes
+
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import create_matrix
+import senses
+import synonyms
+
+LINES = ['chat|2', '(nom)|félin|matou', '(verbe)|parler',
+         'félin|1', '(nom)|chat',
+         'matou|1', '(nom)|chat|félin',
+         'parler|1', '(verbe)|chat|dire',
+         'dire|1', '(verbe)|parler']
+
+
+def test_pos_bits():
+    bits = senses.pos_bits([0, 1, 62, 63, 64, 200])
+    assert bits.dtype == np.uint64
+    assert bits.tolist() == [1, 2, 1 << 62, 1 << 63, 1 << 63, 1 << 63]
+
+
+def test_build_senses():
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.parse_thesaurus(LINES))
+    assert keys == ('chat', 'dire', 'félin', 'matou', 'parler')
+    assert list(sense_info.tags) == ['(nom)', '(verbe)']
+    # chat : félin and matou (nom, first sense line), parler (verbe, second one)
+    row = slice(indptr[0], indptr[1])
+    assert [keys[k] for k in indices[row]] == ['félin', 'matou', 'parler']
+    assert sense_info.edge_sense[row].tolist() == [0, 0, 1]
+    assert sense_info.edge_pos[row].tolist() == [0, 0, 1]
+    assert sense_info.node_pos.tolist() == [3, 2, 1, 1, 2]
+    assert sense_info.edge_sense.dtype == sense_info.edge_pos.dtype == np.uint8
+
+    assert sense_info.codes('verbe').tolist() == [1]
+    assert sense_info.codes(['(verbe)', 'nom']).tolist() == [1, 0]
+    assert sense_info.edge_filter('nom').tolist() == [True, False]
+    assert sense_info.pos_mask(['nom', 'verbe']) == 3
+    with pytest.raises(ValueError):
+        sense_info.codes('adj.')
+
+
+@pytest.fixture(params=[None, 'rcm', 'degree'])
+def thesaurus(request, tmp_path):
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.parse_thesaurus(LINES))
+    create_matrix.write_bundle(os.path.join(tmp_path, 'thesaurus.bundle'),
+                               keys, indptr, indices, '', {},
+                               method=request.param, sense_info=sense_info)
+    return synonyms.Thesaurus(str(tmp_path))
+
+
+def test_bundle_senses(thesaurus):
+    sense_info = thesaurus.senses
+    assert list(sense_info.tags) == ['(nom)', '(verbe)']
+    adjacency = thesaurus.adjacency
+    chat = thesaurus.node('chat')
+    edges = adjacency.edges_of(np.array([chat]))
+    neighbors = thesaurus.words(adjacency.neighbors_of(np.array([chat])))
+    pos = dict(zip(neighbors, sense_info.edge_pos[edges].tolist()))
+    assert pos == {'félin' : 0, 'matou' : 0, 'parler' : 1}
+    assert sense_info.node_pos[thesaurus.node('dire')] == 2
+    # The senses are not part of the graph hash
+    assert thesaurus.content_hash != thesaurus.bundle.content_hash
+
+
+def test_filtered_syno_set(thesaurus):
+    assert thesaurus.compute_syno_set('chat')[1] == [1, 4, 5, 5]
+    assert thesaurus.compute_syno_set('chat', pos='nom')[1] == [1, 3, 3]
+    assert thesaurus.compute_syno_set('chat', pos='(verbe)')[1] == [1, 2, 3, 3]
+    # The sense group only restricts the first step (from chat)
+    assert thesaurus.compute_syno_set('chat', sense=1)[1] == [1, 2, 3, 3]
+    assert thesaurus.compute_syno_set('chat', pos='nom', sense=1)[1] == [1, 1]
+    with pytest.raises(ValueError):
+        thesaurus.compute_syno_set('chat', pos='adj.')
+    with pytest.raises(ValueError):
+        thesaurus.compute_syno_set('chat', graph=thesaurus.graph, pos='nom')
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The unweighted traversal engines checked against scipy.sparse.csgraph
+
+"""
+
+import numpy as np
+
+import landmarks
+import traversal
+from compressed import compress
+
+
+def test_bfs(graph):
+    bfs = traversal.BFS(graph.forward)
+    for source in range(0, graph.N, 7):
+        tree = bfs.search(source)
+        for target in range(graph.N):
+            assert tree.depth(target) == graph.distance(source, target)
+        # The farthest node, through the parents
+        target = int(tree.nodes[-1])
+        graph.check_path(tree.path(target), source, target)
+        assert tree.max_depth == graph.distance(source, target)
+
+
+def test_bfs_bounded(graph):
+    bfs = traversal.BFS(graph.forward)
+    for (source, target) in graph.pairs(50):
+        tree = bfs.search(source, max_depth=2, targets=target)
+        d = graph.distance(source, target)
+        assert tree.depth(target) == (d if 0 <= d <= 2 else -1)
+        assert tree.max_depth <= 2
+        if d >= 0 and tree.depth(target) >= 0:
+            # The search stops at the level of the target
+            assert tree.max_depth == d
+
+
+def test_tree_paths(graph):
+    bfs = traversal.BFS(graph.forward)
+    targets = np.arange(graph.N)
+    for source in range(0, graph.N, 11):
+        (lengths, indptr, nodes) = bfs.search(source).paths(targets)
+        for target in targets:
+            assert lengths[target] == graph.distance(source, target)
+            if lengths[target] >= 0:
+                graph.check_path(nodes[indptr[target]:indptr[target+1]], source, target)
+            else:
+                assert indptr[target+1] - indptr[target] == 0
+
+
+def test_bfs_sources(graph):
+    bfs = traversal.BFS(graph.forward)
+    sources = np.array([0, 5, 9])
+    tree = bfs.search(sources)
+    for target in range(graph.N):
+        distances = [graph.distance(s, target) for s in sources]
+        distances = [d for d in distances if d >= 0]
+        assert tree.depth(target) == (min(distances) if distances else -1)
+
+
+def test_bidirectional(graph):
+    for forward in (graph.forward, compress(graph.forward)):
+        engine = traversal.BidirectionalBFS(forward, graph.backward)
+        for (source, target) in graph.pairs():
+            graph.check_path(engine.path(source, target), source, target)
+
+
+def test_bidirectional_max_depth(graph):
+    engine = traversal.BidirectionalBFS(graph.forward, graph.backward)
+    for (source, target) in graph.pairs():
+        path = engine.path(source, target, max_depth=2)
+        d = graph.distance(source, target)
+        if 0 <= d <= 2:
+            graph.check_path(path, source, target)
+        else:
+            assert path is None
+
+
+def test_landmark_tables(graph):
+    for method in landmarks.METHODS:
+        (nodes, dist_from, dist_to) = landmarks.compute(graph.forward, graph.backward,
+                                                        4, method)
+        assert len(set(nodes.tolist())) == 4
+        for (l, node) in enumerate(nodes):
+            for v in range(graph.N):
+                d = graph.distance(node, v)
+                assert dist_from[v, l] == (d if d >= 0 else landmarks.UNKNOWN)
+                d = graph.distance(v, node)
+                assert dist_to[v, l] == (d if d >= 0 else landmarks.UNKNOWN)
+
+
+def test_alt(graph):
+    for method in landmarks.METHODS:
+        tables = landmarks.compute(graph.forward, graph.backward, 4, method)
+        engine = landmarks.ALT(graph.forward, *tables)
+        for (source, target) in graph.pairs():
+            graph.check_path(engine.path(source, target), source, target)
+            # The bounds are admissible
+            d = graph.distance(source, target)
+            if d >= 0:
+                assert engine.lower_bounds(np.array([source]), target)[0] <= d
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The cached search trees : their paths checked against scipy, the least
+recently used eviction under a byte budget and the counters of the cache,
+and the 'cache' engine of shortest_path
+
+"""
+
+import numpy as np
+import pytest
+
+import create_matrix
+import synonyms
+import traversal
+import tree_cache
+
+
+def test_source_tree(graph):
+    bfs = traversal.BFS(graph.forward)
+    for source in range(0, graph.N, 7):
+        tree = tree_cache.SourceTree.from_bfs(source, bfs.search(source), graph.N)
+        for target in range(graph.N):
+            assert tree.distance(target) == graph.distance(source, target)
+            graph.check_path(tree.path(target), source, target)
+
+
+def make_tree(root, N=100):
+    return tree_cache.SourceTree(root, np.full(N, -1, dtype=np.int8),
+                                 np.full(N, -1, dtype=np.int32))
+
+
+def test_eviction():
+    size = make_tree(0).nbytes
+    cache = tree_cache.TreeCache(max_bytes=2*size)
+    assert cache.put('a', make_tree(0)) and cache.put('b', make_tree(1))
+    assert cache.get('a').root == 0
+    # 'b' is the least recently used tree
+    assert cache.put('c', make_tree(2))
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+    assert cache.stats() == {'hits' : 1, 'misses' : 1, 'evictions' : 1,
+                             'trees' : 2, 'bytes' : 2*size}
+
+    # A key that is put again replaces its tree without eviction
+    assert cache.put('c', make_tree(3))
+    assert cache.get('c').root == 3 and cache.evictions == 1
+    # A tree larger than the whole budget is not kept (nothing is evicted)
+    assert not cache.put('d', make_tree(4, N=1000))
+    assert len(cache) == 2 and cache.nbytes == 2*size
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+    assert cache.stats()['hits'] == 2
+
+
+def write_chain(output_dir, method=None):
+    '''
+    This function writes the bundle of a thesaurus whose words form a single
+    chain of 140 words
+
+    '''
+    words = ['m%03d' % k for k in range(140)]
+    lines = []
+    for (word, synonym) in zip(words[:-1], words[1:]):
+        lines += ['%s|1' % word, '(nom)|%s' % synonym]
+    lines += ['%s|1' % words[-1], '(nom)|']
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.parse_thesaurus(lines))
+    output_dir.mkdir()
+    create_matrix.write_bundle(str(output_dir / 'thesaurus.bundle'), keys, indptr,
+                               indices, '', {}, method, sense_info=sense_info)
+    return str(output_dir)
+
+
+@pytest.fixture
+def chain(tmp_path):
+    return synonyms.Thesaurus(write_chain(tmp_path / 'chain'),
+                              cache=tree_cache.TreeCache())
+
+
+def test_cache_engine(chain):
+    path = chain.shortest_path('m000', 'm010', engine='cache')
+    assert path == ['m%03d' % k for k in range(11)]
+    assert chain.shortest_path('m000', 'm020', engine='cache')[-1] == 'm020'
+    assert chain.shortest_path('m010', 'm000', engine='cache') is None
+    assert chain.cache.stats()['hits'] == 1 and chain.cache.stats()['misses'] == 2
+
+    # Longer than a cached tree
+    assert chain.shortest_path('m000', 'm130', engine='cache') is None
+    path = chain.shortest_path('m000', 'm130', limit=200, engine='cache')
+    assert path == ['m%03d' % k for k in range(131)]
+    with pytest.raises(ValueError):
+        chain.source_tree(chain.node('m000'), max_depth=200)
+
+    tree = chain.source_tree(chain.node('m130'), 'backward')
+    assert tree.distance(chain.node('m000')) == -1
+    assert tree.distance(chain.node('m010')) == 120
+    with pytest.raises(ValueError):
+        chain.source_tree(0, 'sideways')
+
+
+def test_shared_cache(chain, tmp_path):
+    chain.shortest_path('m000', 'm010', engine='cache')
+    # The trees of another graph (another numbering) are not returned
+    other = synonyms.Thesaurus(write_chain(tmp_path / 'other', 'degree'),
+                               cache=chain.cache)
+    assert other.content_hash != chain.content_hash
+    assert other.shortest_path('m000', 'm010', engine='cache')[-1] == 'm010'
+    assert chain.cache.stats()['misses'] == 2 and len(chain.cache) == 2
+    chain.shortest_path('m000', 'm005', engine='cache')
+    assert chain.cache.stats()['hits'] == 1
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The views of the graph (in-neighbours, undirected and reciprocal graphs)
+checked against the scipy matrix, and their registry
+
+"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import storage
+import views
+
+
+def test_views(graph):
+    M = graph.matrix.astype(np.int8)
+    expected = {'csr' : M, 'csc' : M.T, 'symmetric' : M + M.T,
+                'reciprocal' : M.multiply(M.T)}
+    registry = views.GraphViews(graph.forward)
+    for (view, matrix) in expected.items():
+        assert (registry[view].to_scipy() != sparse.csr_matrix(matrix, dtype=bool)).nnz == 0
+        assert registry[view] is registry[view]
+    assert set(registry.memory()) == set(views.VIEWS)
+    with pytest.raises(ValueError):
+        registry['csr2']
+
+
+def test_saved_views(graph, tmp_path):
+    basename = str(tmp_path / 'view')
+    storage.save_csr(basename + '_csc', graph.backward.to_scipy())
+    # Not stamped with the hash of the graph : computed
+    registry = views.GraphViews(graph.forward, basename, content_hash='abc')
+    assert not isinstance(registry['csc'].indptr, np.memmap)
+    storage.save_stamp(basename + '_csc', 'abc')
+    assert storage.stamp_matches(basename + '_csc', 'abc')
+    assert not storage.stamp_matches(basename + '_csc', 'abd')
+    registry = views.GraphViews(graph.forward, basename, content_hash='abc')
+    assert isinstance(registry['csc'].indptr, np.memmap)
+    assert (registry['csc'].to_scipy() != graph.matrix.T).nnz == 0
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The edge weights (weight sources, bundle section) and the weighted engines
+(Dijkstra, contraction hierarchy), checked against scipy.sparse.csgraph,
+and the k shortest loopless paths, checked against all the simple paths of
+the graph
+
+"""
+
+from itertools import islice
+
+import numpy as np
+import pytest
+from scipy import sparse
+from scipy.sparse import csgraph
+
+import contraction
+import create_matrix
+import k_shortest
+import synonyms
+import weights
+from compressed import compress
+
+
+def test_dijkstra(graph):
+    engine = weights.Dijkstra(graph.forward, graph.weights)
+    for (source, target) in graph.pairs():
+        (cost, path) = engine.shortest(source, target)
+        graph.check_path(path, source, target, cost)
+        expected = graph.costs[source, target]
+        if np.isfinite(expected) and expected > 0:
+            assert engine.path(source, target, expected - 0.5) is None
+            assert engine.path(source, target, expected) is not None
+
+
+def test_dijkstra_compressed(graph):
+    engine = weights.Dijkstra(compress(graph.forward), graph.weights)
+    for (source, target) in graph.pairs(50):
+        (cost, path) = engine.shortest(source, target)
+        graph.check_path(path, source, target, cost)
+
+
+def test_reverse(graph):
+    (indptr, indices, reversed_weights) = weights.reverse(graph.forward, graph.weights)
+    for node in range(graph.N):
+        (a, b) = (indptr[node], indptr[node + 1])
+        for (u, w) in zip(indices[a:b], reversed_weights[a:b]):
+            assert graph.weighted[u, node] == w
+
+
+def test_contraction(graph):
+    arrays = contraction.contract(graph.forward.indptr, graph.forward.indices,
+                                  graph.weights)
+    hierarchy = contraction.ContractionHierarchy(*arrays)
+    for (source, target) in graph.pairs():
+        (cost, path) = hierarchy.shortest(source, target)
+        graph.check_path(path, source, target, cost)
+        expected = graph.costs[source, target]
+        if np.isfinite(expected) and expected > 0:
+            assert hierarchy.path(source, target, expected - 0.5) is None
+    # A small core : most of the nodes are contracted
+    small_core = contraction.ContractionHierarchy(
+        *contraction.contract(graph.forward.indptr, graph.forward.indices,
+                              graph.weights, core_degree=2))
+    for (source, target) in graph.pairs(50):
+        (cost, path) = small_core.shortest(source, target)
+        graph.check_path(path, source, target, cost)
+
+
+def _simple_paths(graph, source, target, weighted):
+    '''
+    This *internal* function returns the costs of all the loopless paths
+    from source to target, sorted (depth first enumeration)
+
+    '''
+    matrix = graph.weighted if weighted else graph.matrix.astype(np.float64)
+    costs = []
+    stack = [(source, [source], 0.0)]
+    while stack:
+        (node, path, cost) = stack.pop()
+        if node == target:
+            costs.append(cost)
+            continue
+        row = matrix.getrow(node)
+        for (neighbor, w) in zip(row.indices, row.data):
+            if not neighbor in path:
+                stack.append((neighbor, path + [neighbor], cost + w))
+    return sorted(costs)
+
+
+def test_k_shortest(small_graph):
+    graph = small_graph
+    for weighted in (False, True):
+        edge_weights = graph.weights if weighted else None
+        matrix = graph.weighted if weighted else graph.matrix
+        engines = [k_shortest.KShortestPaths(graph.forward, None, edge_weights)]
+        if not weighted:
+            engines.append(k_shortest.KShortestPaths(graph.forward, graph.backward))
+        for (source, target) in graph.pairs(20):
+            if source == target or not np.isfinite(graph.steps[source, target]):
+                continue
+            expected = _simple_paths(graph, source, target, weighted)
+            for engine in engines:
+                found = list(islice(engine.paths(source, target), 8))
+                assert [cost for (cost, _) in found] == expected[:8]
+                assert len({tuple(path) for (_, path) in found}) == len(found)
+                for (cost, path) in found:
+                    assert path[0] == source and path[-1] == target
+                    assert len(set(path.tolist())) == len(path)
+                    steps = [matrix[u, v] for (u, v) in zip(path[:-1], path[1:])]
+                    assert all(steps)
+                    assert (sum(steps) if weighted else len(steps)) == cost
+                limit = expected[0] + 1
+                bounded = [cost for (cost, _) in engine.paths(source, target, limit)]
+                assert bounded == [cost for cost in expected if cost <= limit]
+
+
+LINES = ['chat|1', '(nom)|félin|matou',
+         'félin|1', '(nom)|chat',
+         'matou|2', '(nom)|chat|félin', '(nom)|minet',
+         'minet|1', '(nom)|matou']
+
+
+def test_weight_sources(tmp_path):
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.parse_thesaurus(LINES))
+    assert keys == ('chat', 'félin', 'matou', 'minet')
+    # chat -> félin, matou ; félin -> chat ; matou -> chat, félin, minet ;
+    # minet -> matou : only matou -> félin is not reciprocal
+    reciprocity = weights.edge_weights('reciprocity:3', keys, indptr, indices)
+    assert reciprocity.dtype == np.float32
+    assert reciprocity.tolist() == [1, 1, 1, 1, 3, 1, 1]
+
+    sense = weights.edge_weights('sense', keys, indptr, indices, sense_info)
+    expected = 1 + np.log2([2, 2, 1, 2, 2, 1, 1])
+    assert sense == pytest.approx(expected)
+
+    filename = tmp_path / 'weights.tsv'
+    filename.write_text('chat\tmatou\t0.5\nchat\tminet\t9\ninconnu\tchat\t9\n',
+                        encoding='utf-8')
+    from_file = weights.edge_weights('file:%s' % filename, keys, indptr, indices)
+    assert from_file.tolist() == [1, 0.5, 1, 1, 1, 1, 1]
+
+    with pytest.raises(ValueError):
+        weights.edge_weights('unknown', keys, indptr, indices)
+    with pytest.raises(ValueError):
+        weights.edge_weights('sense', keys, indptr, indices)
+    with pytest.raises(ValueError):
+        weights.edge_weights('reciprocity:-1', keys, indptr, indices)
+
+
+@pytest.mark.parametrize('method', [None, 'rcm'])
+def test_weighted_thesaurus(source, tmp_path, method):
+    (keys, indptr, indices, sense_info) = create_matrix.build_csr(
+        *create_matrix.read_thesaurus(source))
+    edge_weights = weights.edge_weights('reciprocity', keys, indptr, indices)
+    create_matrix.write_bundle(str(tmp_path / 'thesaurus.bundle'), keys, indptr,
+                               indices, '', {}, method, edge_weights=edge_weights,
+                               contract=True)
+    thesaurus = synonyms.Thesaurus(str(tmp_path))
+    # The weights follow the edges when the graph is reordered
+    (rows, cols) = (np.repeat(np.arange(len(keys)), np.diff(indptr)), indices)
+    expected = sparse.csr_matrix((edge_weights.astype(np.float64), (rows, cols)),
+                                 shape=(len(keys), len(keys)))
+    graph = thesaurus.graph.tocoo()
+    found = sparse.csr_matrix((thesaurus.weights.astype(np.float64),
+                               (graph.row, graph.col)), shape=graph.shape)
+    nodes = thesaurus.nodes(list(keys))
+    assert abs(found[nodes][:, nodes] - expected).max() == 0
+
+    costs = csgraph.dijkstra(expected, indices=np.arange(0, len(keys), 17))
+    for (i, source_node) in enumerate(range(0, len(keys), 17)):
+        for target_node in range(0, len(keys), 11):
+            for engine in (thesaurus.dijkstra, thesaurus.hierarchy):
+                (cost, path) = engine.shortest(nodes[source_node], nodes[target_node])
+                if not np.isfinite(costs[i, target_node]):
+                    assert path is None
+                else:
+                    assert cost == costs[i, target_node]
+                    assert path[0] == nodes[source_node]
+
+
+def test_unweighted_thesaurus(thesaurus):
+    assert thesaurus.weights is None
+    assert thesaurus.hierarchy is None
+    with pytest.raises(ValueError):
+        thesaurus.dijkstra